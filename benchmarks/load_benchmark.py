@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# benchmarks/load_benchmark.py
+
+"""
+End-to-end load benchmark of the book pipeline against the local StubBackend.
+
+Runs main.run_book (title -> ToC -> sections -> compile) for a number of
+books without calling any paid API, then reports books/hour, p50/p99 section
+debate latency and peak memory.
+
+Example:
+    python benchmarks/load_benchmark.py --books 3 --workers 8 --time-scale 0.05
+"""
+
+import argparse
+import math
+import os
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+from src.agents import client_registry, usage_tracker  # noqa: E402
+from src.utils.irc_logger import irc_logger  # noqa: E402
+from src.utils.metrics import metrics  # noqa: E402
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers (0.0 if empty)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the book pipeline against the stub backend.")
+    parser.add_argument("--books", type=int, default=2, help="Number of books to generate.")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent section debates per book.")
+    parser.add_argument("--async", dest="use_async", action="store_true", help="Use the asyncio section runner.")
+    parser.add_argument("--topic", default="Benchmarking multi-agent writing", help="Base topic for every book.")
+    parser.add_argument("--output", help="Directory for generated books (default: a temporary directory).")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="Multiplier for every simulated delay.")
+    parser.add_argument("--latency-median", type=float, help="Median seconds to first token.")
+    parser.add_argument("--tokens-per-second", type=float, help="Simulated generation speed.")
+    parser.add_argument("--failure-rate", type=float, help="Share of calls that fail.")
+    parser.add_argument("--chapters", type=int, help="Chapters in each generated ToC.")
+    parser.add_argument("--sections-per-chapter", type=int, help="Sections in each chapter.")
+    return parser.parse_args()
+
+def run(args):
+    overrides = {"time_scale": args.time_scale}
+    for name in ("latency_median", "tokens_per_second", "failure_rate", "chapters", "sections_per_chapter"):
+        value = getattr(args, name)
+        if value is not None:
+            overrides[name] = value
+    backend = client_registry.use_stub_backend(overrides)
+    output = args.output or tempfile.mkdtemp(prefix="agent_saloon_bench_")
+    metrics.set_output_dir(output)
+
+    completed = 0
+    started = time.monotonic()
+    for index in range(args.books):
+        book_path = main.run_book(f"{args.topic} #{index + 1}", max(1, args.workers), args.use_async, base_path=output)
+        if book_path:
+            completed += 1
+    elapsed = time.monotonic() - started
+
+    latencies = backend.section_latencies()
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_mb = peak_rss / (1024 * 1024) if sys.platform == "darwin" else peak_rss / 1024
+    usage = usage_tracker.snapshot()
+
+    report = {
+        "books_completed": completed,
+        "books_requested": args.books,
+        "elapsed_seconds": round(elapsed, 3),
+        "books_per_hour": round(completed / elapsed * 3600, 2) if elapsed else 0.0,
+        "sections": len(latencies),
+        "section_latency_p50": round(percentile(latencies, 50), 3),
+        "section_latency_p99": round(percentile(latencies, 99), 3),
+        "calls": backend.calls,
+        "failed_calls": backend.failures,
+        "prompt_tokens": usage["prompt_tokens"],
+        "completion_tokens": usage["completion_tokens"],
+        "peak_memory_mb": round(peak_mb, 1),
+        "output_dir": output,
+    }
+    irc_logger.system_message("Benchmark results:")
+    for key, value in report.items():
+        irc_logger.print_content(f"  {key}: {value}")
+    return report
+
+if __name__ == "__main__":
+    run(parse_args())
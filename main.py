@@ -1,240 +1,1152 @@
 #!/usr/bin/env python3
 
-import re
+import argparse
+import asyncio
+import contextvars
+import json
+import multiprocessing
 import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from src.agents import BatchRunner, ResponseCache, UsageTracker, client_registry, usage_tracker
+from src.config import BATCH, BUDGET, HISTORY, OUTPUT_DIR, SECTION_GENERATION, STREAMING, TITLE_GENERATION, TOC_GENERATION
 from src.models import TitleGenerator, TableOfContentsGenerator
 from src.models.book_manager import BookManager
+from src.models.budget import BookBudget, current_budget
+from src.models.build_state import BuildState
+from src.models.continuity import ContinuityIndex
+from src.models.job_queue import SectionQueue, worker_id
+from src.models.manifest import BookManifest
+from src.models.book_structure import BookStructure
 from src.models.section_writer import SectionWriter
-from src.utils.irc_logger import irc_logger  # Adjust the import path accordingly
+from src.utils.irc_logger import IRCLogger, irc_logger  # Adjust the import path accordingly
+from src.utils.metrics import metrics
+from src.utils.transcript import Transcript, current_transcript
 
-def parse_toc(toc):
+def write_unit(title, toc, structure, entry, first_response=None, continuity=None):
     """
-    Parse the Table of Contents into a structured list.
+    Run a single SectionWriter debate for a chapter or section (a TocEntry).
 
-    Args:
-        toc (str): The Table of Contents as a string.
+    If first_response is given (see batch_first_turns) it answers the
+    opening turn instead of a live call. A ContinuityIndex adds passages of
+    the sections written so far to the prompts.
 
     Returns:
-        list: A list of dictionaries representing chapters and their sections.
+        str: The generated content, or None if the debate failed.
     """
-    chapters = []
-    current_chapter = None
+    section_writer = SectionWriter(
+        book_title=title,
+        full_toc=toc,
+        section_number=entry.number,
+        section_title=entry.title,
+        structure=structure,
+        continuity=continuity
+    )
+    return section_writer.write(first_response)
 
-    for line in toc.split('\n'):
-        line = line.strip()
-        if not line:
-            continue
-        chapter_match = re.match(r'^(\d+)\.\s+(.*)', line)
-        section_match = re.match(r'^(\d+\.\d+)\.\s+(.*)', line)
-        
-        if chapter_match and not section_match:
-            # Chapter line
-            chapter_number = chapter_match.group(1)
-            chapter_title = chapter_match.group(2)
-            current_chapter = {
-                'number': chapter_number,
-                'title': chapter_title,
-                'sections': []
-            }
-            chapters.append(current_chapter)
-        elif section_match:
-            # Section line
-            section_number = section_match.group(1)
-            section_title = section_match.group(2)
-            if current_chapter is not None:
-                current_chapter['sections'].append({
-                    'number': section_number,
-                    'title': section_title
-                })
-    return chapters
-
-def compile_chapters(book_manager, title, chapters):
+def batch_first_turns(book_manager, title, toc, structure, jobs, continuity=None):
     """
-    Compile all sections of each chapter into a single chapter file.
+    Submit the opening Zero turn of every job as one batch.
+
+    The opening turns do not depend on each other, so the bulk of the
+    drafting tokens can go through the cheaper batch interface. Batch files
+    are kept under the book's batches/ directory. Each section's continuity
+    passages are pinned, so its live debate keeps the batched prompt.
+
+    Returns:
+        dict: Unit number -> Response; units missing from it open with a live call.
+    """
+    requests = {}
+    for entry in jobs:
+        section_writer = SectionWriter(
+            book_title=title,
+            full_toc=toc,
+            section_number=entry.number,
+            section_title=entry.title,
+            structure=structure,
+            continuity=continuity
+        )
+        if continuity is not None:
+            continuity.pin(entry.number, section_writer.continuity)
+        requests[entry.number] = section_writer.first_request()
+
+    runner = BatchRunner(
+        client_registry.get_batch_backend(),
+        os.path.join(book_manager.create_book_directory(title), "batches"),
+        tracker=usage_tracker
+    )
+    irc_logger.system_message(f"Submitting the opening turn of {len(requests)} sections as one batch.")
+    try:
+        responses = runner.run(requests, name=f"first_turns_{int(time.time())}")
+    except Exception as e:
+        irc_logger.error(f"Batch submission failed, opening every section live: {str(e)}")
+        return {}
+    irc_logger.system_message(f"Batch answered {len(responses)} of {len(requests)} opening turns.")
+    return responses
+
+def save_unit(book_manager, title, entry, content, manifest=None):
+    """Write a finished unit through the BookManager, or log the failure."""
+    budget = current_budget()
+    if budget:
+        budget.section_finished()
+    if content:
+        path = book_manager.write_section(title, entry.chapter_number, entry.section_number, content)
+        if manifest:
+            manifest.mark_section(entry.number, "done", path, content=book_manager.strip_markers(content))
+        return
+    if manifest:
+        manifest.mark_section(entry.number, "failed")
+    if entry.section_number:
+        irc_logger.error(f"Failed to write Section {entry.number}.")
+    else:
+        irc_logger.error(f"Failed to write Chapter {entry.number}.")
+
+def pending_jobs(book_manager, title, jobs, manifest):
+    """
+    Return the jobs whose section is missing or failed.
+
+    Sections edited by hand since they were recorded are kept; their new
+    hash is recorded instead.
+    """
+    pending = []
+    for entry in jobs:
+        path = book_manager.section_path(title, entry.chapter_number, entry.section_number)
+        if not manifest.section_done(entry.number, path):
+            pending.append(entry)
+        elif manifest.refresh_section(entry.number, path):
+            irc_logger.info(f"Keeping the edited file of {entry.number}: {entry.title}.")
+    return pending
+
+def write_sections(book_manager, title, toc, structure, max_workers=1, jobs=None, manifest=None, first_responses=None, continuity=None):
+    """
+    Generate every chapter and section of the book.
+
+    Sections only depend on the title and the full ToC, so with max_workers > 1
+    the debates run concurrently on a thread pool. Finished content is always
+    written from the calling thread, in completion order.
 
     Args:
         book_manager (BookManager): Instance of BookManager.
         title (str): Title of the book.
-        chapters (list): List of chapter dictionaries.
+        toc (str): The full Table of Contents.
+        structure (BookStructure): The parsed Table of Contents.
+        max_workers (int): Maximum number of debates running at once.
+        jobs (list, optional): Subset of structure.units() to write.
+        manifest (BookManifest, optional): Manifest recording each outcome.
+        first_responses (dict, optional): Opening turns answered by batch_first_turns.
+        continuity (ContinuityIndex, optional): Index of the sections written so far.
     """
-    for chapter in chapters:
-        chapter_number = chapter['number']
-        chapter_title = chapter['title']
-        sections = chapter['sections']
+    if jobs is None:
+        jobs = structure.units()
+    first_responses = first_responses or {}
 
-        irc_logger.system_message(f"Compiling Chapter {chapter_number}: {chapter_title}")
+    if max_workers <= 1:
+        for entry in jobs:
+            if entry.section_number:
+                irc_logger.system_message(f"Writing Section {entry.number}: {entry.title}")
+            else:
+                irc_logger.system_message(f"Writing Chapter {entry.number}: {entry.title}")
+            content = write_unit(title, toc, structure, entry, first_responses.get(entry.number), continuity)
+            save_unit(book_manager, title, entry, content, manifest)
+        return
 
-        # Initialize content with chapter title
-        chapter_content = f"# Chapter {chapter_number}: {chapter_title}\n\n"
+    irc_logger.system_message(f"Writing {len(jobs)} sections with up to {max_workers} concurrent debates.")
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # Each debate runs in a copy of this context so its metrics labels carry over
+        futures = {
+            executor.submit(contextvars.copy_context().run, write_unit, title, toc, structure, entry,
+                            first_responses.get(entry.number), continuity): entry
+            for entry in jobs
+        }
+        for future in as_completed(futures):
+            entry = futures[future]
+            try:
+                content = future.result()
+            except Exception as e:
+                irc_logger.error(f"Error while writing {entry.number}: {str(e)}")
+                content = None
+            save_unit(book_manager, title, entry, content, manifest)
 
-        if not sections:
-            # No sub-sections; use the chapter content itself
-            section_filename = f"chapter_{chapter_number}.md"
-            section_path = os.path.join(book_manager.create_book_directory(title), "sections", section_filename)
-            if os.path.exists(section_path):
-                with open(section_path, 'r', encoding='utf-8') as f:
-                    chapter_content += f.read()
-            else:
-                irc_logger.error(f"Chapter file {section_filename} does not exist.")
+async def write_sections_async(book_manager, title, toc, structure, max_workers=1, jobs=None, manifest=None, first_responses=None, continuity=None):
+    """
+    Generate every chapter and section on a single asyncio event loop.
+
+    All debates share one AsyncSwarm client; at most max_workers of them are
+    waiting on the network at any moment.
+
+    Args:
+        book_manager (BookManager): Instance of BookManager.
+        title (str): Title of the book.
+        toc (str): The full Table of Contents.
+        structure (BookStructure): The parsed Table of Contents.
+        max_workers (int): Maximum number of debates running at once.
+        jobs (list, optional): Subset of structure.units() to write.
+        manifest (BookManifest, optional): Manifest recording each outcome.
+        first_responses (dict, optional): Opening turns answered by batch_first_turns.
+        continuity (ContinuityIndex, optional): Index of the sections written so far.
+    """
+    if jobs is None:
+        jobs = structure.units()
+    first_responses = first_responses or {}
+    client = client_registry.get_async_swarm()
+    semaphore = asyncio.Semaphore(max_workers)
+
+    async def write_job(entry):
+        async with semaphore:
+            section_writer = SectionWriter(
+                book_title=title,
+                full_toc=toc,
+                section_number=entry.number,
+                section_title=entry.title,
+                structure=structure,
+                continuity=continuity
+            )
+            try:
+                content = await section_writer.awrite(client, first_responses.get(entry.number))
+            except Exception as e:
+                irc_logger.error(f"Error while writing {entry.number}: {str(e)}")
+                content = None
+        save_unit(book_manager, title, entry, content, manifest)
+
+    irc_logger.system_message(f"Writing {len(jobs)} sections on the event loop, up to {max_workers} at a time.")
+    await asyncio.gather(*(write_job(entry) for entry in jobs))
+
+def compile_chapters(book_manager, title, structure, force=False):
+    """
+    Compile all sections of each chapter into a single chapter file.
+
+    Section files are streamed straight into the chapter file, so memory use
+    does not grow with chapter size. Chapters whose sections, headings and
+    output file are unchanged since the last compile are skipped.
+
+    Args:
+        book_manager (BookManager): Instance of BookManager.
+        title (str): Title of the book.
+        structure (BookStructure): The parsed Table of Contents.
+        force (bool): Rebuild every chapter even if it is up to date.
+
+    Returns:
+        list: Numbers of the chapters that were rebuilt.
+    """
+    book_path = book_manager.create_book_directory(title)
+    sections_dir = os.path.join(book_path, "sections")
+    chapters_dir = os.path.join(book_path, "chapters")
+    build_state = BuildState(book_path)
+    rebuilt = []
+
+    for chapter in sorted(structure, key=lambda c: c.sort_key):
+        chapter_number = chapter.number
+        chapter_title = chapter.title
+        chapter_path = os.path.join(chapters_dir, chapter.filename)
+
+        # Sections in number order; headings without a file of their own group deeper ones
+        if not chapter.is_leaf:
+            parts = [
+                (f"{'#' * entry.depth} Section {entry.number}: {entry.title}\n\n",
+                 os.path.join(sections_dir, entry.filename) if entry.is_leaf else None)
+                for entry in sorted(chapter.walk(), key=lambda e: e.sort_key)
+            ]
         else:
-            # Compile all sections
-            # Sort sections by section number to maintain order
-            sorted_sections = sorted(sections, key=lambda s: list(map(int, s['number'].split('.'))))
-            for section in sorted_sections:
-                section_number = section['number']
-                section_title = section['title']
-                section_filename = f"chapter_{chapter_number}_section_{section_number.replace('.', '_')}.md"
-                section_path = os.path.join(book_manager.create_book_directory(title), "sections", section_filename)
-                if os.path.exists(section_path):
-                    with open(section_path, 'r', encoding='utf-8') as f:
-                        # Optionally, include section titles
-                        chapter_content += f"## Section {section_number}: {section_title}\n\n"
-                        chapter_content += f.read() + "\n\n"
+            # No sub-sections; use the chapter content itself
+            parts = [(None, os.path.join(sections_dir, chapter.filename))]
+
+        heading = f"# Chapter {chapter_number}: {chapter_title}\n\n"
+        inputs = [path for _, path in parts if path and os.path.exists(path)]
+        meta = heading + ''.join(part_heading or "" for part_heading, _ in parts)
+        if not force and not build_state.is_stale(chapter_path, inputs, meta):
+            continue
+
+        irc_logger.system_message(f"Compiling Chapter {chapter_number}: {chapter_title}")
+
+        with book_manager.open_stream(title, chapter.filename, subdir="chapters") as out:
+            # Start with the chapter title
+            out.write(heading.encode('utf-8'))
+            for part_heading, path in parts:
+                if path is None:
+                    out.write(part_heading.encode('utf-8'))
+                    continue
+                if path not in inputs:
+                    irc_logger.error(f"{'Section' if part_heading else 'Chapter'} file {os.path.basename(path)} does not exist.")
+                    continue
+                if part_heading:
+                    out.write(part_heading.encode('utf-8'))
+                    book_manager.copy_into(out, path)
+                    out.write(b"\n\n")
                 else:
-                    irc_logger.error(f"Section file {section_filename} does not exist.")
+                    book_manager.copy_into(out, path)
 
-        # Write the compiled chapter to the 'chapters' directory
-        book_manager.write_chapter(title, chapter_number, chapter_content)
+        build_state.record(chapter_path, inputs, meta)
+        rebuilt.append(chapter_number)
 
-    irc_logger.system_message("All chapters have been compiled.")
+    build_state.save()
+    irc_logger.system_message(f"All chapters have been compiled ({len(rebuilt)} of {len(structure)} rebuilt).")
+    return rebuilt
 
-def compile_final_book(book_manager, title, chapters):
+def compile_final_book(book_manager, title, structure, force=False):
     """
     Compile all chapters into the final book file.
 
+    Chapter files are streamed into final_book.md rather than concatenated in
+    memory. The book is only re-linked when a chapter, the ToC or the title
+    changed since the last compile.
+
     Args:
         book_manager (BookManager): Instance of BookManager.
         title (str): Title of the book.
-        chapters (list): List of chapter dictionaries.
+        structure (BookStructure): The parsed Table of Contents.
+        force (bool): Rebuild even if the final book is up to date.
+
+    Returns:
+        bool: True if final_book.md was rewritten.
     """
+    book_path = book_manager.create_book_directory(title)
+    chapters_dir = os.path.join(book_path, "chapters")
+    final_book_filename = "final_book.md"
+    final_book_path = os.path.join(book_path, final_book_filename)
+    toc_path = os.path.join(book_path, "table_of_contents.txt")
+
+    # Sort chapters by chapter number to maintain order
+    sorted_chapters = sorted(structure, key=lambda c: c.sort_key)
+    chapter_paths = [os.path.join(chapters_dir, chapter.filename) for chapter in sorted_chapters]
+    inputs = [toc_path] + [path for path in chapter_paths if os.path.exists(path)]
+    meta = f"# {title}\n\n## Table of Contents\n\n"
+
+    build_state = BuildState(book_path)
+    if not force and not build_state.is_stale(final_book_path, inputs, meta):
+        irc_logger.system_message("Final book is up to date.")
+        return False
+
     irc_logger.system_message("Compiling the final book...")
 
-    final_book_content = f"# {title}\n\n"
-    final_book_content += "## Table of Contents\n\n"
-    final_book_content += book_manager.read_file(title, "table_of_contents.txt") + "\n\n"
+    with book_manager.open_stream(title, final_book_filename) as out:
+        out.write(meta.encode('utf-8'))
+        book_manager.copy_into(out, toc_path)
+        out.write(b"\n\n")
 
-    # Sort chapters by chapter number to maintain order
-    sorted_chapters = sorted(chapters, key=lambda c: int(c['number']))
-    for chapter in sorted_chapters:
-        chapter_number = chapter['number']
-        chapter_title = chapter['title']
-        chapter_filename = f"chapter_{chapter_number}.md"
-        chapter_path = os.path.join(book_manager.create_book_directory(title), "chapters", chapter_filename)
-        if os.path.exists(chapter_path):
-            with open(chapter_path, 'r', encoding='utf-8') as f:
-                final_book_content += f.read() + "\n\n"
+        for chapter_path in chapter_paths:
+            if chapter_path in inputs:
+                book_manager.copy_into(out, chapter_path)
+                out.write(b"\n\n")
+            else:
+                irc_logger.error(f"Chapter file {os.path.basename(chapter_path)} does not exist.")
+
+    build_state.record(final_book_path, inputs, meta)
+    build_state.save()
+    irc_logger.system_message(f"Final book compiled successfully at {final_book_path}")
+    return True
+
+def write_book(book_manager, title, toc, manifest, max_workers=1, use_async=False, queue=None):
+    """
+    Write every section the manifest does not already have, then compile the book.
+
+    With a queue, the sections are enqueued for work_queue() instead, and
+    whichever worker finishes the last of them compiles the book.
+
+    Args:
+        book_manager (BookManager): Instance of BookManager.
+        title (str): Title of the book.
+        toc (str): The full Table of Contents.
+        manifest (BookManifest): The book's manifest.
+        max_workers (int): Maximum number of debates running at once.
+        use_async (bool): Run the debates on an event loop instead of a thread pool.
+        queue (SectionQueue, optional): Queue the sections instead of writing them here.
+    """
+    # Parse the ToC once, or load the structure saved by an earlier run
+    book_path = book_manager.create_book_directory(title)
+    structure = BookStructure.load(book_path, toc)
+
+    jobs = structure.units()
+    pending = pending_jobs(book_manager, title, jobs, manifest)
+    if len(pending) < len(jobs):
+        irc_logger.system_message(f"Reusing {len(jobs) - len(pending)} finished sections; {len(pending)} left to write.")
+    budget = current_budget()
+    if queue is not None:
+        pending_numbers = {entry.number for entry in pending}
+        queue.enqueue_book(book_path, title, jobs, done=[entry.number for entry in jobs if entry.number not in pending_numbers],
+                           spent=budget.spent() if budget else None)
+        irc_logger.system_message(f"Queued {len(pending)} sections of '{title}' in {queue.path}.")
+        return
+    if budget:
+        budget.plan_sections(len(pending))
+
+    # Index sections as they are saved so later debates can draw on them
+    continuity = ContinuityIndex(title, structure)
+    if continuity.enabled:
+        pending_numbers = {entry.number for entry in pending}
+        for entry in jobs:
+            if entry.number not in pending_numbers:
+                path = book_manager.section_path(title, entry.chapter_number, entry.section_number)
+                with open(path, 'r', encoding='utf-8') as f:
+                    continuity.add(entry.number, f.read())
+        book_manager.add_section_listener(continuity.section_written)
+
+    # Write every chapter and section, several debates at a time if configured
+    with metrics.labels(book=title):
+        first_responses = {}
+        replaying = client_registry.response_cache and client_registry.response_cache.mode == "replay"
+        if BATCH.get("enabled") and pending and not replaying:
+            first_responses = batch_first_turns(book_manager, title, toc, structure, pending, continuity)
+        if use_async:
+            asyncio.run(write_sections_async(book_manager, title, toc, structure, max_workers, pending, manifest,
+                                             first_responses, continuity))
         else:
-            irc_logger.error(f"Chapter file {chapter_filename} does not exist.")
+            write_sections(book_manager, title, toc, structure, max_workers, pending, manifest, first_responses, continuity)
 
-    # Write the final book to the book directory
-    final_book_filename = "final_book.md"
-    book_manager.write_content(title, final_book_filename, final_book_content)
+    # Section files may still be queued for the write-behind thread
+    book_manager.flush()
+    irc_logger.system_message("All sections have been processed.")
 
-    irc_logger.system_message(f"Final book compiled successfully at {os.path.join(book_manager.create_book_directory(title), final_book_filename)}")
+    # Compile sections into chapters
+    compile_chapters(book_manager, title, structure)
 
-def main():
-    irc_logger.system_message("Enter a book topic:")
-    topic = input().strip()
+    # Compile chapters into the final book
+    compile_final_book(book_manager, title, structure)
+
+    report_metrics(book_manager, title)
+    if budget and budget.enabled:
+        spent = budget.spent()
+        irc_logger.info(
+            f"Budget: {spent['calls']} calls, {spent['tokens']} tokens, {spent['seconds']:.0f}s spent "
+            f"({budget.remaining_share():.0%} left)"
+        )
+
+def report_metrics(book_manager, title):
+    """Write the book's metrics rollup and refresh the Prometheus text file."""
+    if not metrics.enabled:
+        return
+    rollup = metrics.rollup(title)
+    rollup_path = os.path.join(book_manager.create_book_directory(title), "metrics_rollup.json")
+    with open(rollup_path, 'w', encoding='utf-8') as f:
+        json.dump(rollup, f, indent=2)
+    metrics.write_prometheus()
+    irc_logger.info(
+        f"Metrics: {rollup['calls']} agent calls, {rollup['seconds']:.1f}s in calls, "
+        f"{rollup['prompt_tokens']} prompt / {rollup['completion_tokens']} completion tokens "
+        f"(details in {rollup_path})"
+    )
+
+def load_book(book_dir):
+    """
+    Load the saved title and ToC of an existing book directory.
+
+    Args:
+        book_dir (str): The book directory, e.g. books/my_book.
+
+    Returns:
+        tuple: (BookManager, title, toc), or None if the book cannot be loaded.
+    """
+    book_dir = os.path.normpath(book_dir)
+    book_manager = BookManager(base_path=os.path.dirname(book_dir) or ".")
+
+    try:
+        with open(os.path.join(book_dir, "title.txt"), 'r', encoding='utf-8') as f:
+            title = f.read().strip()
+        with open(os.path.join(book_dir, "table_of_contents.txt"), 'r', encoding='utf-8') as f:
+            toc = f.read()
+    except OSError as e:
+        irc_logger.error(f"Cannot load {book_dir}: {e}")
+        return None
+
+    if os.path.normpath(book_manager.create_book_directory(title)) != book_dir:
+        irc_logger.error(f"{book_dir} does not match the directory for title '{title}'.")
+        return None
+    return book_manager, title, toc
+
+def compile_only(book_dir, force=False):
+    """
+    Rebuild the chapters and final book of an existing book directory.
+
+    Only chapters whose sections changed (for example after a manual edit)
+    are recompiled; the final book is re-linked if anything changed.
+
+    Args:
+        book_dir (str): The book directory, e.g. books/my_book.
+        force (bool): Rebuild everything regardless of the build state.
+    """
+    loaded = load_book(book_dir)
+    if loaded is None:
+        return
+    book_manager, title, toc = loaded
+    structure = BookStructure.load(book_manager.create_book_directory(title), toc)
+    compile_chapters(book_manager, title, structure, force=force)
+    compile_final_book(book_manager, title, structure, force=force)
+
+def resume_book(book_dir, max_workers=1, use_async=False, queue=None):
+    """
+    Continue an interrupted run from its book directory.
+
+    The saved title and ToC are reused; only sections that are missing or
+    failed are generated again. Sections edited by hand are kept.
+
+    Args:
+        book_dir (str): The book directory, e.g. books/my_book.
+        max_workers (int): Maximum number of debates running at once.
+        use_async (bool): Run the debates on an event loop instead of a thread pool.
+        queue (SectionQueue, optional): Queue the sections for workers instead of writing them.
+    """
+    loaded = load_book(book_dir)
+    if loaded is None:
+        return
+    book_manager, title, toc = loaded
+    manifest = BookManifest(book_manager.create_book_directory(title))
+
+    irc_logger.system_message(f"Resuming '{title}' from {book_dir}")
+    if not manifest.phase_done("title"):
+        manifest.mark_phase("title", "done", title)
+    if not manifest.phase_done("toc"):
+        manifest.mark_phase("toc", "done", toc)
+
+    with BookBudget().activate(), Transcript().activate() as transcript:
+        transcript.attach(book_manager.create_book_directory(title))
+        write_book(book_manager, title, toc, manifest, max_workers, use_async, queue)
+
+def run_book(topic, max_workers=1, use_async=False, base_path=None, queue=None):
+    """
+    Generate a complete book for a topic: title, ToC, sections and compilation.
+
+    The whole run shares one BookBudget built from BUDGET in src/config.py,
+    and every agent turn is recorded in the book's transcript.
+
+    Args:
+        topic (str): The book topic.
+        max_workers (int): Maximum number of debates running at once.
+        use_async (bool): Run the debates on an event loop instead of a thread pool.
+        base_path (str, optional): Directory books are written under.
+        queue (SectionQueue, optional): Queue the sections for workers instead of writing them.
 
+    Returns:
+        str: The book directory, or None if the title or ToC phase failed.
+    """
+    with BookBudget().activate(), Transcript().activate():
+        return _run_book(topic, max_workers, use_async, base_path, queue)
+
+def _run_book(topic, max_workers, use_async, base_path, queue=None):
+    """run_book() body, run with the book budget and transcript active."""
     # Generate title
     title_gen = TitleGenerator(topic)
-    title = title_gen.generate()
-
+    with metrics.labels(topic=topic):
+        title = title_gen.generate()
     if title:
         irc_logger.system_message(f"Final Book Title: {title}")
+        # Count the title debate towards the book's rollup
+        metrics.relabel_book(topic, title)
     else:
         irc_logger.error("Failed to generate a book title.")
-        return  # Exit if title generation fails
+        return None  # Exit if title generation fails
 
     # Initialize BookManager
-    book_manager = BookManager()
+    book_manager = BookManager(base_path) if base_path else BookManager()
 
     # Create book directory
     book_path = book_manager.create_book_directory(title)
     irc_logger.system_message(f"Book directory created at: {book_path}")
+    # The title debate was buffered until the directory existed
+    current_transcript().attach(book_path)
 
     # Save the book title
     book_manager.write_content(title, "title.txt", title)
+    manifest = BookManifest(book_path, fresh=True)
+    manifest.mark_phase("title", "done", title)
 
     # Generate Table of Contents
     toc_generator = TableOfContentsGenerator(title)
-    toc = toc_generator.generate()
+    with metrics.labels(book=title):
+        toc = toc_generator.generate()
 
     if toc:
         irc_logger.system_message("Final Table of Contents:")
         irc_logger.print_content(toc)
         # Save the ToC
         book_manager.write_content(title, "table_of_contents.txt", toc)
+        manifest.mark_phase("toc", "done", toc)
     else:
+        manifest.mark_phase("toc", "failed")
         irc_logger.error("Failed to generate the table of contents.")
-        return  # Exit if ToC generation fails
-
-    # Parse the ToC
-    chapters = parse_toc(toc)
-
-    # Loop through each chapter and section
-    for chapter in chapters:
-        chapter_number = chapter['number']
-        chapter_title = chapter['title']
-        
-        if not chapter['sections']:
-            # No sub-sections; treat the chapter itself as a section
-            irc_logger.system_message(f"Writing Chapter {chapter_number}: {chapter_title}")
-
-            # print("\nDebug values before creating SectionWriter:")
-            # print(f"title: {title}")
-            # print(f"toc: {toc}")
-            # print(f"chapter_number: {chapter_number}")
-            # print(f"chapter_title: {chapter_title}")
-            
-            # Create a SectionWriter instance for the chapter
-            section_writer = SectionWriter(
-                book_title=title,
-                full_toc=toc,
-                section_number=chapter_number,
-                section_title=chapter_title
+        return None  # Exit if ToC generation fails
+
+    write_book(book_manager, title, toc, manifest, max_workers, use_async, queue)
+    return book_path
+
+class QueueBooks:
+    """Books loaded by a queue worker, with their parsed ToC and continuity index."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._books = {}
+
+    def get(self, book_path):
+        """Return (book_manager, title, toc, structure, continuity) for a book directory, or None."""
+        with self._lock:
+            if book_path not in self._books:
+                self._books[book_path] = self._load(book_path)
+            return self._books[book_path]
+
+    @staticmethod
+    def _load(book_path):
+        loaded = load_book(book_path)
+        if loaded is None:
+            return None
+        book_manager, title, toc = loaded
+        structure = BookStructure.load(book_path, toc)
+        # Seeded with the sections on disk now; later ones only if written by this process
+        continuity = ContinuityIndex(title, structure)
+        if continuity.enabled:
+            for entry in structure.units():
+                path = book_manager.section_path(title, entry.chapter_number, entry.section_number)
+                if os.path.exists(path):
+                    with open(path, 'r', encoding='utf-8') as f:
+                        continuity.add(entry.number, f.read())
+            book_manager.add_section_listener(continuity.section_written)
+        return book_manager, title, toc, structure, continuity
+
+def _heartbeat(queue, job, stop):
+    """Renew a job's lease until stop is set or the lease is lost."""
+    while not stop.wait(queue.settings["heartbeat_seconds"]):
+        if not queue.heartbeat(job):
+            irc_logger.warning(f"Lost the lease on Section {job.number}; another worker may rewrite it.")
+            return
+
+def write_queued_job(queue, books, job):
+    """
+    Write one claimed section, renewing its lease meanwhile, and report the outcome.
+
+    The debate is recorded in the book's transcript and runs under the
+    book's budget: what every worker has spent on the book so far, shared
+    between the sections still unfinished. The job's own usage is added to
+    the book's total in the queue afterwards.
+    """
+    book = books.get(job.book)
+    entry = book[3].get(job.number) if book else None
+    if entry is None:
+        queue.complete(job, False, error="book or section not found")
+        irc_logger.error(f"Cannot write {job.number} of {job.book}: book or section not found.")
+        return
+    book_manager, title, toc, structure, continuity = book
+
+    irc_logger.system_message(f"Writing {job.number}: {job.title} of '{title}' (attempt {job.attempts})")
+    job_usage = UsageTracker()
+    budget = BookBudget(tracker=job_usage, spent_before=queue.book_spent(job.book))
+    budget.plan_sections(queue.unfinished(job.book))
+    stop = threading.Event()
+    heartbeat = threading.Thread(target=_heartbeat, args=(queue, job, stop), daemon=True)
+    heartbeat.start()
+    try:
+        with usage_tracker.capture(into=job_usage), budget.activate(), Transcript().activate() as transcript:
+            transcript.attach(job.book)
+            with metrics.labels(book=title):
+                content = write_unit(title, toc, structure, entry, continuity=continuity)
+            save_unit(book_manager, title, entry, content)
+        # The file must be on disk before the job counts as done
+        book_manager.flush()
+    except Exception as e:
+        irc_logger.error(f"Error while writing {job.number}: {str(e)}")
+        content = None
+    finally:
+        stop.set()
+        heartbeat.join()
+    usage = job_usage.snapshot()
+    queue.add_spent(job.book, usage["calls"], usage["prompt_tokens"] + usage["completion_tokens"])
+    if not queue.complete(job, bool(content), error=None if content else "no content"):
+        irc_logger.warning(f"Section {job.number} was finished after its lease expired.")
+
+def compile_queued_book(queue, books, book_path):
+    """
+    Compile a queued book once all its jobs are finished, if no other worker took it first.
+
+    The manifest is written here, from the queue, so that workers never
+    rewrite it concurrently.
+    """
+    if not queue.claim_compile(book_path):
+        return
+    book = books.get(book_path)
+    if book is None:
+        queue.mark_compiled(book_path, ok=False)
+        return
+    book_manager, title, toc, structure, continuity = book
+    try:
+        manifest = BookManifest(book_path)
+        failed = 0
+        for number, state in queue.book_jobs(book_path).items():
+            entry = structure.get(number)
+            if entry is None:
+                continue
+            if state == "done":
+                manifest.mark_section(number, "done", book_manager.section_path(title, entry.chapter_number, entry.section_number))
+            else:
+                manifest.mark_section(number, "failed")
+                failed += 1
+        if failed:
+            irc_logger.warning(f"{failed} sections of '{title}' failed; resume the book to retry them.")
+        compile_chapters(book_manager, title, structure)
+        compile_final_book(book_manager, title, structure)
+        report_metrics(book_manager, title)
+        budget = BookBudget(spent_before=queue.book_spent(book_path))
+        if budget.enabled:
+            spent = budget.spent()
+            irc_logger.info(
+                f"Budget: {spent['calls']} calls, {spent['tokens']} tokens, {spent['seconds']:.0f}s spent "
+                f"({budget.remaining_share():.0%} left)"
             )
+    except Exception as e:
+        irc_logger.error(f"Compiling '{title}' failed: {str(e)}")
+        if queue.mark_compiled(book_path, ok=False) == "failed":
+            irc_logger.error(f"Giving up on compiling '{title}'; resume the book to try again.")
+        return
+    queue.mark_compiled(book_path)
+
+def _queue_worker(queue, books, wait):
+    """One worker thread: claim and write sections until the queue runs dry."""
+    worker = worker_id()
+    while True:
+        job = queue.claim(worker)
+        if job is not None:
+            write_queued_job(queue, books, job)
+            continue
+        for book_path in queue.ready_books():
+            compile_queued_book(queue, books, book_path)
+        # Sections leased by others may still come back if their worker dies
+        if not wait and not queue.has_work():
+            return
+        time.sleep(queue.settings["poll_interval"])
+
+def work_queue(queue, max_workers=1, wait=False):
+    """
+    Claim sections from a SectionQueue and write them until none are left.
+
+    Any number of these may run, in separate processes or on other hosts
+    sharing the queue file and the books directory. Each claimed section
+    is leased and the lease renewed while its debate runs; the worker that
+    finishes a book's last section compiles it.
 
-            # Generate the chapter content
-            section_content = section_writer.write()
+    Args:
+        queue (SectionQueue): The queue to work.
+        max_workers (int): Sections written at once by this process.
+        wait (bool): Keep polling for new books instead of exiting when the queue is empty.
+    """
+    books = QueueBooks()
+    irc_logger.system_message(f"Working the section queue {queue.path} with {max_workers} workers.")
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(contextvars.copy_context().run, _queue_worker, queue, books, wait)
+                   for _ in range(max_workers)]
+        for future in as_completed(futures):
+            future.result()
+    for book_path, book in queue.status().items():
+        counts = ", ".join(f"{count} {state}" for state, count in sorted(book["jobs"].items()))
+        irc_logger.info(f"Queue: '{book['title']}' {book['state']} ({counts})")
+
+def read_batch_topics(source):
+    """
+    Read book topics for a batch run from a JSONL file, or stdin for '-'.
+
+    Each line is an object with a "topic" key (or a bare JSON string); blank
+    lines and lines starting with '#' are skipped.
 
-            if section_content:
-                # Write the chapter content to the filesystem
-                book_manager.write_section(title, chapter_number, None, section_content)
+    Returns:
+        list: The topics, in file order.
+    """
+    f = sys.stdin if source == "-" else open(source, 'r', encoding='utf-8')
+    try:
+        topics = []
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            try:
+                item = json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"{source}:{number}: not valid JSON ({e})") from None
+            topic = item.get("topic") if isinstance(item, dict) else item
+            if not isinstance(topic, str) or not topic.strip():
+                raise ValueError(f"{source}:{number}: no topic")
+            topics.append(topic.strip())
+        return topics
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+# Per-book log directory of the batch this worker process belongs to
+_batch_log_dir = None
+
+def _init_batch_worker(args, log_dir, base_path):
+    """
+    ProcessPoolExecutor initializer: apply the CLI settings once per worker.
+
+    Clients, the response cache and the rate limiter are then shared by every
+    book the worker writes. Console output is cut to warnings; each book
+    logs in full to its own file under log_dir. Metrics go back to the
+    parent with each result, which writes the one Prometheus file.
+    """
+    global _batch_log_dir
+    _batch_log_dir = log_dir
+    apply_settings(args)
+    if not args.log_level:
+        irc_logger.configure(level="warning")
+    metrics.set_output_dir(base_path)
+    metrics.settings["prometheus_filename"] = None
+
+def _batch_book(index, topic, max_workers, use_async, base_path):
+    """Write one book of a batch in a worker process and return its summary row."""
+    log_path = os.path.join(_batch_log_dir, f"book_{index:04d}.log")
+    irc_logger.configure(file=log_path, queued=True)
+    started = time.monotonic()
+    result = {"index": index, "topic": topic, "status": "failed", "book_path": None,
+              "sections_failed": 0, "log": log_path, "pid": os.getpid()}
+    try:
+        book_path = run_book(topic, max_workers, use_async, base_path=base_path)
+        if book_path:
+            manifest = BookManifest(book_path)
+            failed = [key for key, entry in manifest.data["sections"].items() if entry.get("state") != "done"]
+            result.update(book_path=book_path, sections_failed=len(failed),
+                          status="done" if not failed else "incomplete")
+    except Exception as e:
+        irc_logger.error(f"Book '{topic}' failed: {str(e)}")
+        result.update(status="error", error=str(e))
+    finally:
+        irc_logger.configure(file=None, queued=False)
+    result["seconds"] = round(time.monotonic() - started, 3)
+    # Everything this process recorded so far; the parent keeps the latest per process
+    result["metrics"] = metrics.aggregates()
+    return result
+
+def run_batch(args, topics, processes, max_workers=1, use_async=False, base_path=None):
+    """
+    Write many books in parallel on a process pool and report on each.
+
+    Args:
+        args (argparse.Namespace): CLI options, re-applied in every worker.
+        topics (list): One book per topic.
+        processes (int): Worker processes (books written at once).
+        max_workers (int): Concurrent section debates per book.
+        use_async (bool): Run each book's debates on an event loop.
+        base_path (str, optional): Directory books are written under.
+
+    Returns:
+        dict: The summary report, also written as JSON under base_path.
+    """
+    if not topics:
+        irc_logger.warning("No topics to write.")
+        return None
+    base_path = base_path or OUTPUT_DIR
+    run_id = time.strftime("%Y%m%d_%H%M%S")
+    log_dir = os.path.join(base_path, "batch_logs", run_id)
+    os.makedirs(log_dir, exist_ok=True)
+    processes = max(1, min(processes, len(topics)))
+    # Every worker has its own limiter, so the quota is split between them
+    worker_args = argparse.Namespace(**vars(args))
+    if args.rpm:
+        worker_args.rpm = max(1, args.rpm // processes)
+    if args.tpm:
+        worker_args.tpm = max(1, args.tpm // processes)
+    worker_args.log_file = None
+
+    irc_logger.system_message(f"Writing {len(topics)} books on {processes} worker processes (logs in {log_dir}).")
+    started = time.monotonic()
+    results = []
+    worker_metrics = {}
+    # spawn: workers must not inherit the parent's threads or open connections
+    with ProcessPoolExecutor(max_workers=processes, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_init_batch_worker, initargs=(worker_args, log_dir, base_path)) as executor:
+        futures = {
+            executor.submit(_batch_book, index, topic, max_workers, use_async, base_path): (index, topic)
+            for index, topic in enumerate(topics, 1)
+        }
+        for future in as_completed(futures):
+            index, topic = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                # The worker process itself died
+                result = {"index": index, "topic": topic, "status": "error", "error": str(e), "seconds": None}
+            aggregates = result.pop("metrics", None)
+            if aggregates is not None:
+                worker_metrics[result["pid"]] = aggregates
+            results.append(result)
+            status = result["status"]
+            message = f"[{len(results)}/{len(topics)}] {topic}: {status}"
+            if result.get("seconds") is not None:
+                message += f" in {result['seconds']:.0f}s"
+            if status == "done":
+                irc_logger.success(message)
             else:
-                irc_logger.error(f"Failed to write Chapter {chapter_number}.")
-        else:
-            # Process each sub-section
-            for section in chapter['sections']:
-                section_number = section['number']
-                section_title = section['title']
-
-                irc_logger.system_message(f"Writing Section {section_number}: {section_title}")
-
-                # Create a SectionWriter instance
-                section_writer = SectionWriter(
-                    book_title=title,
-                    full_toc=toc,
-                    section_number=section_number,
-                    section_title=section_title
-                )
-
-                # Generate the section content
-                section_content = section_writer.write()
-
-                if section_content:
-                    # Write the section content to the filesystem
-                    book_manager.write_section(title, chapter_number, section_number, section_content)
-                else:
-                    irc_logger.error(f"Failed to write Section {section_number}.")
+                irc_logger.warning(message)
 
-    irc_logger.system_message("All sections have been processed.")
+    if metrics.enabled:
+        metrics.set_output_dir(base_path)
+        for aggregates in worker_metrics.values():
+            metrics.merge(aggregates)
+        metrics.write_prometheus()
 
-    # Compile sections into chapters
-    compile_chapters(book_manager, title, chapters)
+    results.sort(key=lambda result: result["index"])
+    statuses = [result["status"] for result in results]
+    report = {
+        "started": run_id,
+        "elapsed_seconds": round(time.monotonic() - started, 3),
+        "processes": processes,
+        "books": len(results),
+        "done": statuses.count("done"),
+        "incomplete": statuses.count("incomplete"),
+        "failed": len(results) - statuses.count("done") - statuses.count("incomplete"),
+        "results": results,
+    }
+    report_path = os.path.join(base_path, f"batch_report_{run_id}.json")
+    with open(report_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    irc_logger.system_message(
+        f"Batch finished: {report['done']} done, {report['incomplete']} incomplete, {report['failed']} failed "
+        f"in {report['elapsed_seconds']:.0f}s (report in {report_path})"
+    )
+    return report
 
-    # Compile chapters into the final book
-    compile_final_book(book_manager, title, chapters)
+def apply_settings(args):
+    """
+    Apply the command-line options to the logger, client registry and src/config.py settings.
+
+    Batch workers call this again in their own process.
+    """
+    log_settings = {}
+    if args.log_level:
+        log_settings["level"] = args.log_level
+    if args.log_file:
+        log_settings.update(file=args.log_file, queued=True)
+    if args.preview:
+        log_settings["preview_chars"] = args.preview
+    if log_settings:
+        irc_logger.configure(**log_settings)
+
+    if args.backend == "stub":
+        client_registry.use_stub_backend()
+    if args.cache:
+        client_registry.enable_response_cache(mode=args.cache)
+    if args.no_retry:
+        client_registry.configure_resilience(enabled=False)
+    elif args.hedge:
+        client_registry.configure_resilience(hedge=True)
+    if args.rpm or args.tpm:
+        client_registry.enable_rate_limit(requests_per_minute=args.rpm, tokens_per_minute=args.tpm)
+    if args.history_window:
+        HISTORY.update(enabled=True, keep_last_turns=args.history_window)
+    if args.stream:
+        STREAMING["enabled"] = True
+        # Tokens of concurrent debates would interleave on one console line
+        if args.workers > 1:
+            STREAMING["live_output"] = False
+    if args.best_of:
+        for phase in (TITLE_GENERATION, TOC_GENERATION):
+            phase["mode"] = "best_of_n"
+            phase["candidates"] = args.best_of
+    if args.batch_first_turns:
+        BATCH["enabled"] = True
+    if args.budget_tokens:
+        BUDGET["max_tokens"] = args.budget_tokens
+    if args.budget_calls:
+        BUDGET["max_calls"] = args.budget_calls
+    if args.budget_minutes:
+        BUDGET["max_seconds"] = args.budget_minutes * 60
+
+def positive_int(value):
+    """argparse type for counts that must be at least 1."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return number
+
+def main():
+    parser = argparse.ArgumentParser(description="Collaboratively write a book with Zero and Gustave.")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=SECTION_GENERATION.get("max_workers", 1),
+        help="Number of section debates to run concurrently (default: %(default)s)."
+    )
+    parser.add_argument(
+        "--async",
+        dest="use_async",
+        action="store_true",
+        help="Run section debates as coroutines on one event loop instead of a thread pool."
+    )
+    parser.add_argument(
+        "--cache",
+        choices=ResponseCache.MODES,
+        help="Serve identical agent calls from the on-disk response cache "
+             "(replay never calls the API and fails on a miss)."
+    )
+    parser.add_argument(
+        "--resume",
+        metavar="BOOK_DIR",
+        help="Continue an interrupted book, regenerating only missing or failed sections."
+    )
+    parser.add_argument(
+        "--batch",
+        metavar="FILE",
+        help="Write one book per topic in a JSONL file ('-' for stdin) on a process pool, without prompting."
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Books written at once with --batch (default: %(default)s)."
+    )
+    parser.add_argument(
+        "--queue",
+        metavar="PATH",
+        help="Queue sections in a SQLite file that worker processes claim, then work the queue here too."
+    )
+    parser.add_argument(
+        "--worker",
+        action="store_true",
+        help="With --queue, only write sections claimed from the queue (any number of processes or hosts)."
+    )
+    parser.add_argument(
+        "--wait",
+        action="store_true",
+        help="With --worker, keep polling for new books instead of exiting when the queue is empty."
+    )
+    parser.add_argument(
+        "--compile-only",
+        metavar="BOOK_DIR",
+        help="Rebuild only the chapters whose sections changed, then re-link the final book."
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="With --compile-only, rebuild every chapter even if it is up to date."
+    )
+    parser.add_argument(
+        "--backend",
+        choices=("openai", "stub"),
+        help="LLM backend; 'stub' uses the local StubBackend instead of the API."
+    )
+    parser.add_argument(
+        "--rpm",
+        type=int,
+        help="Requests-per-minute quota; enables the shared rate limiter with adaptive concurrency."
+    )
+    parser.add_argument(
+        "--tpm",
+        type=int,
+        help="Tokens-per-minute quota; enables the shared rate limiter with adaptive concurrency."
+    )
+    parser.add_argument(
+        "--hedge",
+        action="store_true",
+        help="Send a duplicate request when an agent call runs past its phase's p95 latency."
+    )
+    parser.add_argument(
+        "--no-retry",
+        action="store_true",
+        help="Disable agent call timeouts, retries and hedging."
+    )
+    parser.add_argument(
+        "--budget-tokens",
+        type=int,
+        help="Token budget for the whole book; debates shorten and force consensus as it runs out."
+    )
+    parser.add_argument(
+        "--budget-calls",
+        type=int,
+        help="Agent call budget for the whole book."
+    )
+    parser.add_argument(
+        "--budget-minutes",
+        type=float,
+        help="Wall-clock budget for the whole book."
+    )
+    parser.add_argument(
+        "--best-of",
+        type=positive_int,
+        metavar="N",
+        help="Pick the title and ToC from N candidates generated in parallel instead of debating them."
+    )
+    parser.add_argument(
+        "--batch-first-turns",
+        action="store_true",
+        help="Submit the opening turn of every section as one batch before the debates start."
+    )
+    parser.add_argument(
+        "--history-window",
+        type=positive_int,
+        metavar="TURNS",
+        help="Resend only the last TURNS debate turns verbatim and summarize older ones."
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Stream agent replies token by token and stop each turn at its HANDOFF line."
+    )
+    parser.add_argument(
+        "--log-level",
+        choices=tuple(IRCLogger.LEVELS),
+        help="Hide console messages below this level."
+    )
+    parser.add_argument(
+        "--log-file",
+        metavar="PATH",
+        help="Append a plain-text copy of every message to PATH; console output is then queued."
+    )
+    parser.add_argument(
+        "--preview",
+        type=int,
+        metavar="CHARS",
+        help="Cut agent messages on the console to CHARS characters."
+    )
+    args = parser.parse_args()
+    max_workers = max(1, args.workers)
+
+    apply_settings(args)
+
+    if args.compile_only:
+        compile_only(args.compile_only, force=args.force)
+        return
+
+    if args.batch:
+        run_batch(args, read_batch_topics(args.batch), args.processes, max_workers, args.use_async)
+        return
+
+    queue = SectionQueue(args.queue) if args.queue else None
+    if args.worker and queue is None:
+        parser.error("--worker needs --queue")
+
+    if args.resume:
+        resume_book(args.resume, max_workers, args.use_async, queue)
+    elif not args.worker:
+        irc_logger.system_message("Enter a book topic:")
+        irc_logger.flush()
+        topic = input().strip()
+        run_book(topic, max_workers, args.use_async, queue=queue)
+    if queue is not None:
+        work_queue(queue, max_workers, wait=args.wait)
+
+    stats = client_registry.stats.snapshot()
+    irc_logger.info(
+        f"LLM connections: {stats['requests']} requests over {stats['connections_opened']} connections "
+        f"({stats['connection_reuse_ratio']:.0%} reused)"
+    )
+    if client_registry.response_cache:
+        cache = client_registry.response_cache.snapshot()
+        irc_logger.info(
+            f"Response cache ({cache['mode']}): {cache['hits']} hits, {cache['misses']} misses, "
+            f"{cache['entries']} entries, {cache['bytes'] / 1e6:.1f} MB"
+        )
+    resilience = client_registry.resilience_stats()
+    if resilience.get("retries") or resilience.get("timeouts") or resilience.get("hedges"):
+        irc_logger.info(
+            f"Agent calls: {resilience['retries']} retries, {resilience['timeouts']} timeouts, "
+            f"{resilience['hedges']} hedged ({resilience['hedge_wins']} won by the duplicate)"
+        )
+    if client_registry.rate_limiter:
+        limiter = client_registry.rate_limiter.snapshot()
+        irc_logger.info(
+            f"Rate limiter: {limiter['calls']} calls, {limiter['rate_limited']} rate-limited, "
+            f"{limiter['waited_seconds']:.1f}s waited, concurrency {limiter['concurrency']:.1f} "
+            f"(peak {limiter['peak_concurrency']:.1f})"
+        )
+    usage = usage_tracker.snapshot()
+    irc_logger.info(
+        f"Token usage: {usage['prompt_tokens']} prompt ({usage['cached_tokens']} cached, "
+        f"{usage['cache_hit_rate']:.0%} hit rate), {usage['completion_tokens']} completion over {usage['calls']} calls"
+    )
 
 if __name__ == "__main__":
     main()
@@ -1 +1,12 @@
 from .agents import Agents
+from .usage import UsageTracker, usage_tracker
+from .response_cache import CacheMissError, ResponseCache
+from .stub_backend import StubBackend, StubBackendError, StubRateLimitError
+from .rate_limit import RateLimiter, RateLimitedOpenAI
+from .resilience import AgentCallTimeout, AsyncResilientSwarm, ResilientSwarm
+from .client_registry import ClientRegistry, client_registry
+from .async_agents import AsyncAgents, AsyncSwarm
+from .history import HistoryPolicy, estimate_tokens
+from .debate import run_debate, arun_debate
+from .streaming import MarkerParser, StreamingRunner
+from .batch import BatchRunner, LocalBatchBackend, OpenAIBatchBackend
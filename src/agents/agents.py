@@ -1,10 +1,13 @@
 # src/agents/agents.py
 
-from swarm import Agent, Swarm
+from swarm import Agent
+
+from .client_registry import client_registry
 
 class Agents:
-    def __init__(self):
-        self.client = Swarm()
+    def __init__(self, client=None):
+        # Reuse the process-wide client so HTTP connections are shared
+        self.client = client or client_registry.get_swarm()
 
     def get_zero(self, instructions, handoff_func):
         """Get Zero agent with specific instructions"""
@@ -21,3 +24,10 @@ class Agents:
             instructions=instructions,
             functions=[handoff_func]
         )
+
+    def get_judge(self, instructions):
+        """Get the Judge agent that picks a winner among candidates"""
+        return Agent(
+            name="Judge",
+            instructions=instructions
+        )
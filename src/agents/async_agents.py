@@ -0,0 +1,108 @@
+# src/agents/async_agents.py
+
+import copy
+import json
+from collections import defaultdict
+
+from openai import AsyncOpenAI
+from swarm import Swarm
+from swarm.types import Response
+from swarm.util import debug_print, function_to_json
+
+from .agents import Agents
+from .client_registry import client_registry
+
+# Swarm hides this parameter from the model and injects it into tool calls
+CTX_VARS_NAME = "context_variables"
+
+class AsyncSwarm(Swarm):
+    """
+    Swarm client whose run() is a coroutine backed by AsyncOpenAI.
+
+    Tool handling (including Zero/Gustave handoff functions) and
+    context_variables behave exactly as in Swarm.run; only the network call
+    is awaited, so many debates can share a single event loop.
+    """
+
+    def __init__(self, client=None):
+        super().__init__(client=client or AsyncOpenAI())
+
+    async def get_chat_completion(self, agent, history, context_variables, model_override, stream, debug):
+        context_variables = defaultdict(str, context_variables)
+        instructions = (
+            agent.instructions(context_variables)
+            if callable(agent.instructions)
+            else agent.instructions
+        )
+        messages = [{"role": "system", "content": instructions}] + history
+        debug_print(debug, "Getting chat completion for...:", messages)
+
+        tools = [function_to_json(f) for f in agent.functions]
+        # Hide context_variables from the model
+        for tool in tools:
+            params = tool["function"]["parameters"]
+            params["properties"].pop(CTX_VARS_NAME, None)
+            if CTX_VARS_NAME in params["required"]:
+                params["required"].remove(CTX_VARS_NAME)
+
+        create_params = {
+            "model": model_override or agent.model,
+            "messages": messages,
+            "tools": tools or None,
+            "tool_choice": agent.tool_choice,
+            "stream": stream,
+        }
+        if tools:
+            create_params["parallel_tool_calls"] = agent.parallel_tool_calls
+
+        return await self.client.chat.completions.create(**create_params)
+
+    async def run(self, agent, messages, context_variables={}, model_override=None,
+                  stream=False, debug=False, max_turns=float("inf"), execute_tools=True):
+        """Coroutine counterpart of Swarm.run (streaming is not supported)."""
+        if stream:
+            raise NotImplementedError("AsyncSwarm.run does not support stream=True")
+
+        active_agent = agent
+        context_variables = copy.deepcopy(context_variables)
+        history = copy.deepcopy(messages)
+        init_len = len(messages)
+
+        while len(history) - init_len < max_turns and active_agent:
+            completion = await self.get_chat_completion(
+                agent=active_agent,
+                history=history,
+                context_variables=context_variables,
+                model_override=model_override,
+                stream=stream,
+                debug=debug,
+            )
+            message = completion.choices[0].message
+            debug_print(debug, "Received completion:", message)
+            message.sender = active_agent.name
+            history.append(json.loads(message.model_dump_json()))
+
+            if not message.tool_calls or not execute_tools:
+                debug_print(debug, "Ending turn.")
+                break
+
+            # Handoff functions are plain Python calls, so Swarm's sync handler is reused
+            partial_response = self.handle_tool_calls(
+                message.tool_calls, active_agent.functions, context_variables, debug
+            )
+            history.extend(partial_response.messages)
+            context_variables.update(partial_response.context_variables)
+            if partial_response.agent:
+                active_agent = partial_response.agent
+
+        return Response(
+            messages=history[init_len:],
+            agent=active_agent,
+            context_variables=context_variables,
+        )
+
+class AsyncAgents(Agents):
+    """Agents factory backed by an AsyncSwarm client."""
+
+    def __init__(self, client=None):
+        self.client = client or client_registry.get_async_swarm()
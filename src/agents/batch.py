@@ -0,0 +1,221 @@
+# src/agents/batch.py
+
+import json
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from openai.types.chat import ChatCompletion
+from swarm import Swarm
+
+from src.config import BATCH
+
+ENDPOINT = "/v1/chat/completions"
+
+class _Completions:
+    def __init__(self, create):
+        self.create = create
+
+class _Chat:
+    def __init__(self, create):
+        self.completions = _Completions(create)
+
+class _CapturingClient:
+    """Chat client that returns the create() parameters instead of calling an API."""
+
+    def __init__(self):
+        self.chat = _Chat(lambda **params: params)
+
+class _ReplayClient:
+    """Chat client that answers with one completion fetched from a batch."""
+
+    def __init__(self, completion):
+        self.chat = _Chat(lambda **params: completion)
+
+def chat_request(agent, messages, context_variables={}, model_override=None, **kwargs):
+    """
+    Build the chat completions body Swarm would send for a client.run request.
+
+    Args:
+        agent (Agent): The agent taking the turn.
+        messages (list): The conversation history.
+        context_variables (dict): Swarm context variables.
+        model_override (str, optional): Model to use instead of agent.model.
+
+    Returns:
+        dict: A JSON-serializable request body.
+    """
+    params = Swarm(client=_CapturingClient()).get_chat_completion(
+        agent=agent,
+        history=list(messages),
+        context_variables=context_variables,
+        model_override=model_override,
+        stream=False,
+        debug=False,
+    )
+    return {key: value for key, value in params.items() if value is not None and key != "stream"}
+
+def batch_response(completion, agent, messages, context_variables={}, execute_tools=True, **kwargs):
+    """
+    Turn a batched chat completion into the Response client.run would return.
+
+    Swarm.run is replayed against the completion, so tool calls and handoffs
+    are handled exactly as for a live turn.
+    """
+    return Swarm(client=_ReplayClient(completion)).run(
+        agent=agent,
+        messages=messages,
+        context_variables=context_variables,
+        max_turns=1,
+        execute_tools=execute_tools,
+    )
+
+class LocalBatchBackend:
+    """
+    Stand-in for the OpenAI Batch API.
+
+    submit() answers every line of the batch file before it returns, up to
+    ``max_workers`` requests at a time, through an ordinary chat client (for
+    example the StubBackend, behind the shared rate limiter). Results are
+    written in the Batch API's output format, in input order.
+    """
+
+    def __init__(self, client, max_workers=None):
+        self.client = client
+        self.max_workers = max_workers or BATCH["local_workers"]
+        self._jobs = {}
+
+    def submit(self, input_path):
+        batch_id = f"batch_local_{uuid.uuid4().hex[:12]}"
+        output_path = input_path.replace("_input.jsonl", "_output.jsonl")
+        job = {"status": "in_progress", "output_path": output_path}
+        self._jobs[batch_id] = job
+        self._process(job, input_path)
+        return batch_id
+
+    def _answer(self, line):
+        request = json.loads(line)
+        result = {"custom_id": request["custom_id"], "response": None, "error": None}
+        try:
+            completion = self.client.chat.completions.create(**request["body"])
+            result["response"] = {"status_code": 200, "body": completion.model_dump(mode="json")}
+        except Exception as e:
+            result["error"] = {"message": str(e)}
+        return json.dumps(result) + '\n'
+
+    def _process(self, job, input_path):
+        try:
+            with open(input_path, 'r', encoding='utf-8') as source:
+                lines = [line for line in source if line.strip()]
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                results = list(executor.map(self._answer, lines))
+            with open(job["output_path"], 'w', encoding='utf-8') as sink:
+                sink.writelines(results)
+            job["status"] = "completed"
+        except OSError as e:
+            job["status"] = "failed"
+            job["error"] = str(e)
+
+    def status(self, batch_id):
+        return self._jobs[batch_id]["status"]
+
+    def results(self, batch_id):
+        with open(self._jobs[batch_id]["output_path"], 'r', encoding='utf-8') as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+class OpenAIBatchBackend:
+    """Submits batch files to the OpenAI Batch API and downloads the results."""
+
+    def __init__(self, client, completion_window=None):
+        self.client = client
+        self.completion_window = completion_window or BATCH["completion_window"]
+
+    def submit(self, input_path):
+        with open(input_path, 'rb') as f:
+            uploaded = self.client.files.create(file=f, purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=uploaded.id,
+            endpoint=ENDPOINT,
+            completion_window=self.completion_window,
+        )
+        return batch.id
+
+    def status(self, batch_id):
+        return self.client.batches.retrieve(batch_id).status
+
+    def results(self, batch_id):
+        batch = self.client.batches.retrieve(batch_id)
+        if not batch.output_file_id:
+            return []
+        text = self.client.files.content(batch.output_file_id).text
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+class BatchRunner:
+    """
+    Runs a set of independent client.run requests as one batch.
+
+    Requests are written to ``<batch_dir>/<name>_input.jsonl`` in the Batch
+    API's format, submitted, polled until the batch finishes (the local
+    backend is finished on return, so it is never polled), and the results
+    are turned back into Swarm responses. Requests that fail in the batch are
+    simply left out, so callers can fall back to a live call.
+    """
+
+    FINISHED = ("completed", "failed", "expired", "cancelled")
+
+    def __init__(self, backend, batch_dir, poll_interval=None, tracker=None):
+        self.backend = backend
+        self.batch_dir = batch_dir
+        self.poll_interval = poll_interval if poll_interval is not None else BATCH["poll_interval"]
+        self.tracker = tracker
+
+    def write_batch_file(self, requests, name):
+        """
+        Write requests as a Batch API input file.
+
+        Args:
+            requests (dict): custom_id -> client.run keyword arguments.
+            name (str): File name prefix.
+
+        Returns:
+            str: Path of the JSONL file.
+        """
+        os.makedirs(self.batch_dir, exist_ok=True)
+        path = os.path.join(self.batch_dir, f"{name}_input.jsonl")
+        with open(path, 'w', encoding='utf-8') as f:
+            for custom_id, request in requests.items():
+                line = {"custom_id": custom_id, "method": "POST", "url": ENDPOINT, "body": chat_request(**request)}
+                f.write(json.dumps(line) + '\n')
+        return path
+
+    def run(self, requests, name="batch"):
+        """
+        Submit requests as one batch and wait for the results.
+
+        Args:
+            requests (dict): custom_id -> client.run keyword arguments.
+            name (str): File name prefix for the batch files.
+
+        Returns:
+            dict: custom_id -> Response for every request that succeeded.
+        """
+        if not requests:
+            return {}
+        batch_id = self.backend.submit(self.write_batch_file(requests, name))
+        status = self.backend.status(batch_id)
+        while status not in self.FINISHED:
+            time.sleep(self.poll_interval)
+            status = self.backend.status(batch_id)
+
+        responses = {}
+        for result in self.backend.results(batch_id):
+            response = result.get("response") or {}
+            request = requests.get(result.get("custom_id"))
+            if request is None or result.get("error") or response.get("status_code") != 200:
+                continue
+            completion = ChatCompletion.model_validate(response["body"])
+            if self.tracker:
+                self.tracker.record(completion.usage)
+            responses[result["custom_id"]] = batch_response(completion, **request)
+        return responses
@@ -0,0 +1,235 @@
+# src/agents/client_registry.py
+
+import asyncio
+import threading
+import weakref
+
+import httpx
+from openai import AsyncOpenAI, OpenAI
+from swarm import Swarm
+
+from src.config import BATCH, LLM_CLIENT, RATE_LIMIT, RESILIENCE, RESPONSE_CACHE
+from src.utils.metrics import AsyncMeteredSwarm, MeteredSwarm, metrics
+
+from .batch import LocalBatchBackend, OpenAIBatchBackend
+from .rate_limit import RateLimitedOpenAI, RateLimiter
+from .resilience import AsyncResilientSwarm, ResilientSwarm
+from .stub_backend import AsyncStubOpenAI, StubBackend, StubOpenAI
+from .response_cache import AsyncCachingSwarm, CachingSwarm, ResponseCache
+from .usage import TrackedOpenAI, usage_tracker
+
+class ConnectionStats:
+    """Thread-safe counters of HTTP requests and newly opened connections."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.connections_opened = 0
+        self.clients_created = 0
+        self.clients_reused = 0
+
+    def incr(self, name, amount=1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    def snapshot(self):
+        """Return a dict of the current counters plus the connection reuse ratio."""
+        with self._lock:
+            reused = max(self.requests - self.connections_opened, 0)
+            return {
+                "requests": self.requests,
+                "connections_opened": self.connections_opened,
+                "connections_reused": reused,
+                "connection_reuse_ratio": reused / self.requests if self.requests else 0.0,
+                "clients_created": self.clients_created,
+                "clients_reused": self.clients_reused,
+            }
+
+class ClientRegistry:
+    """
+    Process-wide registry of Swarm clients sharing one HTTP connection pool.
+
+    Every generator asks the registry for its client instead of building a new
+    Swarm()/OpenAI() pair, so TLS sessions and keep-alive connections survive
+    from one section to the next. Async clients are kept per event loop,
+    because an httpx.AsyncClient pool cannot be shared across loops.
+    """
+
+    def __init__(self, settings=None):
+        self.settings = dict(LLM_CLIENT, **(settings or {}))
+        self.stats = ConnectionStats()
+        self._lock = threading.Lock()
+        self._swarm = None
+        self._async_swarms = weakref.WeakKeyDictionary()
+        self._async_default = None
+        self.response_cache = ResponseCache() if RESPONSE_CACHE.get("enabled") else None
+        self.rate_limiter = RateLimiter() if RATE_LIMIT.get("enabled") else None
+        self.resilience_settings = dict(RESILIENCE)
+        # The resilient wrappers handed out so far, for their statistics
+        self.resilient_clients = []
+        self.stub_backend = None
+
+    def _limits(self):
+        return httpx.Limits(
+            max_connections=self.settings["max_connections"],
+            max_keepalive_connections=self.settings["max_keepalive_connections"],
+            keepalive_expiry=self.settings["keepalive_expiry"],
+        )
+
+    def _trace(self, event_name, info):
+        # httpcore emits this once per freshly opened connection
+        if event_name == "connection.connect_tcp.complete":
+            self.stats.incr("connections_opened")
+
+    async def _atrace(self, event_name, info):
+        self._trace(event_name, info)
+
+    def _on_request(self, request):
+        self.stats.incr("requests")
+        request.extensions["trace"] = self._trace
+
+    async def _aon_request(self, request):
+        self.stats.incr("requests")
+        request.extensions["trace"] = self._atrace
+
+    def _sdk_retries(self):
+        # Retrying is left to the rate limiter and ResilientSwarm when either is on;
+        # SDK retries below them would hide 429s from the limiter and multiply attempts
+        if self.rate_limiter or self.resilience_settings["enabled"]:
+            return {"max_retries": 0}
+        return {}
+
+    def _openai_client(self, is_async, tracked=True):
+        if self.settings["backend"] == "stub":
+            if self.stub_backend is None:
+                self.stub_backend = StubBackend()
+            raw_client = AsyncStubOpenAI(self.stub_backend) if is_async else StubOpenAI(self.stub_backend)
+        elif is_async:
+            raw_client = AsyncOpenAI(http_client=httpx.AsyncClient(
+                limits=self._limits(),
+                timeout=self.settings["timeout"],
+                event_hooks={"request": [self._aon_request]},
+            ), **self._sdk_retries())
+        else:
+            raw_client = OpenAI(http_client=httpx.Client(
+                limits=self._limits(),
+                timeout=self.settings["timeout"],
+                event_hooks={"request": [self._on_request]},
+            ), **self._sdk_retries())
+        if self.rate_limiter:
+            # Shared by the blocking, async and batch clients, so one quota covers them all
+            raw_client = RateLimitedOpenAI(raw_client, self.rate_limiter, is_async=is_async)
+        if not tracked:
+            return raw_client
+        return TrackedOpenAI(raw_client, usage_tracker, is_async=is_async)
+
+    def get_swarm(self):
+        """Return the shared blocking Swarm client, creating it on first use."""
+        with self._lock:
+            if self._swarm is None:
+                self._swarm = Swarm(client=self._openai_client(is_async=False))
+                if self.resilience_settings["enabled"]:
+                    self._swarm = ResilientSwarm(self._swarm, self.resilience_settings,
+                                                 rate_limited=self.rate_limiter is not None)
+                    self.resilient_clients.append(self._swarm)
+                if self.response_cache:
+                    self._swarm = CachingSwarm(self._swarm, self.response_cache)
+                if metrics.enabled:
+                    self._swarm = MeteredSwarm(self._swarm, metrics, usage_tracker)
+                self.stats.incr("clients_created")
+            else:
+                self.stats.incr("clients_reused")
+            return self._swarm
+
+    def get_async_swarm(self):
+        """Return the shared AsyncSwarm client for the running event loop."""
+        from .async_agents import AsyncSwarm
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+
+        with self._lock:
+            swarm = self._async_swarms.get(loop) if loop else self._async_default
+            if swarm is None:
+                swarm = AsyncSwarm(client=self._openai_client(is_async=True))
+                if self.resilience_settings["enabled"]:
+                    swarm = AsyncResilientSwarm(swarm, self.resilience_settings,
+                                                rate_limited=self.rate_limiter is not None)
+                    self.resilient_clients.append(swarm)
+                if self.response_cache:
+                    swarm = AsyncCachingSwarm(swarm, self.response_cache)
+                if metrics.enabled:
+                    swarm = AsyncMeteredSwarm(swarm, metrics, usage_tracker)
+                if loop:
+                    self._async_swarms[loop] = swarm
+                else:
+                    self._async_default = swarm
+                self.stats.incr("clients_created")
+            else:
+                self.stats.incr("clients_reused")
+            return swarm
+
+    def get_batch_backend(self):
+        """
+        Return a backend for batch submissions (BATCH["backend"] in src/config.py).
+
+        "auto" picks the OpenAI Batch API unless the stub backend is in use.
+        The client goes through the rate limiter but is untracked: BatchRunner
+        records usage from the results.
+        """
+        with self._lock:
+            client = self._openai_client(is_async=False, tracked=False)
+        if BATCH["backend"] in ("auto", "openai") and self.settings["backend"] != "stub":
+            return OpenAIBatchBackend(client)
+        return LocalBatchBackend(client)
+
+    def _drop_clients(self):
+        self._swarm = None
+        self._async_swarms = weakref.WeakKeyDictionary()
+        self._async_default = None
+
+    def reset(self):
+        """Drop every cached client, e.g. after a fork or when settings change."""
+        with self._lock:
+            self._drop_clients()
+
+    def enable_response_cache(self, mode=None, cache_dir=None):
+        """Put a ResponseCache in front of every client handed out from now on."""
+        with self._lock:
+            self.response_cache = ResponseCache(cache_dir=cache_dir, mode=mode)
+            self._drop_clients()
+        return self.response_cache
+
+    def configure_resilience(self, **settings):
+        """Change timeout, retry and hedging settings for clients handed out from now on."""
+        with self._lock:
+            self.resilience_settings.update(settings)
+            self._drop_clients()
+
+    def resilience_stats(self):
+        """Return call, retry, timeout and hedge counts summed over every resilient client."""
+        totals = {}
+        for client in self.resilient_clients:
+            for name, value in client.snapshot().items():
+                totals[name] = totals.get(name, 0) + value
+        return totals
+
+    def enable_rate_limit(self, **settings):
+        """Put a shared RateLimiter in front of every client handed out from now on."""
+        with self._lock:
+            self.rate_limiter = RateLimiter(settings)
+            self._drop_clients()
+        return self.rate_limiter
+
+    def use_stub_backend(self, settings=None):
+        """Route every client handed out from now on to an in-process StubBackend."""
+        with self._lock:
+            self.settings["backend"] = "stub"
+            self.stub_backend = StubBackend(settings)
+            self._drop_clients()
+        return self.stub_backend
+
+# Create a singleton instance
+client_registry = ClientRegistry()
@@ -0,0 +1,71 @@
+# src/agents/debate.py
+
+from src.utils.transcript import DebateRecorder
+
+def run_debate(debate, run, first_response=None):
+    """
+    Drive a debate generator with a blocking client.
+
+    A debate is a generator that yields the keyword arguments for each
+    client.run call and receives the response back. Exceptions raised by the
+    client are thrown into the generator so its own error handling applies.
+    Every turn is recorded in the active transcript, if any.
+
+    Args:
+        debate (generator): The debate to drive.
+        run (callable): A blocking run function, e.g. Swarm.run.
+        first_response (Response, optional): Answer to the opening request,
+            e.g. from a batch; the first run call is skipped.
+
+    Returns:
+        The value returned by the debate generator.
+    """
+    recorder = DebateRecorder()
+    try:
+        request = next(debate)
+        recorder.prompt(request)
+        if first_response is not None:
+            recorder.reply(request, first_response)
+            request = debate.send(first_response)
+        while True:
+            try:
+                response = run(**request)
+            except Exception as e:
+                recorder.error(request, e)
+                request = debate.throw(e)
+            else:
+                recorder.reply(request, response)
+                request = debate.send(response)
+    except StopIteration as stop:
+        return stop.value
+
+async def arun_debate(debate, run, first_response=None):
+    """
+    Drive a debate generator with an async client.
+
+    Args:
+        debate (generator): The debate to drive.
+        run (callable): A coroutine run function, e.g. AsyncSwarm.run.
+        first_response (Response, optional): Answer to the opening request.
+
+    Returns:
+        The value returned by the debate generator.
+    """
+    recorder = DebateRecorder()
+    try:
+        request = next(debate)
+        recorder.prompt(request)
+        if first_response is not None:
+            recorder.reply(request, first_response)
+            request = debate.send(first_response)
+        while True:
+            try:
+                response = await run(**request)
+            except Exception as e:
+                recorder.error(request, e)
+                request = debate.throw(e)
+            else:
+                recorder.reply(request, response)
+                request = debate.send(response)
+    except StopIteration as stop:
+        return stop.value
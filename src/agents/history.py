@@ -0,0 +1,107 @@
+# src/agents/history.py
+
+from src.config import HISTORY
+
+def estimate_tokens(messages):
+    """Rough prompt token estimate (about four characters per token)."""
+    chars = 0
+    for msg in messages:
+        if isinstance(msg, dict):
+            chars += len(msg.get("content") or "")
+    return (chars + 3) // 4
+
+class HistoryPolicy:
+    """
+    Decide which part of a debate's history is resent on each turn.
+
+    The opening request is always kept. The last ``keep_last_turns`` turns are
+    sent verbatim; older turns are either collapsed into one compact summary
+    message or, when ``drop_superseded`` is set, dropped entirely once the same
+    agent has spoken again. A turn is an assistant message together with any
+    tool messages that follow it, so tool calls are never split from their
+    results.
+    """
+
+    def __init__(self, keep_last_turns=2, summarize=True, drop_superseded=False, summary_chars=240, enabled=True):
+        self.keep_last_turns = max(1, keep_last_turns)
+        self.summarize = summarize
+        self.drop_superseded = drop_superseded
+        self.summary_chars = summary_chars
+        self.enabled = enabled
+        self.tokens_sent = 0
+        self.tokens_saved = 0
+
+    @classmethod
+    def from_config(cls, config=None):
+        """Build a policy from a HISTORY-style settings dict."""
+        return cls(**(HISTORY if config is None else config))
+
+    def _split_turns(self, messages):
+        head, turns = [], []
+        for msg in messages:
+            role = msg.get("role") if isinstance(msg, dict) else None
+            if role == "assistant":
+                turns.append([msg])
+            elif turns:
+                turns[-1].append(msg)
+            else:
+                head.append(msg)
+        return head, turns
+
+    def _summarize_turn(self, turn):
+        msg = turn[0]
+        speaker = msg.get("sender") or "Assistant"
+        lines = [
+            line.strip() for line in (msg.get("content") or "").split('\n')
+            if line.strip() and not line.startswith(("Consensus:", "HANDOFF:", "functions."))
+        ]
+        gist = ' '.join(' '.join(lines).split())
+        if len(gist) > self.summary_chars:
+            gist = gist[:self.summary_chars].rstrip() + "..."
+        return f"- {speaker}: {gist}" if gist else None
+
+    def apply(self, messages):
+        """
+        Return the messages to send for the next turn.
+
+        The full history passed in is left untouched; callers keep it for
+        forced consensus and transcripts.
+        """
+        full_tokens = estimate_tokens(messages)
+        if not self.enabled:
+            self.tokens_sent += full_tokens
+            return list(messages)
+
+        head, turns = self._split_turns(messages)
+        if len(turns) <= self.keep_last_turns:
+            self.tokens_sent += full_tokens
+            return list(messages)
+
+        older, recent = turns[:-self.keep_last_turns], turns[-self.keep_last_turns:]
+        kept = list(head)
+
+        if self.drop_superseded:
+            later_speakers = {turn[0].get("sender") for turn in recent}
+            stale = []
+            for turn in reversed(older):
+                speaker = turn[0].get("sender")
+                if speaker not in later_speakers:
+                    stale.append(turn)
+                    later_speakers.add(speaker)
+            older = list(reversed(stale))
+
+        if self.summarize and older:
+            notes = [note for note in (self._summarize_turn(turn) for turn in older) if note]
+            if notes:
+                kept.append({
+                    "role": "user",
+                    "content": "Summary of earlier turns (older drafts omitted):\n" + '\n'.join(notes)
+                })
+
+        for turn in recent:
+            kept.extend(turn)
+
+        sent_tokens = estimate_tokens(kept)
+        self.tokens_sent += sent_tokens
+        self.tokens_saved += max(full_tokens - sent_tokens, 0)
+        return kept
@@ -0,0 +1,336 @@
+# src/agents/rate_limit.py
+
+import asyncio
+import random
+import re
+import threading
+import time
+
+from src.config import RATE_LIMIT
+
+from .history import estimate_tokens
+from .resilience import AgentCallTimeout, request_started
+
+DURATION_PART = re.compile(r'(\d+(?:\.\d+)?)(ms|h|m|s)')
+DURATION_SECONDS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+def parse_duration(value):
+    """Parse a rate-limit reset value such as '1s', '6m0s' or '120ms' into seconds."""
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = DURATION_PART.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * DURATION_SECONDS[unit] for amount, unit in parts)
+
+def is_rate_limited(error):
+    """True for a 429 from the API (or the stub backend's simulated one)."""
+    return getattr(error, "status_code", None) == 429
+
+def error_headers(error):
+    response = getattr(error, "response", None)
+    return getattr(response, "headers", None) or getattr(error, "headers", None) or {}
+
+class TokenBucket:
+    """
+    Per-minute quota refilled continuously.
+
+    Requests larger than the bucket are capped at its capacity so they can
+    still go through once it is full.
+    """
+
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount, now):
+        """Seconds until amount can be taken (0 if it can be taken now)."""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount):
+        self.level -= min(amount, self.capacity)
+
+    def refund(self, amount):
+        self.level = min(self.capacity, self.level + amount)
+
+    def sync(self, limit, remaining):
+        """Adopt the limit and remaining quota reported by the API."""
+        if limit:
+            self.capacity = float(limit)
+            self.rate = self.capacity / 60
+        if remaining is not None:
+            self.level = min(self.level, float(remaining))
+
+class RateLimiter:
+    """
+    Shared request and token budget in front of every agent call.
+
+    A call waits until both the request bucket and the token bucket can
+    cover it and fewer than ``concurrency`` calls are in flight. The buckets
+    start from the configured per-minute limits and follow the
+    x-ratelimit-* headers of each response. Concurrency adapts by AIMD: it
+    grows by ``increase`` per window of successful calls and is multiplied
+    by ``decrease`` after a 429, which also pauses every caller until the
+    provider's retry-after has passed.
+    """
+
+    def __init__(self, settings=None):
+        self.settings = dict(RATE_LIMIT, **(settings or {}))
+        self._cond = threading.Condition()
+        self._random = random.Random()
+        rpm = self.settings.get("requests_per_minute")
+        tpm = self.settings.get("tokens_per_minute")
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.concurrency = float(self.settings["initial_concurrency"])
+        self.in_flight = 0
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self.calls = 0
+        self.rate_limited = 0
+        self.waited = 0.0
+        self.peak_concurrency = self.concurrency
+
+    def estimate(self, request):
+        """Estimate the tokens a chat completions request will use."""
+        completion = request.get("max_completion_tokens") or request.get("max_tokens") or self.settings["completion_tokens"]
+        return estimate_tokens(request.get("messages", ())) + completion
+
+    def _delay(self, tokens, now):
+        # Seconds to wait before the call may start; 0 reserves its slot
+        if now < self._paused_until:
+            return self._paused_until - now
+        if self.in_flight >= max(1, int(self.concurrency)):
+            return None
+        waits = [0.0]
+        if self.requests:
+            waits.append(self.requests.wait_time(1, now))
+        if self.tokens:
+            waits.append(self.tokens.wait_time(tokens, now))
+        delay = max(waits)
+        if delay == 0:
+            self.in_flight += 1
+            self.calls += 1
+            if self.requests:
+                self.requests.take(1)
+            if self.tokens:
+                self.tokens.take(tokens)
+        return delay
+
+    def acquire(self, tokens):
+        """Block until a call using about ``tokens`` tokens may start."""
+        start = time.monotonic()
+        with self._cond:
+            while True:
+                delay = self._delay(tokens, time.monotonic())
+                if delay == 0:
+                    break
+                # None: wait for a running call to finish
+                self._cond.wait(timeout=delay)
+            self.waited += time.monotonic() - start
+
+    async def aacquire(self, tokens):
+        """Coroutine version of acquire()."""
+        start = time.monotonic()
+        while True:
+            with self._cond:
+                delay = self._delay(tokens, time.monotonic())
+                if delay == 0:
+                    self.waited += time.monotonic() - start
+                    return
+            await asyncio.sleep(delay if delay is not None else self.settings["poll_interval"])
+
+    def _sync_headers(self, headers):
+        for bucket_name, suffix in (("requests", "requests"), ("tokens", "tokens")):
+            limit = headers.get(f"x-ratelimit-limit-{suffix}")
+            remaining = headers.get(f"x-ratelimit-remaining-{suffix}")
+            if limit is None and remaining is None:
+                continue
+            bucket = getattr(self, bucket_name)
+            if bucket is None and limit:
+                bucket = TokenBucket(float(limit))
+                setattr(self, bucket_name, bucket)
+            if bucket is not None:
+                bucket.sync(float(limit) if limit else None, float(remaining) if remaining is not None else None)
+
+    def release(self, reserved, used=None, headers=None, rate_limited=False, sent=True):
+        """
+        Finish a call started with acquire().
+
+        Args:
+            reserved (int): The token estimate passed to acquire().
+            used (int, optional): Tokens the call actually used.
+            headers (Mapping, optional): Response headers carrying x-ratelimit-* values.
+            rate_limited (bool): The call was answered with a 429.
+            sent (bool): False if the call was dropped without being sent; its quota is refunded.
+        """
+        now = time.monotonic()
+        with self._cond:
+            self.in_flight -= 1
+            if not sent:
+                self.calls -= 1
+                if self.requests:
+                    self.requests.refund(1)
+                if self.tokens:
+                    self.tokens.refund(reserved)
+                self._cond.notify_all()
+                return
+            if used is not None and self.tokens:
+                self.tokens.refund(reserved - used)
+            if headers:
+                self._sync_headers(headers)
+            if rate_limited:
+                self.rate_limited += 1
+                # One multiplicative decrease per burst of 429s
+                if now - self._last_decrease >= self.settings["decrease_interval"]:
+                    self.concurrency = max(self.settings["min_concurrency"], self.concurrency * self.settings["decrease"])
+                    self._last_decrease = now
+                retry_after = self.retry_after(headers or {})
+                if retry_after:
+                    self._paused_until = max(self._paused_until, now + retry_after)
+            else:
+                self.concurrency = min(self.settings["max_concurrency"],
+                                       self.concurrency + self.settings["increase"] / self.concurrency)
+                self.peak_concurrency = max(self.peak_concurrency, self.concurrency)
+            self._cond.notify_all()
+
+    @staticmethod
+    def retry_after(headers):
+        """Seconds the provider asked callers to wait, or None."""
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        seconds = parse_duration(headers.get("retry-after"))
+        if seconds is not None:
+            return seconds
+        return parse_duration(headers.get("x-ratelimit-reset-requests"))
+
+    def backoff(self, attempt, headers=None):
+        """Seconds to wait before retrying a rate-limited call (jittered exponential)."""
+        delay = min(self.settings["max_backoff"], self.settings["backoff"] * 2 ** attempt)
+        delay *= 0.5 + self._random.random() / 2
+        return max(delay, self.retry_after(headers or {}) or 0.0)
+
+    def snapshot(self):
+        with self._cond:
+            return {
+                "calls": self.calls,
+                "rate_limited": self.rate_limited,
+                "concurrency": self.concurrency,
+                "peak_concurrency": self.peak_concurrency,
+                "waited_seconds": self.waited,
+            }
+
+def _usage_tokens(completion):
+    usage = getattr(completion, "usage", None)
+    return getattr(usage, "total_tokens", None) if usage else None
+
+class _LimitedCompletions:
+    def __init__(self, completions, limiter):
+        self._completions = completions
+        self._limiter = limiter
+
+    def _create(self, kwargs):
+        # The raw response exposes the rate-limit headers; stubs have none
+        raw_api = getattr(self._completions, "with_raw_response", None)
+        if raw_api is None:
+            return self._completions.create(**kwargs), None
+        raw = raw_api.create(**kwargs)
+        return raw.parse(), raw.headers
+
+    def _abandoned(self, reserved):
+        # The resilience layer gave up on this call while it waited for its turn
+        if request_started():
+            return False
+        self._limiter.release(reserved, sent=False)
+        return True
+
+    def create(self, **kwargs):
+        reserved = self._limiter.estimate(kwargs)
+        attempt = 0
+        while True:
+            self._limiter.acquire(reserved)
+            if self._abandoned(reserved):
+                raise AgentCallTimeout("Agent call abandoned before it was sent")
+            try:
+                completion, headers = self._create(kwargs)
+            except Exception as e:
+                limited = is_rate_limited(e)
+                self._limiter.release(reserved, headers=error_headers(e), rate_limited=limited)
+                if not limited or attempt >= self._limiter.settings["max_retries"]:
+                    raise
+                time.sleep(self._limiter.backoff(attempt, error_headers(e)))
+                attempt += 1
+                continue
+            except BaseException:
+                # Interrupted mid-call: the request may have been sent, so only free its slot
+                self._limiter.release(reserved)
+                raise
+            self._limiter.release(reserved, used=_usage_tokens(completion), headers=headers)
+            return completion
+
+    def __getattr__(self, name):
+        return getattr(self._completions, name)
+
+class _AsyncLimitedCompletions(_LimitedCompletions):
+    async def _acreate(self, kwargs):
+        raw_api = getattr(self._completions, "with_raw_response", None)
+        if raw_api is None:
+            return await self._completions.create(**kwargs), None
+        raw = await raw_api.create(**kwargs)
+        return raw.parse(), raw.headers
+
+    async def create(self, **kwargs):
+        reserved = self._limiter.estimate(kwargs)
+        attempt = 0
+        while True:
+            await self._limiter.aacquire(reserved)
+            if self._abandoned(reserved):
+                raise AgentCallTimeout("Agent call abandoned before it was sent")
+            try:
+                completion, headers = await self._acreate(kwargs)
+            except Exception as e:
+                limited = is_rate_limited(e)
+                self._limiter.release(reserved, headers=error_headers(e), rate_limited=limited)
+                if not limited or attempt >= self._limiter.settings["max_retries"]:
+                    raise
+                await asyncio.sleep(self._limiter.backoff(attempt, error_headers(e)))
+                attempt += 1
+                continue
+            except BaseException:
+                # Cancelled by a timeout or a lost hedge: the request may have been sent
+                self._limiter.release(reserved)
+                raise
+            self._limiter.release(reserved, used=_usage_tokens(completion), headers=headers)
+            return completion
+
+class _LimitedChat:
+    def __init__(self, completions):
+        self.completions = completions
+
+class RateLimitedOpenAI:
+    """
+    Proxy around an OpenAI/AsyncOpenAI client that routes chat completions
+    through a shared RateLimiter and retries 429s.
+
+    Streamed calls release their slot once the stream is opened.
+    """
+
+    def __init__(self, client, limiter, is_async=False):
+        self._client = client
+        completions_cls = _AsyncLimitedCompletions if is_async else _LimitedCompletions
+        self.chat = _LimitedChat(completions_cls(client.chat.completions, limiter))
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
@@ -0,0 +1,337 @@
+# src/agents/resilience.py
+
+import asyncio
+import contextvars
+import math
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+
+from openai import APIConnectionError
+
+from src.config import RESILIENCE
+from src.utils.irc_logger import irc_logger
+from src.utils.metrics import metrics
+
+class AgentCallTimeout(TimeoutError):
+    """Raised when an agent call does not finish within its phase's timeout."""
+
+# The AttemptClock of the attempt running in this context, if any
+_current_attempt = contextvars.ContextVar("resilience_attempt", default=None)
+
+def is_retryable(error, rate_limited=False):
+    """
+    Timeouts, connection errors and API errors with status 408, 409, 429 or 5xx.
+
+    Anything else, such as a 400 or a bug in the calling code, is raised at
+    once. With a rate limiter in the client, 429s are its to retry, not ours.
+    """
+    if isinstance(error, (TimeoutError, ConnectionError, APIConnectionError)):
+        return True
+    status = getattr(error, "status_code", None)
+    if not isinstance(status, int):
+        return False
+    if status == 429:
+        return not rate_limited
+    return status in (408, 409) or status >= 500
+
+class AttemptClock:
+    """
+    When one attempt's request was actually sent, and whether it was abandoned.
+
+    The rate limiter calls request_started() once the attempt holds a slot,
+    so time spent queued for the quota does not count against the timeout.
+    """
+
+    def __init__(self, event):
+        # threading.Event or asyncio.Event; also set when the attempt finishes
+        self.sent = event
+        self.sent_at = None
+        self.abandoned = False
+
+    def mark_sent(self):
+        if self.sent_at is None:
+            self.sent_at = time.monotonic()
+        self.sent.set()
+
+def request_started():
+    """
+    Report that the current attempt's request is about to be sent.
+
+    Returns:
+        bool: False if the attempt was abandoned (timed out, or lost a hedge)
+        while it waited, in which case the request must not be sent.
+    """
+    clock = _current_attempt.get()
+    if clock is None:
+        return True
+    if clock.abandoned:
+        return False
+    clock.mark_sent()
+    return True
+
+def _run_attempt(clock, call):
+    _current_attempt.set(clock)
+    try:
+        return call()
+    finally:
+        clock.sent.set()
+
+async def _arun_attempt(clock, call):
+    _current_attempt.set(clock)
+    try:
+        return await call()
+    finally:
+        clock.sent.set()
+
+class _DeadlineStream:
+    """A streamed completion that raises AgentCallTimeout once read past its deadline."""
+
+    def __init__(self, stream, deadline, message):
+        self._stream = stream
+        self._deadline = deadline
+        self._message = message
+
+    def __iter__(self):
+        for chunk in self._stream:
+            if time.monotonic() > self._deadline:
+                self.close()
+                raise AgentCallTimeout(self._message)
+            yield chunk
+
+    def close(self):
+        close = getattr(self._stream, "close", None)
+        if close:
+            close()
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+class LatencyWindow:
+    """Recent successful call latencies per phase, for the hedging threshold."""
+
+    def __init__(self, size):
+        self._lock = threading.Lock()
+        self._samples = defaultdict(lambda: deque(maxlen=size))
+
+    def add(self, phase, seconds):
+        with self._lock:
+            self._samples[phase].append(seconds)
+
+    def percentile(self, phase, pct, min_samples):
+        """Return the pct percentile of a phase's latencies, or None with too few samples."""
+        with self._lock:
+            samples = sorted(self._samples[phase])
+        if len(samples) < max(1, min_samples):
+            return None
+        return samples[min(len(samples) - 1, math.ceil(pct * len(samples)) - 1)]
+
+class ResilientSwarm:
+    """
+    Swarm client wrapper adding per-phase timeouts, retries and hedging to run().
+
+    The phase comes from the current metrics labels. Each attempt is limited
+    to the phase's timeout; failed or timed-out attempts are retried with
+    full-jitter exponential backoff. With hedging on, an attempt still
+    running after the phase's observed p95 latency gets a duplicate request,
+    and whichever answer arrives first is used.
+
+    With a rate limiter below (rate_limited=True), an attempt's clock starts
+    when the limiter sends its request, and 429s are left to the limiter.
+    Blocking calls cannot be cancelled: an abandoned attempt still waiting
+    for the limiter gives up its turn, one already sent finishes in the
+    background and its answer is discarded. Async attempts are cancelled.
+    Streamed turns (get_chat_completion) are retried while the stream opens
+    and must be read to the end within the phase's timeout; they are not hedged.
+    """
+
+    def __init__(self, client, settings=None, rate_limited=False):
+        self.client = client
+        self.settings = dict(RESILIENCE, **(settings or {}))
+        self.rate_limited = rate_limited
+        self.latencies = LatencyWindow(self.settings["latency_window"])
+        self._random = random.Random()
+        self._lock = threading.Lock()
+        self.stats = {"calls": 0, "retries": 0, "timeouts": 0, "hedges": 0, "hedge_wins": 0}
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _phase(self):
+        return metrics.current_labels().get("phase", "")
+
+    def _timeout(self, phase):
+        return self.settings["timeouts"].get(phase, self.settings["default_timeout"])
+
+    def _hedge_after(self, phase):
+        if not self.settings["hedge"]:
+            return None
+        p95 = self.latencies.percentile(phase, self.settings["hedge_percentile"], self.settings["hedge_min_samples"])
+        return None if p95 is None else max(p95, self.settings["hedge_min_delay"])
+
+    def _backoff(self, attempt):
+        return self._random.uniform(0, min(self.settings["max_backoff"], self.settings["backoff"] * 2 ** attempt))
+
+    def _give_up(self, error, attempt, phase):
+        if attempt >= self.settings["max_retries"] or not is_retryable(error, self.rate_limited):
+            return True
+        self._count("retries")
+        irc_logger.warning(f"Agent call failed in {phase or 'call'} ({error}); retry {attempt + 1} of {self.settings['max_retries']}.")
+        return False
+
+    def _clock(self, event):
+        clock = AttemptClock(event)
+        if not self.rate_limited:
+            # Nothing below reports the send, so the clock starts now
+            clock.mark_sent()
+        return clock
+
+    def _start(self, call):
+        # A daemon thread per attempt: a hung call must not hold a pool worker
+        future = Future()
+        clock = self._clock(threading.Event())
+        context = contextvars.copy_context()
+
+        def target():
+            try:
+                future.set_result(context.run(_run_attempt, clock, call))
+            except BaseException as e:
+                future.set_exception(e)
+
+        threading.Thread(target=target, daemon=True).start()
+        return future, clock
+
+    def _attempt(self, call, phase, hedge=True):
+        timeout = self._timeout(phase)
+        hedge_after = self._hedge_after(phase) if hedge else None
+        first, first_clock = self._start(call)
+        running = {first: first_clock}
+        error = None
+        try:
+            # Queued in the rate limiter: the clock starts once the request is sent
+            first_clock.sent.wait()
+            started = first_clock.sent_at or time.monotonic()
+            while running:
+                elapsed = time.monotonic() - started
+                waits = [timeout - elapsed] if timeout else []
+                if hedge_after is not None:
+                    waits.append(hedge_after - elapsed)
+                done, _ = wait(list(running), timeout=max(0.0, min(waits)) if waits else None, return_when=FIRST_COMPLETED)
+                for future in done:
+                    del running[future]
+                    if future.exception() is None:
+                        self.latencies.add(phase, time.monotonic() - started)
+                        if future is not first:
+                            self._count("hedge_wins")
+                        return future.result()
+                    error = future.exception()
+                elapsed = time.monotonic() - started
+                if running and timeout and elapsed >= timeout:
+                    self._count("timeouts")
+                    raise AgentCallTimeout(f"Agent call exceeded the {timeout:g}s {phase or 'call'} timeout")
+                if running and hedge_after is not None and elapsed >= hedge_after:
+                    self._count("hedges")
+                    future, clock = self._start(call)
+                    running[future] = clock
+                    hedge_after = None
+            raise error
+        finally:
+            # Attempts still queued in the rate limiter must not be sent any more
+            for clock in running.values():
+                clock.abandoned = True
+
+    def _call(self, call, phase, hedge=True):
+        self._count("calls")
+        attempt = 0
+        while True:
+            try:
+                return self._attempt(call, phase, hedge)
+            except Exception as e:
+                if self._give_up(e, attempt, phase):
+                    raise
+            time.sleep(self._backoff(attempt))
+            attempt += 1
+
+    def run(self, agent, messages, *args, **kwargs):
+        return self._call(lambda: self.client.run(agent, messages, *args, **kwargs), self._phase())
+
+    def get_chat_completion(self, *args, **kwargs):
+        """Swarm.get_chat_completion, as used for streamed turns, with timeouts and retries."""
+        phase = self._phase()
+        # A duplicate stream would be paid for in full, so streams are never hedged
+        completion = self._call(lambda: self.client.get_chat_completion(*args, **kwargs), phase, hedge=False)
+        timeout = self._timeout(phase)
+        if not kwargs.get("stream") or not timeout:
+            return completion
+        return _DeadlineStream(completion, time.monotonic() + timeout,
+                               f"Streamed reply exceeded the {timeout:g}s {phase or 'call'} timeout")
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats)
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+class AsyncResilientSwarm(ResilientSwarm):
+    """ResilientSwarm for AsyncSwarm clients; losing and timed-out attempts are cancelled."""
+
+    def get_chat_completion(self, *args, **kwargs):
+        # Streaming runs on blocking clients only
+        return self.client.get_chat_completion(*args, **kwargs)
+
+    def _astart(self, call):
+        clock = self._clock(asyncio.Event())
+        return asyncio.ensure_future(_arun_attempt(clock, call)), clock
+
+    async def _aattempt(self, call, phase):
+        timeout = self._timeout(phase)
+        hedge_after = self._hedge_after(phase)
+        first, first_clock = self._astart(call)
+        running = {first}
+        error = None
+        try:
+            # Queued in the rate limiter: the clock starts once the request is sent
+            await first_clock.sent.wait()
+            started = first_clock.sent_at or time.monotonic()
+            while running:
+                elapsed = time.monotonic() - started
+                waits = [timeout - elapsed] if timeout else []
+                if hedge_after is not None:
+                    waits.append(hedge_after - elapsed)
+                done, running = await asyncio.wait(running, timeout=max(0.0, min(waits)) if waits else None,
+                                                   return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        self.latencies.add(phase, time.monotonic() - started)
+                        if task is not first:
+                            self._count("hedge_wins")
+                        return task.result()
+                    error = task.exception()
+                elapsed = time.monotonic() - started
+                if running and timeout and elapsed >= timeout:
+                    self._count("timeouts")
+                    raise AgentCallTimeout(f"Agent call exceeded the {timeout:g}s {phase or 'call'} timeout")
+                if running and hedge_after is not None and elapsed >= hedge_after:
+                    self._count("hedges")
+                    running.add(self._astart(call)[0])
+                    hedge_after = None
+            raise error
+        finally:
+            for task in running:
+                task.cancel()
+
+    async def run(self, agent, messages, *args, **kwargs):
+        phase = self._phase()
+        self._count("calls")
+        attempt = 0
+        while True:
+            try:
+                return await self._aattempt(lambda: self.client.run(agent, messages, *args, **kwargs), phase)
+            except Exception as e:
+                if self._give_up(e, attempt, phase):
+                    raise
+            await asyncio.sleep(self._backoff(attempt))
+            attempt += 1
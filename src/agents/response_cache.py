@@ -0,0 +1,229 @@
+# src/agents/response_cache.py
+
+import hashlib
+import inspect
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+from swarm.types import Response
+
+from src.config import OUTPUT_DIR, RESPONSE_CACHE
+from src.utils.files import FILE_MODE
+
+class CacheMissError(RuntimeError):
+    """Raised in replay mode when a request has no cached response."""
+
+class ResponseCache:
+    """
+    Content-addressed, size-bounded on-disk cache of Swarm responses.
+
+    Entries live under ``<OUTPUT_DIR>/.cache/responses`` as one JSON file per
+    request hash. Least recently used entries are evicted once the total size
+    exceeds ``max_bytes``.
+
+    Modes:
+        read_write  - serve hits, call through and store on a miss.
+        replay      - serve hits only; never write, and raise CacheMissError
+                      on a miss so a replayed run cannot reach the network.
+    """
+
+    MODES = ("read_write", "replay")
+
+    def __init__(self, cache_dir=None, max_bytes=None, mode=None):
+        self.cache_dir = cache_dir or os.path.join(OUTPUT_DIR, ".cache", "responses")
+        self.max_bytes = max_bytes if max_bytes is not None else RESPONSE_CACHE["max_bytes"]
+        self.mode = mode or RESPONSE_CACHE["mode"]
+        if self.mode not in self.MODES:
+            raise ValueError(f"Unknown response cache mode: {self.mode}")
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> size, least recently used first
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self):
+        found = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith(".json"):
+                    stat = os.stat(os.path.join(root, name))
+                    found.append((stat.st_mtime, name[:-5], stat.st_size))
+        for _, key, size in sorted(found):
+            self._entries[key] = size
+            self.total_bytes += size
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    @staticmethod
+    def make_key(agent, messages, context_variables, model_override=None, max_turns=None, execute_tools=True):
+        """Hash everything that determines the response of a Swarm.run call."""
+        instructions = agent.instructions
+        if callable(instructions):
+            instructions = instructions(context_variables)
+        material = {
+            "model": model_override or agent.model,
+            "agent": agent.name,
+            "instructions": instructions,
+            "tools": [getattr(f, "__name__", str(f)) for f in agent.functions],
+            "tool_choice": agent.tool_choice,
+            "messages": messages,
+            "context_variables": context_variables,
+            "max_turns": max_turns,
+            "execute_tools": execute_tools,
+        }
+        encoded = json.dumps(material, sort_keys=True, default=str).encode("utf-8")
+        return hashlib.sha256(encoded).hexdigest()
+
+    def get(self, key):
+        """Return the cached payload for key, or None on a miss."""
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                payload = json.load(f)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+            if key in self._entries:
+                self._entries.move_to_end(key)
+        if self.mode == "read_write":
+            try:
+                os.utime(path)  # Keep LRU order across runs
+            except OSError:
+                pass
+        return payload
+
+    def put(self, key, payload):
+        """Store payload under key and evict old entries if over budget."""
+        if self.mode == "replay":
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        data = json.dumps(payload, default=str).encode("utf-8")
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        os.fchmod(fd, FILE_MODE)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self.total_bytes -= self._entries.pop(key, 0)
+            self._entries[key] = len(data)
+            self.total_bytes += len(data)
+            self.writes += 1
+            victims = []
+            while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+                victim, size = self._entries.popitem(last=False)
+                self.total_bytes -= size
+                self.evictions += 1
+                victims.append(victim)
+        for victim in victims:
+            try:
+                os.remove(self._path(victim))
+            except OSError:
+                pass
+
+    def snapshot(self):
+        """Return hit/miss counters and the current cache size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "mode": self.mode,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "writes": self.writes,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self.total_bytes,
+            }
+
+def _resolve_agent(agent, name):
+    """Map a cached agent name back to a live Agent via its handoff functions."""
+    if name is None:
+        return None
+    if name == agent.name:
+        return agent
+    for func in agent.functions:
+        try:
+            if inspect.signature(func).parameters:
+                continue
+            candidate = func()
+        except Exception:
+            continue
+        if getattr(candidate, "name", None) == name:
+            return candidate
+    return None
+
+class CachingSwarm:
+    """
+    Swarm client wrapper that answers run() from a ResponseCache when it can.
+
+    Streaming calls are always passed through uncached.
+    """
+
+    def __init__(self, client, cache):
+        self.client = client
+        self.cache = cache
+
+    def _lookup(self, agent, messages, context_variables, model_override, max_turns, execute_tools):
+        key = self.cache.make_key(agent, messages, context_variables, model_override, max_turns, execute_tools)
+        payload = self.cache.get(key)
+        if payload is None:
+            if self.cache.mode == "replay":
+                raise CacheMissError(f"No cached response for {agent.name} (key {key[:12]})")
+            return key, None
+        response = Response(
+            messages=payload["messages"],
+            agent=_resolve_agent(agent, payload.get("agent")),
+            context_variables=payload.get("context_variables", {}),
+        )
+        return key, response
+
+    def _store(self, key, response):
+        if response is None or response.messages is None:
+            return
+        self.cache.put(key, {
+            "messages": response.messages,
+            "agent": response.agent.name if response.agent else None,
+            "context_variables": response.context_variables,
+        })
+
+    def run(self, agent, messages, context_variables={}, model_override=None, stream=False,
+            debug=False, max_turns=float("inf"), execute_tools=True):
+        if stream:
+            return self.client.run(agent, messages, context_variables, model_override, stream,
+                                   debug, max_turns, execute_tools)
+        key, response = self._lookup(agent, messages, context_variables, model_override, max_turns, execute_tools)
+        if response is not None:
+            return response
+        response = self.client.run(agent, messages, context_variables, model_override, stream,
+                                   debug, max_turns, execute_tools)
+        self._store(key, response)
+        return response
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+class AsyncCachingSwarm(CachingSwarm):
+    """CachingSwarm for AsyncSwarm clients."""
+
+    async def run(self, agent, messages, context_variables={}, model_override=None, stream=False,
+                  debug=False, max_turns=float("inf"), execute_tools=True):
+        key, response = self._lookup(agent, messages, context_variables, model_override, max_turns, execute_tools)
+        if response is not None:
+            return response
+        response = await self.client.run(agent, messages, context_variables, model_override, stream,
+                                         debug, max_turns, execute_tools)
+        self._store(key, response)
+        return response
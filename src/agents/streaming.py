@@ -0,0 +1,122 @@
+# src/agents/streaming.py
+
+import os
+import time
+from types import SimpleNamespace
+
+from swarm.types import Response
+
+from src.agents.history import estimate_tokens
+from src.agents.usage import usage_tracker
+from src.utils.irc_logger import irc_logger
+from src.utils.metrics import metrics
+
+class MarkerParser:
+    """
+    Incrementally scan streamed text for Consensus: and HANDOFF: lines.
+
+    Only the line currently being received is inspected on each chunk, so
+    parsing stays linear in the length of the reply.
+    """
+
+    def __init__(self):
+        self._parts = []
+        self._line = ""
+        self.consensus = None
+        self.handoff = False
+
+    def _check_line(self, line):
+        stripped = line.strip()
+        if stripped.startswith("Consensus:") and self.consensus is None and '\n' not in stripped:
+            self.consensus = stripped
+        if stripped.startswith("HANDOFF:"):
+            self.handoff = True
+
+    def feed(self, text):
+        """Add a chunk of text; returns True once a HANDOFF line has started."""
+        self._parts.append(text)
+        *complete, self._line = (self._line + text).split('\n')
+        for line in complete:
+            self._check_line(line)
+        # A handoff only needs its prefix to be recognised; the rest is not worth paying for
+        self._check_line(self._line)
+        return self.handoff
+
+    @property
+    def text(self):
+        return ''.join(self._parts)
+
+class StreamingRunner:
+    """
+    Drop-in replacement for client.run that streams a single turn.
+
+    Tokens are shown as they arrive, the text so far can be mirrored to a
+    partial file, and the stream is closed as soon as the agent starts its
+    HANDOFF line so no further completion tokens are generated. Returns a
+    swarm Response shaped like a max_turns=1 run. Streaming bypasses the
+    response cache; the call is still recorded in metrics.
+    """
+
+    def __init__(self, client, live=True, partial_path=None):
+        self.client = client
+        self.live = live
+        self.partial_path = partial_path
+
+    def run(self, agent, messages, context_variables={}, max_turns=1, debug=False, **kwargs):
+        started = time.monotonic()
+        parser = MarkerParser()
+        partial = None
+        if self.partial_path:
+            os.makedirs(os.path.dirname(self.partial_path), exist_ok=True)
+            partial = open(self.partial_path, 'w', encoding='utf-8')
+
+        stream = self.client.get_chat_completion(
+            agent=agent,
+            history=messages,
+            context_variables=context_variables,
+            model_override=kwargs.get("model_override"),
+            stream=True,
+            debug=debug,
+        )
+        if self.live:
+            irc_logger.stream_start(agent.name)
+        outcome = "error"
+        try:
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                text = getattr(chunk.choices[0].delta, "content", None)
+                if not text:
+                    continue
+                stopped = parser.feed(text)
+                if self.live:
+                    irc_logger.stream_token(text)
+                if partial:
+                    partial.write(text)
+                    partial.flush()
+                if stopped:
+                    break
+            outcome = "ok"
+        finally:
+            # Closing the stream drops the HTTP response and stops generation
+            close = getattr(stream, "close", None)
+            if close:
+                close()
+            if partial:
+                partial.close()
+            if self.live:
+                irc_logger.stream_end()
+            # Streams carry no usage block, so record an estimate from the text
+            prompt_tokens = estimate_tokens([{"content": agent.instructions if isinstance(agent.instructions, str) else ""}] + list(messages))
+            completion_tokens = estimate_tokens([{"content": parser.text}])
+            usage_tracker.record(SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens))
+            metrics.record_call(agent.name, time.monotonic() - started, prompt_tokens, completion_tokens, outcome)
+
+        message = {
+            "role": "assistant",
+            "content": parser.text,
+            "sender": agent.name,
+            "tool_calls": None,
+            "function_call": None,
+        }
+        return Response(messages=[message], agent=agent, context_variables=dict(context_variables))
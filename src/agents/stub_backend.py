@@ -0,0 +1,276 @@
+# src/agents/stub_backend.py
+
+import asyncio
+import collections
+import hashlib
+import random
+import threading
+import time
+
+from openai.types.chat import ChatCompletion, ChatCompletionChunk
+
+from src.config import STUB_BACKEND
+
+class StubBackendError(RuntimeError):
+    """Simulated API failure raised by the stub backend."""
+
+    status_code = 500
+
+class StubRateLimitError(StubBackendError):
+    """Simulated 429, carrying the headers a provider would send."""
+
+    status_code = 429
+
+    def __init__(self, retry_after):
+        super().__init__("Simulated rate limit exceeded")
+        self.headers = {"retry-after": f"{retry_after:.3f}"}
+
+class StubBackend:
+    """
+    In-process stand-in for an OpenAI-compatible chat completions API.
+
+    Replies follow the formats the prompts in src/prompts ask for: every
+    reply starts with a Consensus line, drafts end with the agent's HANDOFF
+    line, and once a debate reaches its scripted consensus turn the reply
+    carries the final Book Title, Table of Contents or section text.
+    Judging calls answer with a Winner line.
+
+    Latency is time-to-first-token drawn from a lognormal distribution plus
+    completion tokens divided by tokens_per_second, all multiplied by
+    time_scale. Calls fail with StubBackendError at failure_rate, and with
+    StubRateLimitError (a 429) above requests_per_minute.
+
+    Each debate is identified by its opening user message, and the backend
+    records when it started and finished so benchmarks can report
+    per-section latency.
+    """
+
+    def __init__(self, settings=None):
+        self.settings = dict(STUB_BACKEND, **(settings or {}))
+        self._random = random.Random(self.settings["seed"])
+        self._lock = threading.Lock()
+        self._seen_prefixes = set()
+        self.conversations = {}
+        self.calls = 0
+        self.failures = 0
+        self.rate_limited = 0
+        self._request_times = collections.deque()
+
+    # Request inspection
+
+    @staticmethod
+    def _phase(system_prompt):
+        if system_prompt.startswith("You are the judge"):
+            return "judge"
+        if "book titles" in system_prompt:
+            return "title"
+        if "table of contents for a book" in system_prompt:
+            return "toc"
+        return "section"
+
+    @staticmethod
+    def _turn(history):
+        turns = 1
+        for msg in history:
+            if msg.get("role") == "assistant":
+                turns += 1
+            elif (msg.get("content") or "").startswith("Summary of earlier turns"):
+                # Turns collapsed by the history policy still count
+                turns += sum(1 for line in msg["content"].split('\n') if line.startswith("- "))
+        return turns
+
+    def _consensus_turn(self, phase, key):
+        base = self.settings["consensus_turn"][phase]
+        jitter = self.settings["consensus_jitter"]
+        seed = int(hashlib.sha256(key.encode("utf-8")).hexdigest()[:8], 16)
+        if not jitter:
+            return base
+        return max(1, base + seed % (2 * jitter + 1) - jitter)
+
+    # Reply generation
+
+    def _filler(self, words, seed):
+        rng = random.Random(seed)
+        vocabulary = self.settings["vocabulary"]
+        sentences, current = [], []
+        for _ in range(words):
+            current.append(rng.choice(vocabulary))
+            if len(current) >= rng.randint(8, 16):
+                sentences.append(' '.join(current).capitalize() + '.')
+                current = []
+        if current:
+            sentences.append(' '.join(current).capitalize() + '.')
+        paragraphs = [' '.join(sentences[i:i + 5]) for i in range(0, len(sentences), 5)]
+        return '\n\n'.join(paragraphs)
+
+    def _final_content(self, phase, key):
+        if phase == "title":
+            return f"Book Title: {self._filler(4, key).rstrip('.')}"
+        if phase == "toc":
+            lines = ["Table of Contents:"]
+            for chapter in range(1, self.settings["chapters"] + 1):
+                lines.append(f"{chapter}. {self._filler(4, f'{key}:{chapter}').rstrip('.')}")
+                for section in range(1, self.settings["sections_per_chapter"] + 1):
+                    title = self._filler(3, f"{key}:{chapter}.{section}").rstrip('.')
+                    lines.append(f"   {chapter}.{section}. {title}")
+            return '\n'.join(lines)
+        return self._filler(self.settings["section_words"], key)
+
+    def _reply(self, phase, agent, turn, key):
+        if phase == "judge":
+            candidates = key.count("\nCandidate ") or 1
+            seed = int(hashlib.sha256(key.encode("utf-8")).hexdigest()[:8], 16)
+            return f"Winner: {seed % candidates + 1}"
+        if turn >= self._consensus_turn(phase, key):
+            return f"Consensus: True\n{self._final_content(phase, key)}"
+        handoff = "HANDOFF: Requesting Gustave's feedback" if agent == "Zero" else "HANDOFF: Returning to Zero for input"
+        draft_words = self.settings["section_words"] if phase == "section" else 40
+        proposal = self._final_content(phase, f"{key}:{turn}") if phase != "section" else ""
+        body = '\n'.join(part for part in (self._filler(draft_words, f"{key}:{turn}:{agent}"), proposal) if part)
+        return f"Consensus: False\n{body}\n{handoff}"
+
+    # Completion API
+
+    def _check_rate(self):
+        limit = self.settings.get("requests_per_minute")
+        if not limit:
+            return
+        window = 60 * (self.settings["time_scale"] or 1.0)
+        now = time.monotonic()
+        with self._lock:
+            while self._request_times and now - self._request_times[0] >= window:
+                self._request_times.popleft()
+            if len(self._request_times) >= limit:
+                self.rate_limited += 1
+                raise StubRateLimitError(self._request_times[0] + window - now)
+            self._request_times.append(now)
+
+    def _prepare(self, messages):
+        system_prompt = (messages[0].get("content") or "") if messages else ""
+        history = messages[1:]
+        opening = next((m.get("content") or "" for m in history if m.get("role") == "user"), "")
+        phase = self._phase(system_prompt)
+        agent = "Zero" if system_prompt.lstrip().startswith("You are Zero") else "Gustave"
+        key = f"{phase}:{opening}"
+        turn = self._turn(history)
+
+        with self._lock:
+            self.calls += 1
+            fail = self._random.random() < self.settings["failure_rate"]
+            ttft = self._random.lognormvariate(0, self.settings["latency_sigma"]) * self.settings["latency_median"]
+            prefix = system_prompt[:self.settings["cache_prefix_chars"]]
+            cached = prefix in self._seen_prefixes
+            self._seen_prefixes.add(prefix)
+            record = self.conversations.setdefault(key, {"phase": phase, "start": time.monotonic(), "turns": 0})
+            record["turns"] += 1
+            if fail:
+                self.failures += 1
+
+        content = self._reply(phase, agent, turn, key)
+        prompt_tokens = sum(len(m.get("content") or "") for m in messages) // 4
+        completion_tokens = max(1, len(content) // 4)
+        delay = (ttft + completion_tokens / self.settings["tokens_per_second"]) * self.settings["time_scale"]
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": min(prompt_tokens, len(prefix) // 4) if cached else 0},
+        }
+        return key, content, usage, delay, fail
+
+    def _finish(self, key):
+        with self._lock:
+            self.conversations[key]["end"] = time.monotonic()
+
+    def _completion(self, model, content, usage):
+        return ChatCompletion.model_validate({
+            "id": f"stub-{self.calls}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model or "stub",
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": content, "tool_calls": None},
+            }],
+            "usage": usage,
+        })
+
+    def _chunks(self, model, content):
+        pieces = [content[i:i + 16] for i in range(0, len(content), 16)]
+        for index, piece in enumerate(pieces):
+            yield ChatCompletionChunk.model_validate({
+                "id": f"stub-{self.calls}",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model or "stub",
+                "choices": [{
+                    "index": 0,
+                    "delta": {"role": "assistant", "content": piece} if index == 0 else {"content": piece},
+                    "finish_reason": "stop" if index == len(pieces) - 1 else None,
+                }],
+            })
+
+    def create(self, model=None, messages=(), stream=False, **kwargs):
+        """Blocking chat.completions.create."""
+        self._check_rate()
+        key, content, usage, delay, fail = self._prepare(list(messages))
+        if fail:
+            time.sleep(delay / 2)
+            raise StubBackendError("Simulated API failure")
+        if stream:
+            return self._stream(key, model, content, delay)
+        time.sleep(delay)
+        self._finish(key)
+        return self._completion(model, content, usage)
+
+    def _stream(self, key, model, content, delay):
+        chunks = list(self._chunks(model, content))
+        for chunk in chunks:
+            time.sleep(delay / max(len(chunks), 1))
+            yield chunk
+        self._finish(key)
+
+    async def acreate(self, model=None, messages=(), stream=False, **kwargs):
+        """Coroutine chat.completions.create."""
+        if stream:
+            raise NotImplementedError("The async stub does not stream")
+        self._check_rate()
+        key, content, usage, delay, fail = self._prepare(list(messages))
+        if fail:
+            await asyncio.sleep(delay / 2)
+            raise StubBackendError("Simulated API failure")
+        await asyncio.sleep(delay)
+        self._finish(key)
+        return self._completion(model, content, usage)
+
+    def section_latencies(self):
+        """Return the wall-clock durations of finished section debates, in seconds."""
+        with self._lock:
+            return [
+                record["end"] - record["start"]
+                for record in self.conversations.values()
+                if record["phase"] == "section" and "end" in record
+            ]
+
+class _StubCompletions:
+    def __init__(self, create):
+        self.create = create
+
+class _StubChat:
+    def __init__(self, create):
+        self.completions = _StubCompletions(create)
+
+class StubOpenAI:
+    """Drop-in for OpenAI() that routes chat completions to a StubBackend."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.chat = _StubChat(backend.create)
+
+class AsyncStubOpenAI:
+    """Drop-in for AsyncOpenAI() that routes chat completions to a StubBackend."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.chat = _StubChat(backend.acreate)
@@ -0,0 +1,115 @@
+# src/agents/usage.py
+
+import contextvars
+import threading
+from contextlib import contextmanager
+
+# (collector list, tracker or None) of every UsageTracker.capture() block entered
+_capture = contextvars.ContextVar("usage_capture", default=())
+
+class UsageTracker:
+    """Thread-safe totals of the token usage reported by chat completions."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cached_tokens = 0
+
+    def record(self, usage):
+        """
+        Add one completion's usage block to the totals.
+
+        Args:
+            usage: The ``usage`` field of a chat completion; may be None.
+        """
+        if usage is None:
+            return
+        self._add(usage)
+        for captured, into in _capture.get():
+            captured.append((getattr(usage, "prompt_tokens", 0) or 0, getattr(usage, "completion_tokens", 0) or 0))
+            if into is not None:
+                into._add(usage)
+
+    def _add(self, usage):
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached = (getattr(details, "cached_tokens", None) or 0) if details else 0
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += getattr(usage, "prompt_tokens", 0) or 0
+            self.completion_tokens += getattr(usage, "completion_tokens", 0) or 0
+            self.cached_tokens += cached
+
+    @contextmanager
+    def capture(self, into=None):
+        """
+        Collect the usage of completions made inside the block; blocks may nest.
+
+        Args:
+            into (UsageTracker, optional): Also add every completion to this
+                tracker, e.g. to total one queued job on its own.
+
+        Yields:
+            list: (prompt_tokens, completion_tokens) tuples, one per completion.
+        """
+        captured = []
+        token = _capture.set(_capture.get() + ((captured, into),))
+        try:
+            yield captured
+        finally:
+            _capture.reset(token)
+
+    def snapshot(self):
+        """Return the totals plus the share of prompt tokens served from the provider cache."""
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+                "cached_tokens": self.cached_tokens,
+                "cache_hit_rate": self.cached_tokens / self.prompt_tokens if self.prompt_tokens else 0.0,
+            }
+
+class _TrackedCompletions:
+    def __init__(self, completions, tracker):
+        self._completions = completions
+        self._tracker = tracker
+
+    def create(self, **kwargs):
+        completion = self._completions.create(**kwargs)
+        self._tracker.record(getattr(completion, "usage", None))
+        return completion
+
+    def __getattr__(self, name):
+        return getattr(self._completions, name)
+
+class _AsyncTrackedCompletions(_TrackedCompletions):
+    async def create(self, **kwargs):
+        completion = await self._completions.create(**kwargs)
+        self._tracker.record(getattr(completion, "usage", None))
+        return completion
+
+class _TrackedChat:
+    def __init__(self, completions):
+        self.completions = completions
+
+class TrackedOpenAI:
+    """
+    Proxy around an OpenAI/AsyncOpenAI client that records completion usage.
+
+    Swarm discards the completion object after reading the message, so usage
+    has to be captured at the client. Everything other than
+    chat.completions.create is passed straight through.
+    """
+
+    def __init__(self, client, tracker, is_async=False):
+        self._client = client
+        completions_cls = _AsyncTrackedCompletions if is_async else _TrackedCompletions
+        self.chat = _TrackedChat(completions_cls(client.chat.completions, tracker))
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+# Create a singleton instance
+usage_tracker = UsageTracker()
@@ -2,17 +2,184 @@
 
 TITLE_GENERATION = {
     "debug": False,
-    "max_attempts": 10
+    "max_attempts": 10,
+    "mode": "debate",  # debate, or best_of_n for parallel candidates picked by a judge
+    "candidates": 4,  # Candidates generated in best_of_n mode
+    "judge": True  # Pick with one judging call; False ranks by local heuristics only
 }
 
 TOC_GENERATION = {
     "debug": False,
-    "max_attempts": 10
+    "max_attempts": 10,
+    "mode": "debate",
+    "candidates": 4,
+    "judge": True
 }
 
 SECTION_GENERATION = {
     "debug": False,
-    "max_attempts": 10
+    "max_attempts": 10,
+    "max_workers": 1,  # Concurrent section debates; 1 keeps generation sequential
+    "toc_detail": "neighbours",  # ToC slice sent per section: full, neighbours or chapter
+    "toc_neighbours": 1  # Chapters either side of the current one shown in full
+}
+
+# Conversation history resent on each debate turn
+HISTORY = {
+    "enabled": False,  # Off: every turn resends the whole debate (--history-window turns it on)
+    "keep_last_turns": 2,      # Turns resent verbatim
+    "summarize": True,         # Collapse older turns into a one-line-per-turn summary
+    "drop_superseded": False,  # Drop older turns once the same agent has spoken again
+    "summary_chars": 240
+}
+
+# Whole-book budget; None leaves a limit unset. Section debates share what is
+# left, and once only the reserve remains every debate forces consensus.
+BUDGET = {
+    "max_tokens": None,  # Prompt + completion tokens
+    "max_calls": None,  # Agent calls
+    "max_seconds": None,  # Wall-clock time
+    "reserve": 0.05,  # Share of the budget kept back for forced consensus
+    "min_turns": 2  # Never plan fewer turns than this per debate
+}
+
+# Submit the opening turn of every section debate as one batch
+BATCH = {
+    "enabled": False,
+    "backend": "auto",  # openai uses the Batch API, local answers the file in-process; auto: openai unless stubbed
+    "local_workers": 8,  # Requests the local backend answers at once
+    "poll_interval": 30.0,  # Seconds between status checks of an OpenAI batch
+    "completion_window": "24h"
+}
+
+# Token streaming for debate turns (blocking clients only)
+STREAMING = {
+    "enabled": False,
+    "live_output": True,  # Print tokens as they arrive (turned off with several workers)
+    "partial_dir": None  # Section drafts in progress; None uses OUTPUT_DIR/.partial
+}
+
+# Shared LLM client and HTTP connection pool
+LLM_CLIENT = {
+    "backend": "openai",  # openai, or stub for the local StubBackend
+    "max_connections": 100,
+    "max_keepalive_connections": 20,
+    "keepalive_expiry": 30.0,  # Seconds an idle connection stays in the pool
+    "timeout": 600.0
+}
+
+# Timeouts, retries and hedging for agent calls (client.run)
+RESILIENCE = {
+    "enabled": True,
+    "timeouts": {"title": 120.0, "toc": 180.0, "section": 300.0},  # Seconds per attempt, by phase
+    "default_timeout": 300.0,  # Phases not listed above; None waits forever
+    "max_retries": 3,
+    "backoff": 1.0,  # Full-jitter exponential backoff: up to backoff * 2 ** attempt seconds
+    "max_backoff": 30.0,
+    "hedge": False,  # Send a duplicate request once a call passes the phase's observed p95
+    "hedge_percentile": 0.95,
+    "hedge_min_samples": 20,  # Calls of a phase observed before hedging starts
+    "hedge_min_delay": 1.0,  # Never hedge sooner than this many seconds
+    "latency_window": 200  # Recent latencies kept per phase
+}
+
+# Shared request/token limiter with adaptive (AIMD) concurrency for agent calls
+RATE_LIMIT = {
+    "enabled": False,
+    "requests_per_minute": None,  # Starting quotas; x-ratelimit-* headers take over once seen
+    "tokens_per_minute": None,
+    "completion_tokens": 1000,  # Assumed completion size when a request sets no max_tokens
+    "initial_concurrency": 4,
+    "min_concurrency": 1,
+    "max_concurrency": 64,
+    "increase": 1.0,  # Added to the concurrency limit per window of successful calls
+    "decrease": 0.5,  # Concurrency multiplier after a 429
+    "decrease_interval": 1.0,  # Seconds between two decreases, so one burst of 429s counts once
+    "max_retries": 5,  # 429s retried per call
+    "backoff": 1.0,  # First retry delay in seconds, doubled per attempt and jittered
+    "max_backoff": 60.0,
+    "poll_interval": 0.05  # Async callers re-check a full limiter this often
+}
+
+# Opt-in on-disk cache of agent responses, stored under OUTPUT_DIR/.cache
+RESPONSE_CACHE = {
+    "enabled": False,
+    "mode": "read_write",  # read_write, or replay to serve cached responses only
+    "max_bytes": 512 * 1024 * 1024
+}
+
+# Local stand-in LLM used for load tests (LLM_CLIENT["backend"] = "stub")
+STUB_BACKEND = {
+    "seed": 1234,
+    "latency_median": 0.8,  # Median seconds to first token (lognormal)
+    "latency_sigma": 0.5,
+    "tokens_per_second": 60,
+    "time_scale": 1.0,  # Multiplies every simulated delay; 0 disables sleeping
+    "failure_rate": 0.0,
+    "requests_per_minute": None,  # Answer with simulated 429s above this rate (per scaled minute)
+    "consensus_turn": {"title": 3, "toc": 4, "section": 4},
+    "consensus_jitter": 1,
+    "chapters": 3,
+    "sections_per_chapter": 3,
+    "section_words": 350,
+    "cache_prefix_chars": 2048,
+    "vocabulary": [
+        "agents", "saloon", "book", "chapter", "idea", "system", "model", "design",
+        "future", "story", "context", "method", "theory", "practice", "signal", "value",
+        "network", "insight", "history", "craft", "question", "answer", "pattern", "voice"
+    ]
+}
+
+# Per-call metrics: JSONL event log and Prometheus text file
+METRICS = {
+    "enabled": True,
+    "output_dir": None,  # Directory of the two files below; None uses OUTPUT_DIR
+    "jsonl_filename": "metrics.jsonl",
+    "prometheus_filename": "metrics.prom",
+    "rollup_top": 5  # Slowest / most expensive sections listed per book
+}
+
+# Retrieval of passages from already-written sections into each section prompt
+CONTINUITY = {
+    "enabled": True,
+    "top_k": 3,  # Passages injected per section
+    "max_tokens": 600,  # Hard cap on the injected passages
+    "passage_tokens": 150,  # Approximate size of an indexed passage
+    "k1": 1.5,  # BM25 term frequency saturation
+    "b": 0.75  # BM25 length normalisation
+}
+
+# Per-book record of every agent turn, with an offset index for random access
+TRANSCRIPT = {
+    "enabled": True,
+    "filename": "transcript.jsonl",
+    "index_filename": "transcript.idx"
+}
+
+# BookManager file output
+BOOK_OUTPUT = {
+    "verbose": False,  # Print every file written or read
+    "write_behind": False,  # Write section files from a background thread
+    "fsync": False,  # fsync files before they replace their targets (durable, slower)
+    "batch_size": 32  # Queued writes fsynced and renamed together
+}
+
+# Durable section queue shared by worker processes (--queue / --worker)
+JOB_QUEUE = {
+    "lease_seconds": 300,  # A claimed section is handed to another worker if not renewed in time
+    "heartbeat_seconds": 60,  # How often a worker renews the lease of the section it is writing
+    "max_attempts": 3,  # Claims per section, and compile steps per book, before it is marked failed
+    "poll_interval": 5.0,  # Seconds an idle worker waits before looking for work again
+    "busy_timeout": 30.0  # Seconds to wait for another process's lock on the queue file
+}
+
+# Console and log file output
+LOGGING = {
+    "queued": False,  # Render messages on a background thread instead of the caller's
+    "level": "info",  # Console level: debug, info, warning or error
+    "file_level": "info",  # Level of the file sink, independent of the console
+    "preview_chars": 0,  # Cut agent messages on the console to this length (0 = full)
+    "file": None  # Plain-text copy of every message, never truncated
 }
 
 # Directory structure
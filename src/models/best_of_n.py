@@ -0,0 +1,166 @@
+# src/models/best_of_n.py
+
+import asyncio
+import contextvars
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from src.models.book_structure import BookStructure
+from src.prompts import JUDGE_PROMPT
+from src.utils.irc_logger import irc_logger
+from src.utils.transcript import DebateRecorder
+
+WINNER_PATTERN = re.compile(r'Winner:\s*\[?(\d+)')
+
+def title_score(title, topic=""):
+    """
+    Rank a candidate title by length and overlap with the topic.
+
+    Returns:
+        float: Higher is better; None for an unusable candidate.
+    """
+    words = title.split()
+    if not words or '\n' in title:
+        return None
+    score = 0.0 if 3 <= len(words) <= 10 else -abs(len(words) - 6)
+    topic_words = {word.lower().strip(".,:;!?") for word in topic.split() if len(word) > 3}
+    title_words = {word.lower().strip(".,:;!?") for word in words}
+    score += 2 * min(3, len(topic_words & title_words))
+    return score
+
+def toc_score(toc):
+    """
+    Rank a candidate table of contents by its structure.
+
+    Candidates BookStructure cannot read are unusable. Otherwise 5-15
+    chapters with 2-6 sections each and no repeated titles score best.
+
+    Returns:
+        float: Higher is better; None for an unusable candidate.
+    """
+    structure = BookStructure.parse(toc)
+    if not structure.chapters:
+        return None
+    count = len(structure)
+    score = float(min(count, 15)) - max(0, 5 - count) - max(0, count - 15)
+    balanced = sum(1 for chapter in structure if 2 <= len(chapter.children) <= 6)
+    score += 5 * balanced / count
+    titles = [chapter.title.lower() for chapter in structure]
+    titles += [entry.title.lower() for chapter in structure for entry in chapter.walk()]
+    score -= len(titles) - len(set(titles))
+    return score
+
+class CandidateSelector:
+    """
+    Best-of-N selection for the title and ToC phases.
+
+    Candidate requests run in parallel (a thread pool, or gather on an async
+    client). Unusable candidates are dropped, the rest are ranked by a local
+    heuristic, and an optional single judging call picks the winner; if the
+    judge's reply cannot be read the heuristic ranking stands. Every call is
+    recorded in the active transcript, tagged with its candidate number or
+    as the judge.
+    """
+
+    def __init__(self, kind, criteria, extract, score, agents=None):
+        """
+        Args:
+            kind (str): What is being chosen, e.g. 'title'.
+            criteria (str): Judging criteria inserted into JUDGE_PROMPT.
+            extract (callable): Reply content -> candidate, or None.
+            score (callable): Candidate -> heuristic score, or None if unusable.
+            agents (Agents, optional): Provides the judge; None skips the judging call.
+        """
+        self.kind = kind
+        self.extract = extract
+        self.score = score
+        self.judge_agent = agents.get_judge(JUDGE_PROMPT.format(kind=kind, criteria=criteria)) if agents else None
+        self.calls = 0
+
+    def _collect(self, responses):
+        candidates = []
+        for response in responses:
+            if isinstance(response, Exception) or response is None or not response.messages:
+                continue
+            candidate = self.extract(response.messages[-1].get('content', '') or '')
+            if candidate and candidate not in candidates and self.score(candidate) is not None:
+                candidates.append(candidate)
+        # Best heuristic score first; the judge sees them in this order
+        candidates.sort(key=self.score, reverse=True)
+        irc_logger.system_message(f"{len(candidates)} usable {self.kind} candidates of {len(responses)}.")
+        return candidates
+
+    def _judge_request(self, candidates):
+        listing = '\n\n'.join(f"Candidate {index}:\n{candidate}" for index, candidate in enumerate(candidates, 1))
+        return dict(
+            agent=self.judge_agent,
+            messages=[{"role": "user", "content": f"Choose the best {self.kind}.\n\n{listing}"}],
+            context_variables={},
+            max_turns=1
+        )
+
+    def _winner(self, candidates, response):
+        if response is not None and not isinstance(response, Exception) and response.messages:
+            match = WINNER_PATTERN.search(response.messages[-1].get('content', '') or '')
+            if match and 1 <= int(match.group(1)) <= len(candidates):
+                return candidates[int(match.group(1)) - 1]
+            irc_logger.warning(f"Could not read the judge's choice; using the highest-ranked {self.kind}.")
+        elif isinstance(response, Exception):
+            irc_logger.warning(f"Judging call failed ({response}); using the highest-ranked {self.kind}.")
+        return candidates[0]
+
+    def select(self, requests, run):
+        """
+        Generate candidates with a blocking run function and return the winner.
+
+        Args:
+            requests (list): client.run keyword arguments, one per candidate.
+            run (callable): A blocking run function, e.g. Swarm.run.
+
+        Returns:
+            The winning candidate, or None if no candidate was usable.
+        """
+        def attempt(request, **tags):
+            recorder = DebateRecorder(tags=tags)
+            recorder.prompt(request)
+            try:
+                response = run(**request)
+            except Exception as e:
+                recorder.error(request, e)
+                return e
+            recorder.reply(request, response)
+            return response
+
+        with ThreadPoolExecutor(max_workers=len(requests)) as executor:
+            futures = [
+                executor.submit(contextvars.copy_context().run, attempt, request, candidate=index)
+                for index, request in enumerate(requests, 1)
+            ]
+            responses = [future.result() for future in futures]
+        self.calls += len(requests)
+        candidates = self._collect(responses)
+        if len(candidates) < 2 or self.judge_agent is None:
+            return candidates[0] if candidates else None
+        self.calls += 1
+        return self._winner(candidates, attempt(self._judge_request(candidates), judge=True))
+
+    async def aselect(self, requests, run):
+        """Coroutine version of select() for an async run function."""
+        async def attempt(request, **tags):
+            recorder = DebateRecorder(tags=tags)
+            recorder.prompt(request)
+            try:
+                response = await run(**request)
+            except Exception as e:
+                recorder.error(request, e)
+                return e
+            recorder.reply(request, response)
+            return response
+
+        responses = await asyncio.gather(*(attempt(request, candidate=index) for index, request in enumerate(requests, 1)))
+        self.calls += len(requests)
+        candidates = self._collect(responses)
+        if len(candidates) < 2 or self.judge_agent is None:
+            return candidates[0] if candidates else None
+        self.calls += 1
+        return self._winner(candidates, await attempt(self._judge_request(candidates), judge=True))
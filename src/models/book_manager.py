@@ -1,11 +1,85 @@
 # src/models/book_manager.py
 
+import io
 import os
+import queue
 import re
+import shutil
+import tempfile
+import threading
+
+from src.config import BOOK_OUTPUT
+from src.utils.files import FILE_MODE
+
+def _fsync_dir(dir_path):
+    """Persist renames in a directory (a no-op where directories cannot be opened)."""
+    try:
+        fd = os.open(dir_path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+class AtomicFile(io.FileIO):
+    """
+    Unbuffered binary file written under a temporary name.
+
+    Closing it moves the file into place with os.replace; leaving a with
+    block through an exception discards it, so readers never see a
+    half-written file.
+    """
+
+    def __init__(self, path):
+        self.target = path
+        fd, self.temp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=".tmp-")
+        os.fchmod(fd, FILE_MODE)
+        super().__init__(fd, 'wb')
+        self._discard = False
+
+    def __exit__(self, exc_type, exc, tb):
+        self._discard = exc_type is not None
+        return super().__exit__(exc_type, exc, tb)
+
+    def close(self):
+        if self.closed:
+            return
+        super().close()
+        if self._discard:
+            os.remove(self.temp_path)
+        else:
+            os.replace(self.temp_path, self.target)
 
 class BookManager:
-    def __init__(self, base_path="books"):
+    def __init__(self, base_path="books", verbose=None, write_behind=None, fsync=None):
+        """
+        Args:
+            base_path (str): Directory books are written under.
+            verbose (bool, optional): Print every file written or read.
+            write_behind (bool, optional): Hand section writes to a background thread.
+            fsync (bool, optional): fsync files before they replace their targets.
+
+        Unset options come from BOOK_OUTPUT in src/config.py.
+        """
         self.base_path = base_path
+        self.verbose = BOOK_OUTPUT["verbose"] if verbose is None else verbose
+        self.write_behind = BOOK_OUTPUT["write_behind"] if write_behind is None else write_behind
+        self.fsync = BOOK_OUTPUT["fsync"] if fsync is None else fsync
+        self.batch_size = BOOK_OUTPUT["batch_size"]
+        # Resolved book directories and directories known to exist
+        self._book_paths = {}
+        self._dirs = set()
+        self._lock = threading.Lock()
+        # Write-behind state: path -> bytes not yet on disk
+        self._pending = {}
+        self._queue = None
+        self._writer = None
+        self._error = None
+        # Called with (book_title, number, content) after each section is written
+        self._section_listeners = []
         self._ensure_base_path()
 
     def _ensure_base_path(self):
@@ -14,52 +88,229 @@ class BookManager:
         except OSError as e:
             print(f"Error creating base directory {self.base_path}: {e}")
             raise
+        self._dirs.add(self.base_path)
 
-    def sanitize_title(self, title):
+    @staticmethod
+    def sanitize_title(title):
         """Sanitize the book title to create a valid directory name."""
         sanitized = re.sub(r'[^\w\s-]', '', title).strip().lower()
         sanitized = re.sub(r'[\s_-]+', '_', sanitized)
         return sanitized
 
+    def _ensure_dir(self, dir_path):
+        if dir_path in self._dirs:
+            return dir_path
+        os.makedirs(dir_path, exist_ok=True)
+        with self._lock:
+            self._dirs.add(dir_path)
+        return dir_path
+
     def create_book_directory(self, title):
-        """Create a directory for the book."""
-        sanitized_title = self.sanitize_title(title)
-        book_path = os.path.join(self.base_path, sanitized_title)
+        """Create a directory for the book (resolved once per title)."""
+        book_path = self._book_paths.get(title)
+        if book_path is not None:
+            return book_path
+        book_path = os.path.join(self.base_path, self.sanitize_title(title))
         try:
-            os.makedirs(book_path, exist_ok=True)
+            self._ensure_dir(book_path)
         except OSError as e:
             print(f"Error creating book directory {book_path}: {e}")
             raise
+        with self._lock:
+            self._book_paths[title] = book_path
         return book_path
 
-    def write_content(self, book_title, filename, content, subdir=None):
+    def _dir_path(self, book_title, subdir=None):
+        book_path = self.create_book_directory(book_title)
+        if not subdir:
+            return book_path
+        return self._ensure_dir(os.path.join(book_path, subdir))
+
+    def _write_atomic(self, file_path, data):
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(file_path), prefix=".tmp-")
+        try:
+            os.fchmod(fd, FILE_MODE)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+                if self.fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+            os.replace(temp_path, file_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+    def write_content(self, book_title, filename, content, subdir=None, background=False):
         """Write content to a file within the book's directory.
-    
+
+        The file is written under a temporary name and moved into place, so
+        it is either absent or complete.
+
         Args:
             book_title (str): The title of the book.
             filename (str): The filename to write to.
             content (str): The content to write.
             subdir (str, optional): A subdirectory within the book's directory.
+            background (bool): Queue the write for the write-behind thread;
+                call flush() before reading the file from disk.
+
+        Returns:
+            str: The path of the written file.
         """
-        book_path = self.create_book_directory(book_title)
-        if subdir:
-            dir_path = os.path.join(book_path, subdir)
-            os.makedirs(dir_path, exist_ok=True)
-            file_path = os.path.join(dir_path, filename)
-        else:
-            file_path = os.path.join(book_path, filename)
+        file_path = os.path.join(self._dir_path(book_title, subdir), filename)
+        data = self.strip_markers(content).encode('utf-8')
+        if background:
+            self._enqueue(file_path, data)
+            return file_path
         try:
-            # Remove Consensus markers from content
-            lines = content.splitlines()
-            processed_lines = [line for line in lines if not line.strip().startswith("Consensus:")]
-            content = '\n'.join(processed_lines)
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(content)
-            print(f"Written to {file_path}")
-        except IOError as e:
+            self._write_atomic(file_path, data)
+            if self.verbose:
+                print(f"Written to {file_path}")
+        except OSError as e:
             print(f"Error writing to file {file_path}: {e}")
             raise
+        return file_path
+
+    # Write-behind queue
+
+    def _enqueue(self, file_path, data):
+        with self._lock:
+            if self._error is not None:
+                error, self._error = self._error, None
+                raise error
+            self._pending[file_path] = data
+            if self._writer is None:
+                self._queue = queue.Queue()
+                self._writer = threading.Thread(target=self._write_loop, name="book-writer", daemon=True)
+                self._writer.start()
+        self._queue.put((file_path, data))
+
+    def _write_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            writes = [item for item in batch if item is not None]
+            try:
+                self._write_batch(writes)
+            except Exception as e:
+                with self._lock:
+                    self._error = e
+            finally:
+                with self._lock:
+                    for file_path, data in writes:
+                        if self._pending.get(file_path) is data:
+                            del self._pending[file_path]
+                for _ in batch:
+                    self._queue.task_done()
+            if len(writes) < len(batch):
+                return
+
+    def _write_batch(self, writes):
+        """Write a batch to temp files, fsync them together, then move them into place."""
+        staged = []
+        try:
+            for file_path, data in writes:
+                fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(file_path), prefix=".tmp-")
+                staged.append((temp_path, file_path))
+                os.fchmod(fd, FILE_MODE)
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                    if self.fsync:
+                        f.flush()
+                        os.fsync(f.fileno())
+            for temp_path, file_path in staged:
+                os.replace(temp_path, file_path)
+                if self.verbose:
+                    print(f"Written to {file_path}")
+        except BaseException:
+            for temp_path, _ in staged:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+            raise
+        if self.fsync:
+            for dir_path in {os.path.dirname(file_path) for _, file_path in staged}:
+                _fsync_dir(dir_path)
+
+    def flush(self):
+        """Wait until every queued write is on disk; re-raise a failed background write."""
+        if self._queue is not None:
+            self._queue.join()
+        with self._lock:
+            error, self._error = self._error, None
+        if error is not None:
+            raise error
+
+    def close(self):
+        """Flush queued writes and stop the write-behind thread."""
+        with self._lock:
+            writer, self._writer = self._writer, None
+        if writer is not None:
+            self._queue.put(None)
+            writer.join()
+            self._queue = None
+        self.flush()
     
+    @staticmethod
+    def strip_markers(content):
+        """Remove Consensus marker lines; content without markers is returned untouched."""
+        if "Consensus:" not in content:
+            return content
+        lines = content.splitlines()
+        return '\n'.join(line for line in lines if not line.strip().startswith("Consensus:"))
+
+    def open_stream(self, book_title, filename, subdir=None):
+        """Open an unbuffered binary file in the book's directory for streamed assembly.
+
+        Args:
+            book_title (str): The title of the book.
+            filename (str): The filename to write to.
+            subdir (str, optional): A subdirectory within the book's directory.
+
+        Returns:
+            AtomicFile: The open file; closing it moves it into place.
+        """
+        return AtomicFile(os.path.join(self._dir_path(book_title, subdir), filename))
+
+    @staticmethod
+    def copy_into(out, path):
+        """Append the file at path to out without loading it into memory.
+
+        Uses os.sendfile where the platform supports file-to-file copies and
+        falls back to a buffered copy otherwise.
+
+        Args:
+            out (io.FileIO): Destination opened with open_stream.
+            path (str): Source file.
+
+        Returns:
+            bool: False if the source file does not exist.
+        """
+        try:
+            src = open(path, 'rb')
+        except FileNotFoundError:
+            return False
+        with src:
+            size = os.fstat(src.fileno()).st_size
+            offset = 0
+            if hasattr(os, "sendfile"):
+                try:
+                    while offset < size:
+                        sent = os.sendfile(out.fileno(), src.fileno(), offset, size - offset)
+                        if sent == 0:
+                            break
+                        offset += sent
+                except OSError:
+                    pass
+            if offset < size:
+                src.seek(offset)
+                shutil.copyfileobj(src, out, 1 << 16)
+        return True
+
     def read_file(self, book_title, filename, subdir=None):
         """Read content from a file within the book's directory.
 
@@ -76,15 +327,28 @@ class BookManager:
             file_path = os.path.join(book_path, subdir, filename)
         else:
             file_path = os.path.join(book_path, filename)
+        pending = self._pending.get(file_path)
+        if pending is not None:
+            return pending.decode('utf-8')
         try:
             with open(file_path, 'r', encoding='utf-8') as f:
                 content = f.read()
-            print(f"Read from {file_path}")
+            if self.verbose:
+                print(f"Read from {file_path}")
             return content
         except IOError as e:
             print(f"Error reading file {file_path}: {e}")
             raise
 
+    def add_section_listener(self, listener):
+        """
+        Call listener(book_title, number, content) after every write_section().
+
+        The number is the section number, or the chapter number for a chapter
+        without sections; content has its markers stripped.
+        """
+        self._section_listeners.append(listener)
+
     def write_section(self, book_title, chapter_number, section_number, content):
         """Write a section to the appropriate file.
 
@@ -93,13 +357,29 @@ class BookManager:
             chapter_number (str): The chapter number (e.g., '1').
             section_number (str): The section number (e.g., '1.1').
             content (str): The content of the section.
+
+        Returns:
+            str: The path of the written file.
         """
         if section_number:
             filename = f"chapter_{chapter_number}_section_{section_number.replace('.', '_')}.md"
         else:
             filename = f"chapter_{chapter_number}.md"
         subdir = "sections"
-        self.write_content(book_title, filename, content, subdir=subdir)
+        path = self.write_content(book_title, filename, content, subdir=subdir, background=self.write_behind)
+        if self._section_listeners:
+            stripped = self.strip_markers(content)
+            for listener in self._section_listeners:
+                listener(book_title, section_number or chapter_number, stripped)
+        return path
+
+    def section_path(self, book_title, chapter_number, section_number):
+        """Return the path a section (or whole chapter, if section_number is None) is written to."""
+        if section_number:
+            filename = f"chapter_{chapter_number}_section_{section_number.replace('.', '_')}.md"
+        else:
+            filename = f"chapter_{chapter_number}.md"
+        return os.path.join(self._dir_path(book_title, "sections"), filename)
 
     def write_chapter(self, book_title, chapter_number, content):
         """Write a chapter to the appropriate file.
@@ -0,0 +1,218 @@
+# src/models/book_structure.py
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+from dataclasses import dataclass, field
+
+from src.utils.files import FILE_MODE
+
+# One pattern per line: "1. Title", "1.2. Title", "1.2.3. Title", ...
+NUMBERED_LINE = re.compile(r'^\s*(\d+(?:\.\d+)*)\.\s+(.*\S)')
+
+@dataclass(slots=True)
+class TocEntry:
+    """
+    One numbered heading of the Table of Contents.
+
+    Depth 1 entries are chapters, deeper ones sections. The sort key and the
+    file the entry is written to are computed once, on creation.
+    """
+
+    number: str
+    title: str
+    children: list = field(default_factory=list)
+    sort_key: tuple = field(init=False, repr=False)
+    filename: str = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.sort_key = tuple(int(part) for part in self.number.split('.'))
+        if len(self.sort_key) == 1:
+            self.filename = f"chapter_{self.number}.md"
+        else:
+            self.filename = f"chapter_{self.sort_key[0]}_section_{self.number.replace('.', '_')}.md"
+
+    @property
+    def depth(self):
+        return len(self.sort_key)
+
+    @property
+    def chapter_number(self):
+        return str(self.sort_key[0])
+
+    @property
+    def section_number(self):
+        """The entry's number, or None for a chapter."""
+        return self.number if self.depth > 1 else None
+
+    @property
+    def is_leaf(self):
+        return not self.children
+
+    def walk(self):
+        """Yield every entry below this one, in reading order."""
+        for child in self.children:
+            yield child
+            yield from child.walk()
+
+    def to_dict(self):
+        return {"number": self.number, "title": self.title,
+                "children": [child.to_dict() for child in self.children]}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["number"], data["title"], [cls.from_dict(child) for child in data.get("children", [])])
+
+class BookStructure:
+    """
+    Parsed, indexed Table of Contents shared by generation and compilation.
+
+    Built once per book with parse() and saved next to the ToC as
+    structure.json, so later runs load it instead of parsing again. The
+    stored ToC hash detects a hand-edited table_of_contents.txt.
+    """
+
+    __slots__ = ("chapters", "toc_hash", "_index")
+
+    FILENAME = "structure.json"
+
+    def __init__(self, chapters=(), toc_hash=None):
+        self.chapters = list(chapters)
+        self.toc_hash = toc_hash
+        self._index = {}
+        for chapter in self.chapters:
+            self._index[chapter.number] = chapter
+            for entry in chapter.walk():
+                self._index[entry.number] = entry
+
+    @staticmethod
+    def hash_toc(toc):
+        return hashlib.sha256(toc.encode('utf-8')).hexdigest()
+
+    @classmethod
+    def parse(cls, toc):
+        """
+        Parse Table of Contents text of any depth.
+
+        Each entry nests under the closest preceding entry of lower depth.
+        Sections that appear before the first chapter are ignored. A section
+        numbered outside its parent (e.g. 3.1 listed under chapter 2), or
+        repeating a number already used, is renumbered within the parent so
+        that its number, file and chapter agree.
+
+        Args:
+            toc (str): The Table of Contents as a string.
+
+        Returns:
+            BookStructure: The parsed structure.
+        """
+        chapters = []
+        stack = []
+        used = set()
+        for line in toc.split('\n'):
+            match = NUMBERED_LINE.match(line)
+            if not match:
+                continue
+            entry = TocEntry(match.group(1), match.group(2))
+            while stack and stack[-1].depth >= entry.depth:
+                stack.pop()
+            if entry.depth == 1:
+                chapters.append(entry)
+            elif stack:
+                parent = stack[-1]
+                if not entry.number.startswith(parent.number + '.') or entry.number in used:
+                    position = entry.sort_key[-1]
+                    while f"{parent.number}.{position}" in used:
+                        position += 1
+                    entry = TocEntry(f"{parent.number}.{position}", entry.title)
+                parent.children.append(entry)
+            else:
+                continue
+            used.add(entry.number)
+            stack.append(entry)
+        return cls(chapters, cls.hash_toc(toc))
+
+    def __len__(self):
+        return len(self.chapters)
+
+    def __iter__(self):
+        return iter(self.chapters)
+
+    def __contains__(self, number):
+        return str(number) in self._index
+
+    def get(self, number, default=None):
+        """Return the entry for a chapter or section number such as '2' or '2.1'."""
+        return self._index.get(str(number), default)
+
+    def chapter_of(self, number):
+        """Return the chapter containing a section number, or None."""
+        return self._index.get(str(number).split('.')[0])
+
+    def units(self):
+        """
+        Return the entries that are written as one unit each.
+
+        These are the leaf sections of every chapter, and whole chapters that
+        have no sections.
+
+        Returns:
+            list: TocEntry objects in reading order.
+        """
+        units = []
+        for chapter in self.chapters:
+            if chapter.is_leaf:
+                units.append(chapter)
+            else:
+                units.extend(entry for entry in chapter.walk() if entry.is_leaf)
+        return units
+
+    def to_dict(self):
+        return {"version": 1, "toc_hash": self.toc_hash,
+                "chapters": [chapter.to_dict() for chapter in self.chapters]}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls([TocEntry.from_dict(chapter) for chapter in data["chapters"]], data.get("toc_hash"))
+
+    def save(self, book_path):
+        """Atomically write structure.json into the book directory."""
+        path = os.path.join(book_path, self.FILENAME)
+        fd, tmp_path = tempfile.mkstemp(dir=book_path, prefix=".structure.", suffix=".tmp")
+        os.fchmod(fd, FILE_MODE)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(self.to_dict(), f, indent=2)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return path
+
+    @classmethod
+    def load(cls, book_path, toc):
+        """
+        Load the saved structure of a book, or parse the ToC if it is missing or stale.
+
+        Args:
+            book_path (str): The book directory.
+            toc (str): The book's current Table of Contents text.
+
+        Returns:
+            BookStructure: The structure matching toc.
+        """
+        path = os.path.join(book_path, cls.FILENAME)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                structure = cls.from_dict(json.load(f))
+            if structure.toc_hash == cls.hash_toc(toc):
+                return structure
+        except (OSError, ValueError, KeyError):
+            pass
+        structure = cls.parse(toc)
+        if os.path.isdir(book_path):
+            structure.save(book_path)
+        return structure
@@ -0,0 +1,141 @@
+# src/models/budget.py
+
+import contextvars
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+from src.agents.usage import usage_tracker
+from src.config import BUDGET
+
+# Budget of the book being written. Context variables follow asyncio tasks;
+# thread pools must copy the context.
+_current = contextvars.ContextVar("book_budget", default=None)
+
+def current_budget():
+    """Return the BookBudget active in this context, or None."""
+    return _current.get()
+
+class BookBudget:
+    """
+    Token, call and wall-clock budget for a whole book.
+
+    Spending is read from the shared usage tracker and the clock, so cache
+    hits cost nothing. Once sections are planned, each new section debate
+    gets an even share of what is left, converted into turns at the observed
+    cost per call. When only the reserve is left, debates force consensus
+    on their next turn.
+    """
+
+    def __init__(self, settings=None, tracker=None, spent_before=None):
+        self.settings = dict(BUDGET, **(settings or {}))
+        self.tracker = tracker or usage_tracker
+        # Calls, tokens and seconds spent on the book before this budget, e.g. by other queue workers
+        self._before = dict(spent_before or {})
+        self._lock = threading.Lock()
+        self._start = self.tracker.snapshot()
+        self._started_at = time.monotonic()
+        self.sections_planned = 0
+        self.sections_finished = 0
+
+    @property
+    def enabled(self):
+        return any(self.settings.get(key) for key in ("max_tokens", "max_calls", "max_seconds"))
+
+    @contextmanager
+    def activate(self):
+        """Make this the budget for every debate started inside the block."""
+        token = _current.set(self)
+        try:
+            yield self
+        finally:
+            _current.reset(token)
+
+    def plan_sections(self, count):
+        """Declare how many section debates the rest of the budget is shared between."""
+        with self._lock:
+            self.sections_planned = count
+            self.sections_finished = 0
+
+    def section_finished(self):
+        with self._lock:
+            self.sections_finished += 1
+
+    def spent(self):
+        """Return the calls, tokens and seconds spent since the budget was created."""
+        now = self.tracker.snapshot()
+        return {
+            "calls": now["calls"] - self._start["calls"] + self._before.get("calls", 0),
+            "tokens": (now["prompt_tokens"] + now["completion_tokens"]
+                       - self._start["prompt_tokens"] - self._start["completion_tokens"]
+                       + self._before.get("tokens", 0)),
+            "seconds": time.monotonic() - self._started_at + self._before.get("seconds", 0),
+        }
+
+    def _limits(self):
+        return {
+            "calls": self.settings.get("max_calls"),
+            "tokens": self.settings.get("max_tokens"),
+            "seconds": self.settings.get("max_seconds"),
+        }
+
+    def remaining_share(self):
+        """Return the smallest fraction left of any configured limit (1.0 if none is set)."""
+        spent = self.spent()
+        shares = [1 - spent[name] / limit for name, limit in self._limits().items() if limit]
+        return max(0.0, min(shares)) if shares else 1.0
+
+    def nearly_spent(self):
+        """True once no more than the reserve is left of any limit."""
+        return self.enabled and self.remaining_share() <= self.settings.get("reserve", 0.05)
+
+    def remaining_calls(self):
+        """
+        Estimate how many more calls the budget allows.
+
+        Token and time limits are converted into calls at the average cost
+        per call observed so far; they are ignored until a call is recorded.
+        """
+        spent = self.spent()
+        limits = self._limits()
+        estimates = []
+        if limits["calls"]:
+            estimates.append(limits["calls"] - spent["calls"])
+        if spent["calls"]:
+            for name in ("tokens", "seconds"):
+                if limits[name]:
+                    per_call = spent[name] / spent["calls"]
+                    if per_call > 0:
+                        estimates.append((limits[name] - spent[name]) / per_call)
+        return max(0.0, min(estimates)) if estimates else None
+
+    def turn_limit(self, default):
+        """
+        Return the turn limit for a debate starting now.
+
+        Args:
+            default (int): The phase's configured max_attempts.
+
+        Returns:
+            int: Between the configured min_turns and default.
+        """
+        if not self.enabled:
+            return default
+        with self._lock:
+            sections_left = self.sections_planned - self.sections_finished
+        calls = self.remaining_calls()
+        if calls is None or sections_left <= 0:
+            return default
+        min_turns = min(self.settings.get("min_turns", 2), default)
+        return max(min_turns, min(default, math.floor(calls / sections_left)))
+
+    def snapshot(self):
+        spent = self.spent()
+        return {
+            "spent": spent,
+            "limits": self._limits(),
+            "remaining_share": self.remaining_share(),
+            "sections_finished": self.sections_finished,
+            "sections_planned": self.sections_planned,
+        }
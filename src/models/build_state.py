@@ -0,0 +1,100 @@
+# src/models/build_state.py
+
+import hashlib
+import json
+import os
+import tempfile
+
+from src.utils.files import FILE_MODE
+
+class BuildState:
+    """
+    Make-style dependency tracking for compiled book outputs.
+
+    Each target (a chapter file or final_book.md) records the fingerprints of
+    its inputs, a metadata string (titles and headings that end up in the
+    output) and the fingerprint of the output it produced. A target is stale
+    when any of those differ. File checks are stat-first: the content hash is
+    only recomputed when mtime or size changed, so a no-op compile costs one
+    stat per file.
+
+    The state lives in .build_state.json inside the book directory.
+    """
+
+    FILENAME = ".build_state.json"
+
+    def __init__(self, book_path):
+        self.book_path = book_path
+        self.path = os.path.join(book_path, self.FILENAME)
+        self.targets = {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.targets = json.load(f).get("targets", {})
+        except (OSError, ValueError):
+            self.targets = {}
+
+    def _rel(self, path):
+        return os.path.relpath(path, self.book_path)
+
+    @staticmethod
+    def _hash(path):
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 16), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def fingerprint(self, path, previous=None):
+        """
+        Return {mtime_ns, size, hash} for path, or None if it does not exist.
+
+        The hash is reused from previous when mtime and size are unchanged.
+        """
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        if previous and previous.get("mtime_ns") == stat.st_mtime_ns and previous.get("size") == stat.st_size:
+            return previous
+        return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "hash": self._hash(path)}
+
+    def _same(self, old, new):
+        return old is not None and new is not None and old.get("hash") == new.get("hash")
+
+    def is_stale(self, target, inputs, meta=""):
+        """
+        Return True if target must be rebuilt from inputs.
+
+        Args:
+            target (str): Output file path.
+            inputs (list): Input file paths, in the order they are used.
+            meta (str): Any other text the output depends on.
+        """
+        record = self.targets.get(self._rel(target))
+        if record is None or record.get("meta") != meta:
+            return True
+        recorded_inputs = record.get("inputs", [])
+        if [rel for rel, _ in recorded_inputs] != [self._rel(path) for path in inputs]:
+            return True
+        for path, (_, old) in zip(inputs, recorded_inputs):
+            if not self._same(old, self.fingerprint(path, old)):
+                return True
+        old_output = record.get("output")
+        return not self._same(old_output, self.fingerprint(target, old_output))
+
+    def record(self, target, inputs, meta=""):
+        """Remember the inputs and output of a freshly built target."""
+        self.targets[self._rel(target)] = {
+            "meta": meta,
+            # A list rather than a dict: input order matters and must survive sort_keys
+            "inputs": [[self._rel(path), self.fingerprint(path)] for path in inputs],
+            "output": self.fingerprint(target),
+        }
+
+    def save(self):
+        """Atomically write the build state to disk."""
+        fd, tmp_path = tempfile.mkstemp(dir=self.book_path, prefix=".build_state.", suffix=".tmp")
+        os.fchmod(fd, FILE_MODE)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump({"version": 1, "targets": self.targets}, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,196 @@
+# src/models/continuity.py
+
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+
+from src.agents.history import estimate_tokens
+from src.config import CONTINUITY
+
+WORD = re.compile(r'[a-z0-9]+')
+STOPWORDS = frozenset(
+    "the and for are but not you all any can had her was one our out has have with this that from they "
+    "will would there their what about which when your into more other than then them these some its "
+    "also how may such each only over most very just like been were who does should could".split()
+)
+
+def tokenize(text):
+    """Lower-case words of three or more characters, without common stopwords."""
+    return [word for word in WORD.findall(text.lower()) if len(word) > 2 and word not in STOPWORDS]
+
+class ContinuityIndex:
+    """
+    In-memory BM25 index over the sections of one book written so far.
+
+    Each section is split into passages of about ``passage_tokens`` tokens
+    and added to an inverted index as soon as it is saved (register it with
+    BookManager.add_section_listener). Before a section debate starts,
+    context() returns the passages most relevant to that section, cut to a
+    fixed token limit, so the prompt stays the same size however long the
+    book grows.
+    """
+
+    def __init__(self, book_title, structure=None, settings=None):
+        """
+        Args:
+            book_title (str): Only sections of this book are indexed.
+            structure (BookStructure, optional): Supplies section titles for the passage labels.
+            settings (dict, optional): Overrides for CONTINUITY in src/config.py.
+        """
+        self.book_title = book_title
+        self.structure = structure
+        self.settings = dict(CONTINUITY, **(settings or {}))
+        self._lock = threading.Lock()
+        # term -> {passage id: term frequency}
+        self._postings = defaultdict(dict)
+        # passage id -> (section number, text, length in terms, distinct terms)
+        self._passages = {}
+        self._by_section = defaultdict(list)
+        self._total_length = 0
+        self._next_id = 0
+        # section number -> passages fixed by pin()
+        self._pinned = {}
+
+    @property
+    def enabled(self):
+        return self.settings["enabled"]
+
+    def __len__(self):
+        return len(self._passages)
+
+    def _split(self, content):
+        limit = self.settings["passage_tokens"] * 4
+        passages, current = [], ""
+        for paragraph in re.split(r'\n\s*\n', content):
+            paragraph = ' '.join(paragraph.split())
+            if not paragraph:
+                continue
+            # Paragraphs longer than a passage are cut at word boundaries
+            while len(paragraph) > limit:
+                cut = paragraph.rfind(' ', 0, limit)
+                cut = cut if cut > 0 else limit
+                passages.append(paragraph[:cut])
+                paragraph = paragraph[cut:].lstrip()
+            if current and len(current) + len(paragraph) + 1 > limit:
+                passages.append(current)
+                current = ""
+            current = f"{current}\n{paragraph}" if current else paragraph
+        if current:
+            passages.append(current)
+        return passages
+
+    def _remove(self, number):
+        for passage_id in self._by_section.pop(number, []):
+            _, _, length, terms = self._passages.pop(passage_id)
+            self._total_length -= length
+            for term in terms:
+                postings = self._postings[term]
+                del postings[passage_id]
+                if not postings:
+                    del self._postings[term]
+
+    def add(self, number, content):
+        """
+        Index a section, replacing any earlier version of it.
+
+        Args:
+            number (str): Chapter or section number, e.g. '2.1'.
+            content (str): The section text.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self._remove(number)
+            for text in self._split(content):
+                terms = Counter(tokenize(text))
+                if not terms:
+                    continue
+                passage_id = self._next_id
+                self._next_id += 1
+                length = sum(terms.values())
+                self._passages[passage_id] = (number, text, length, tuple(terms))
+                self._by_section[number].append(passage_id)
+                self._total_length += length
+                for term, count in terms.items():
+                    self._postings[term][passage_id] = count
+
+    def section_written(self, book_title, number, content):
+        """BookManager section listener; indexes sections of this index's book."""
+        if book_title == self.book_title:
+            self.add(number, content)
+
+    def search(self, query, k=None, exclude=None):
+        """
+        Rank passages against a query with BM25.
+
+        Args:
+            query (str): Free text, e.g. a section title.
+            k (int, optional): Number of passages to return; defaults to top_k.
+            exclude (str, optional): Section number whose passages are skipped.
+
+        Returns:
+            list: (score, section number, text) tuples, best first.
+        """
+        k = self.settings["top_k"] if k is None else k
+        k1, b = self.settings["k1"], self.settings["b"]
+        with self._lock:
+            count = len(self._passages)
+            if not count:
+                return []
+            average = self._total_length / count
+            scores = defaultdict(float)
+            for term in set(tokenize(query)):
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for passage_id, tf in postings.items():
+                    length = self._passages[passage_id][2]
+                    scores[passage_id] += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * length / average))
+            ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+            results = []
+            for passage_id, score in ranked:
+                number, text = self._passages[passage_id][:2]
+                if number == exclude:
+                    continue
+                results.append((score, number, text))
+                if len(results) == k:
+                    break
+            return results
+
+    def _label(self, number):
+        entry = self.structure.get(number) if self.structure is not None else None
+        return f"Section {number}: {entry.title}" if entry else f"Section {number}"
+
+    def pin(self, number, passages):
+        """Make context() return these passages for a section, e.g. once its opening turn was batched."""
+        with self._lock:
+            self._pinned[number] = passages
+
+    def context(self, number, query):
+        """
+        Return the most relevant passages for a section, within the token limit.
+
+        Args:
+            number (str): The section being written; its own passages are skipped.
+            query (str): Text describing the section, e.g. its chapter and section titles.
+
+        Returns:
+            str: Labelled passages, or an empty string if nothing relevant was found.
+        """
+        if not self.enabled:
+            return ""
+        with self._lock:
+            if number in self._pinned:
+                return self._pinned[number]
+        budget = self.settings["max_tokens"]
+        blocks = []
+        for _, source, text in self.search(query, exclude=number):
+            block = f"[{self._label(source)}]\n{text}"
+            cost = estimate_tokens([{"content": block}])
+            if cost > budget:
+                break
+            blocks.append(block)
+            budget -= cost
+        return '\n\n'.join(blocks)
@@ -0,0 +1,326 @@
+# src/models/job_queue.py
+
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+
+from src.config import JOB_QUEUE
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS books (
+    book TEXT PRIMARY KEY,          -- book directory
+    title TEXT NOT NULL,
+    state TEXT NOT NULL,            -- writing, compiling, compiled, failed
+    compile_attempts INTEGER NOT NULL DEFAULT 0,
+    calls INTEGER NOT NULL DEFAULT 0,   -- agent calls and tokens spent on the book so far,
+    tokens INTEGER NOT NULL DEFAULT 0,  -- for its BookBudget across workers
+    started REAL NOT NULL,          -- wall-clock start of the book's budget
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    book TEXT NOT NULL REFERENCES books(book),
+    number TEXT NOT NULL,           -- section number, or chapter number for a whole chapter
+    title TEXT NOT NULL,
+    position INTEGER NOT NULL,      -- reading order within the book
+    state TEXT NOT NULL,            -- pending, leased, done, failed
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_until REAL,
+    heartbeat REAL,
+    error TEXT,
+    updated REAL NOT NULL,
+    PRIMARY KEY (book, number)
+);
+CREATE INDEX IF NOT EXISTS jobs_claimable ON jobs (state, lease_until);
+"""
+
+# Columns added to books after its first release, for queue files created before them
+BOOK_COLUMNS = {
+    "compile_attempts": "INTEGER NOT NULL DEFAULT 0",
+    "calls": "INTEGER NOT NULL DEFAULT 0",
+    "tokens": "INTEGER NOT NULL DEFAULT 0",
+    "started": "REAL NOT NULL DEFAULT 0",
+}
+
+def worker_id():
+    """Identify this thread of this process on this host, e.g. for leases."""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+class SectionJob:
+    """One leased section: its book, number, title and attempt count."""
+
+    __slots__ = ("book", "number", "title", "attempts", "worker")
+
+    def __init__(self, book, number, title, attempts, worker):
+        self.book = book
+        self.number = number
+        self.title = title
+        self.attempts = attempts
+        self.worker = worker
+
+class SectionQueue:
+    """
+    Durable queue of section jobs in a local SQLite file.
+
+    Each unit of a book's ToC is one row. Workers claim a row under a lease,
+    renew it with heartbeats while the debate runs, and report the outcome.
+    A lease that is not renewed expires, so the section is claimed again
+    after a worker crashes; a job is given up after ``max_attempts`` claims.
+    The worker that finishes a book's last job claims its compile step, and
+    a book whose compile step fails ``max_attempts`` times is marked failed.
+
+    Several processes, and hosts sharing the filesystem, may use one file.
+    The rollback journal is used rather than WAL, which needs shared memory
+    that network filesystems do not provide.
+    """
+
+    def __init__(self, path, settings=None):
+        self.path = path
+        self.settings = dict(JOB_QUEUE, **(settings or {}))
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = self._connection()
+        conn.executescript(SCHEMA)
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(books)")}
+        for name, definition in BOOK_COLUMNS.items():
+            if name not in columns:
+                conn.execute(f"ALTER TABLE books ADD COLUMN {name} {definition}")
+                if name == "started":
+                    conn.execute("UPDATE books SET started = created")
+
+    def _connection(self):
+        # sqlite3 connections must stay on the thread that opened them
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.settings["busy_timeout"], isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def _transaction(self, sql, params=()):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = conn.execute(sql, params)
+            conn.execute("COMMIT")
+            return cursor
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def enqueue_book(self, book, title, units, done=(), spent=None):
+        """
+        Add a book's units to the queue; units already queued are left alone.
+
+        Args:
+            book (str): The book directory.
+            title (str): The book title.
+            units (list): TocEntry objects in reading order (structure.units()).
+            done (iterable): Numbers of units already written.
+            spent (dict, optional): BookBudget.spent() of the run queuing the book;
+                the book's budget starts over from it.
+
+        Returns:
+            int: Number of jobs added.
+        """
+        done = set(done)
+        spent = spent or {}
+        now = time.time()
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT INTO books (book, title, state, calls, tokens, started, created, updated) "
+                "VALUES (?, ?, 'writing', ?, ?, ?, ?, ?) "
+                "ON CONFLICT(book) DO UPDATE SET state = 'writing', compile_attempts = 0, calls = excluded.calls, "
+                "tokens = excluded.tokens, started = excluded.started, updated = excluded.updated",
+                (book, title, spent.get("calls", 0), spent.get("tokens", 0), now - spent.get("seconds", 0), now, now)
+            )
+            added = 0
+            for position, entry in enumerate(units):
+                cursor = conn.execute(
+                    "INSERT OR IGNORE INTO jobs (book, number, title, position, state, updated) VALUES (?, ?, ?, ?, ?, ?)",
+                    (book, entry.number, entry.title, position, "done" if entry.number in done else "pending", now)
+                )
+                added += cursor.rowcount
+            # Failed jobs of a book queued again get a fresh set of attempts
+            conn.execute(
+                "UPDATE jobs SET state = 'pending', attempts = 0, error = NULL, updated = ? "
+                "WHERE book = ? AND state = 'failed'",
+                (now, book)
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return added
+
+    def claim(self, worker):
+        """
+        Lease the next pending (or expired) job, oldest book first.
+
+        Returns:
+            SectionJob: The leased job, or None if nothing can be claimed.
+        """
+        now = time.time()
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT jobs.book, number, jobs.title, attempts FROM jobs JOIN books USING (book) "
+                "WHERE jobs.state = 'pending' OR (jobs.state = 'leased' AND lease_until < ?) "
+                "ORDER BY books.created, position LIMIT 1",
+                (now,)
+            ).fetchone()
+            if row is None:
+                conn.execute("COMMIT")
+                return None
+            if row["attempts"] >= self.settings["max_attempts"]:
+                # Its last lease expired: give up on it instead of claiming it again
+                conn.execute(
+                    "UPDATE jobs SET state = 'failed', worker = NULL, error = 'lease expired', updated = ? "
+                    "WHERE book = ? AND number = ?",
+                    (now, row["book"], row["number"])
+                )
+                conn.execute("COMMIT")
+                return self.claim(worker)
+            conn.execute(
+                "UPDATE jobs SET state = 'leased', worker = ?, attempts = attempts + 1, "
+                "lease_until = ?, heartbeat = ?, updated = ? WHERE book = ? AND number = ?",
+                (worker, now + self.settings["lease_seconds"], now, now, row["book"], row["number"])
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return SectionJob(row["book"], row["number"], row["title"], row["attempts"] + 1, worker)
+
+    def heartbeat(self, job):
+        """
+        Extend a job's lease.
+
+        Returns:
+            bool: False if the lease was lost to another worker.
+        """
+        now = time.time()
+        cursor = self._transaction(
+            "UPDATE jobs SET lease_until = ?, heartbeat = ? WHERE book = ? AND number = ? "
+            "AND worker = ? AND state = 'leased'",
+            (now + self.settings["lease_seconds"], now, job.book, job.number, job.worker)
+        )
+        return cursor.rowcount == 1
+
+    def complete(self, job, ok, error=None):
+        """
+        Record a job's outcome. A failed job goes back to pending until it runs out of attempts.
+
+        Returns:
+            bool: False if the lease had been lost and the outcome was ignored.
+        """
+        if ok:
+            state = "done"
+        else:
+            state = "failed" if job.attempts >= self.settings["max_attempts"] else "pending"
+        cursor = self._transaction(
+            "UPDATE jobs SET state = ?, worker = NULL, lease_until = NULL, error = ?, updated = ? "
+            "WHERE book = ? AND number = ? AND worker = ? AND state = 'leased'",
+            (state, error, time.time(), job.book, job.number, job.worker)
+        )
+        return cursor.rowcount == 1
+
+    def claim_compile(self, book):
+        """
+        Take the compile step of a book whose jobs are all finished.
+
+        Exactly one caller gets True, once no job is pending or leased.
+        """
+        cursor = self._transaction(
+            "UPDATE books SET state = 'compiling', compile_attempts = compile_attempts + 1, updated = ? "
+            "WHERE book = ? AND state = 'writing' "
+            "AND NOT EXISTS (SELECT 1 FROM jobs WHERE jobs.book = books.book AND state IN ('pending', 'leased'))",
+            (time.time(), book)
+        )
+        return cursor.rowcount == 1
+
+    def mark_compiled(self, book, ok=True):
+        """
+        Record the end of a compile step.
+
+        A failed one can be claimed again until the book has used up
+        ``max_attempts`` compile attempts; the book is then marked failed.
+
+        Returns:
+            str: The book's new state: 'compiled', 'writing' or 'failed'.
+        """
+        if ok:
+            self._transaction("UPDATE books SET state = 'compiled', updated = ? WHERE book = ?", (time.time(), book))
+            return "compiled"
+        self._transaction(
+            "UPDATE books SET state = CASE WHEN compile_attempts >= ? THEN 'failed' ELSE 'writing' END, "
+            "updated = ? WHERE book = ?",
+            (self.settings["max_attempts"], time.time(), book)
+        )
+        row = self._connection().execute("SELECT state FROM books WHERE book = ?", (book,)).fetchone()
+        return row["state"] if row else "failed"
+
+    def book_spent(self, book):
+        """Return the calls, tokens and seconds spent on a book so far, as BookBudget.spent() does."""
+        row = self._connection().execute("SELECT calls, tokens, started FROM books WHERE book = ?", (book,)).fetchone()
+        if row is None:
+            return {}
+        return {"calls": row["calls"], "tokens": row["tokens"], "seconds": max(0.0, time.time() - row["started"])}
+
+    def add_spent(self, book, calls, tokens):
+        """Add the calls and tokens of one finished job to its book's total."""
+        self._transaction(
+            "UPDATE books SET calls = calls + ?, tokens = tokens + ?, updated = ? WHERE book = ?",
+            (calls, tokens, time.time(), book)
+        )
+
+    def unfinished(self, book):
+        """Return how many jobs of a book are pending or leased."""
+        row = self._connection().execute(
+            "SELECT COUNT(*) FROM jobs WHERE book = ? AND state IN ('pending', 'leased')", (book,)
+        ).fetchone()
+        return row[0]
+
+    def book_jobs(self, book):
+        """Return {number: state} for every job of a book."""
+        rows = self._connection().execute("SELECT number, state FROM jobs WHERE book = ?", (book,))
+        return {row["number"]: row["state"] for row in rows}
+
+    def has_work(self):
+        """True while any job is pending or leased (a lease may still expire and be claimed)."""
+        row = self._connection().execute("SELECT 1 FROM jobs WHERE state IN ('pending', 'leased') LIMIT 1").fetchone()
+        return row is not None
+
+    def ready_books(self):
+        """Return the books waiting for their compile step."""
+        rows = self._connection().execute(
+            "SELECT book FROM books WHERE state = 'writing' "
+            "AND NOT EXISTS (SELECT 1 FROM jobs WHERE jobs.book = books.book AND state IN ('pending', 'leased')) "
+            "ORDER BY created"
+        )
+        return [row["book"] for row in rows]
+
+    def status(self):
+        """Return per-book counts of jobs in each state."""
+        rows = self._connection().execute(
+            "SELECT books.book, books.title, books.state AS book_state, jobs.state, COUNT(*) AS count "
+            "FROM books JOIN jobs USING (book) GROUP BY books.book, jobs.state ORDER BY books.created"
+        )
+        books = {}
+        for row in rows:
+            entry = books.setdefault(row["book"], {"title": row["title"], "state": row["book_state"], "jobs": {}})
+            entry["jobs"][row["state"]] = row["count"]
+        return books
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
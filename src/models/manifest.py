@@ -0,0 +1,144 @@
+# src/models/manifest.py
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+from src.utils.files import FILE_MODE
+
+class BookManifest:
+    """
+    Per-book record of which phases and sections are finished.
+
+    Stored as manifest.json next to table_of_contents.txt and rewritten
+    atomically (temp file + os.replace) after every change, so a crash never
+    leaves a truncated manifest behind. Each entry records its state
+    ('done' or 'failed'), the SHA-256 of the file content and the number of
+    attempts.
+    """
+
+    FILENAME = "manifest.json"
+
+    def __init__(self, book_path, fresh=False):
+        """
+        Args:
+            book_path (str): The book directory.
+            fresh (bool): Ignore any existing manifest, e.g. for a new run.
+        """
+        self.book_path = book_path
+        self.path = os.path.join(book_path, self.FILENAME)
+        self._lock = threading.Lock()
+        self.data = {"version": 1, "phases": {}, "sections": {}}
+        # Directories written before manifests existed have none to load
+        self.legacy = not fresh and not os.path.exists(self.path)
+        if not fresh and not self.legacy:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.data.update(json.load(f))
+
+    @staticmethod
+    def content_hash(content):
+        """Return the SHA-256 hex digest of a string."""
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def file_hash(path):
+        """Return the SHA-256 hex digest of a file, or None if it cannot be read."""
+        digest = hashlib.sha256()
+        try:
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(1 << 16), b''):
+                    digest.update(block)
+        except OSError:
+            return None
+        return digest.hexdigest()
+
+    def save(self):
+        """Atomically write the manifest to disk."""
+        with self._lock:
+            payload = json.dumps(self.data, indent=2, sort_keys=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.book_path, prefix=".manifest.", suffix=".tmp")
+            os.fchmod(fd, FILE_MODE)
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    f.write(payload)
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+
+    def _update(self, table, key, state, content_hash):
+        with self._lock:
+            entry = self.data[table].setdefault(key, {"attempts": 0})
+            entry["state"] = state
+            entry["attempts"] += 1
+            entry["updated"] = time.time()
+            if content_hash is not None:
+                entry["hash"] = content_hash
+        self.save()
+
+    def mark_phase(self, phase, state, content=None):
+        """
+        Record the outcome of a book-level phase such as 'title' or 'toc'.
+
+        Args:
+            phase (str): The phase name.
+            state (str): 'done' or 'failed'.
+            content (str, optional): The phase output, hashed for later checks.
+        """
+        self._update("phases", phase, state, self.content_hash(content) if content is not None else None)
+
+    def mark_section(self, key, state, path=None, content=None):
+        """
+        Record the outcome of one chapter or section.
+
+        Args:
+            key (str): The section number (or chapter number for whole chapters).
+            state (str): 'done' or 'failed'.
+            path (str, optional): The written section file, hashed for later checks.
+            content (str, optional): The text written to path; hashed instead of
+                reading the file back, e.g. while a write-behind queue holds it.
+        """
+        if content is not None:
+            content_hash = self.content_hash(content)
+        else:
+            content_hash = self.file_hash(path) if path else None
+        self._update("sections", key, state, content_hash)
+
+    def phase_done(self, phase):
+        return self.data["phases"].get(phase, {}).get("state") == "done"
+
+    def section_done(self, key, path):
+        """
+        Return True if the section is recorded as done and its file is still there.
+
+        Books written before manifests existed have no entries; an existing,
+        non-empty section file is accepted as done for them. A file edited by
+        hand still counts as done; see refresh_section().
+        """
+        if not (os.path.exists(path) and os.path.getsize(path) > 0):
+            return False
+        entry = self.data["sections"].get(key)
+        if entry is None:
+            return self.legacy
+        return entry.get("state") == "done"
+
+    def refresh_section(self, key, path):
+        """
+        Re-record the hash of a done section whose file changed, e.g. after a manual edit.
+
+        Returns:
+            bool: True if the file had changed since it was recorded.
+        """
+        content_hash = self.file_hash(path)
+        with self._lock:
+            entry = self.data["sections"].get(key)
+            if entry is None or content_hash is None or entry.get("hash") == content_hash:
+                return False
+            entry["hash"] = content_hash
+            entry["updated"] = time.time()
+        self.save()
+        return True
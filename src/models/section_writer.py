@@ -1,37 +1,69 @@
 # src/models/section_writer.py
 
 from src.agents.agents import Agents
-from src.prompts.section_prompts import SECTION_PROMPT_ZERO, SECTION_PROMPT_GUSTAVE
+from src.agents.client_registry import client_registry
+from src.agents.debate import run_debate, arun_debate
+from src.agents.history import HistoryPolicy
+from src.agents.streaming import StreamingRunner
+from src.models.book_manager import BookManager
+from src.models.budget import current_budget
+from src.models.toc_context import TocContextBuilder
+from src.models.book_structure import BookStructure
+from src.prompts.section_prompts import SECTION_PROMPT_ZERO, SECTION_PROMPT_GUSTAVE, BOOK_CONTEXT, SECTION_ASSIGNMENT, CONTINUITY_CONTEXT
 from src.utils.irc_logger import irc_logger
-from src.config import SECTION_GENERATION  # Ensure you have this config
+from src.utils.metrics import metrics
+from src.config import OUTPUT_DIR, SECTION_GENERATION, STREAMING  # Ensure you have this config
+import os
 import traceback
 
 class SectionWriter:
-    def __init__(self, book_title, full_toc, section_number, section_title):
+    def __init__(self, book_title, full_toc, section_number, section_title, structure=None, toc_detail=None, continuity=None):
         self.book_title = book_title
         self.full_toc = full_toc
         self.section_number = section_number
         self.section_title = section_title
+        # Parsed ToC; pass it in to avoid re-parsing full_toc for every section
+        self.structure = structure if structure is not None else BookStructure.parse(full_toc)
+        toc_builder = TocContextBuilder(self.structure, toc=full_toc, detail=toc_detail)
+        self.toc_outline = toc_builder.outline()
+        self.toc_focus = toc_builder.focus(section_number)
+        self.toc_context = toc_builder.build(section_number)
+        # Relevant passages of sections already written, if an index is given
+        self.continuity = self._continuity_context(continuity)
         self.agents = Agents()
         self.messages = []
+        self.history_policy = HistoryPolicy.from_config()
         self.section_content = None
         self.title = None
+        self.streamed_live = False
         self._setup_agents()
 
+    def _continuity_context(self, continuity):
+        """Return the passages of earlier sections most relevant to this one"""
+        if continuity is None:
+            return ""
+        chapter = self.structure.chapter_of(self.section_number)
+        query = f"{chapter.title if chapter else ''} {self.section_title}"
+        return continuity.context(self.section_number, query)
+
     def _setup_agents(self):
         """Initialize the Zero and Gustave agents with section-specific prompts"""
-        formatted_zero_prompt = SECTION_PROMPT_ZERO.format(
-            book_title=self.book_title,
-            full_toc=self.full_toc,
-            section_number=self.section_number,
-            section_title=self.section_title
-        )
-        formatted_gustave_prompt = SECTION_PROMPT_GUSTAVE.format(
+        # Persona and book context come first so every section of the book shares
+        # a byte-identical prompt prefix; the section assignment goes last.
+        prompt_values = dict(
             book_title=self.book_title,
-            full_toc=self.full_toc,
+            toc_outline=self.toc_outline,
             section_number=self.section_number,
-            section_title=self.section_title
+            section_title=self.section_title,
+            toc_focus=self.toc_focus
         )
+        formatted_zero_prompt = (SECTION_PROMPT_ZERO + BOOK_CONTEXT + SECTION_ASSIGNMENT).format(**prompt_values)
+        formatted_gustave_prompt = (SECTION_PROMPT_GUSTAVE + BOOK_CONTEXT + SECTION_ASSIGNMENT).format(**prompt_values)
+        if self.continuity:
+            # Formatted separately so braces in the passages are kept as they are
+            continuity = CONTINUITY_CONTEXT.format(passages=self.continuity)
+            formatted_zero_prompt += continuity
+            formatted_gustave_prompt += continuity
 
         # Initialize agents with the instance handoff methods
         self.zero_agent = self.agents.get_zero(formatted_zero_prompt, self._handoff_to_gustave)
@@ -87,37 +119,72 @@ class SectionWriter:
         return None
 
     def _force_consensus(self):
-        """Force consensus with the last proposed title"""
+        """Force consensus with Zero's latest draft of the section"""
         for msg in reversed(self.messages):
-            if isinstance(msg, dict):  # Ensure msg is a dictionary
-                content = msg.get("content", "")
-                if "Book Title:" in content:
-                    self.title = content.split("Book Title:")[1].strip()
-                    irc_logger.info("Forced consensus on the last proposed Book Title.")
+            if isinstance(msg, dict) and msg.get("sender") == "Zero":
+                content = msg.get("content", "") or ""
+                if content.strip():
+                    self._extract_section_content(content)
+                    irc_logger.info(f"Forced consensus on the latest draft of Section {self.section_number}.")
                     return
-        self.title = "No title reached"
-        irc_logger.warning("No valid Book Title found to force consensus.")
+        irc_logger.warning(f"No draft of Section {self.section_number} found to force consensus.")
 
-    def write(self):
+    def first_request(self):
+        """Return the client.run arguments of the debate's opening turn, e.g. for batching"""
+        debate = self._debate()
+        request = next(debate)
+        debate.close()
+        return request
+
+    def write(self, first_response=None):
         """Generate section content through agent collaboration"""
+        with metrics.labels(phase="section", section=self.section_number):
+            if not STREAMING.get("enabled", False):
+                return run_debate(self._debate(), self.agents.client.run, first_response)
+            # Drafts are mirrored to a partial file while they stream in
+            partial_path = os.path.join(
+                STREAMING.get("partial_dir") or os.path.join(OUTPUT_DIR, ".partial"),
+                BookManager.sanitize_title(self.book_title),
+                f"section_{self.section_number}.md"
+            )
+            self.streamed_live = STREAMING.get("live_output", True)
+            runner = StreamingRunner(self.agents.client, live=self.streamed_live, partial_path=partial_path)
+            try:
+                return run_debate(self._debate(), runner.run, first_response)
+            finally:
+                if os.path.exists(partial_path):
+                    os.remove(partial_path)
+
+    async def awrite(self, client=None, first_response=None):
+        """Coroutine version of write(), run on an AsyncSwarm client"""
+        with metrics.labels(phase="section", section=self.section_number):
+            return await arun_debate(self._debate(), (client or client_registry.get_async_swarm()).run, first_response)
+
+    def _debate(self):
+        """Section debate loop; yields each client.run request and receives its response"""
         initial_message = {
             'role': 'user',
             'content': f"Let's collaborate on writing the section {self.section_number}: {self.section_title}."
         }
         self.messages = [initial_message]
         attempt_count = 0
+        outcome = "failed"
+        budget = current_budget()
         max_attempts = SECTION_GENERATION.get("max_attempts", 10)
+        if budget:
+            # Share of what is left of the book budget, never above the phase limit
+            max_attempts = budget.turn_limit(max_attempts)
         current_agent = self.zero_agent
 
         try:
             while attempt_count < max_attempts:
                 attempt_count += 1
-                response = self.agents.client.run(
+                response = yield dict(
                     agent=current_agent,
-                    messages=self.messages,
+                    messages=self.history_policy.apply(self.messages),
                     context_variables={
                         'book_title': self.book_title,
-                        'full_toc': self.full_toc,
+                        'toc_context': self.toc_context,
                         'section_number': self.section_number,
                         'section_title': self.section_title
                     },
@@ -137,12 +204,20 @@ class SectionWriter:
                     irc_logger.error("Formatted content is not a string.")
                     break
 
-                irc_logger.agent_message(current_agent.name, formatted_content)
+                if not self.streamed_live:
+                    irc_logger.agent_message(current_agent.name, formatted_content)
                 self.messages.extend(response.messages)
 
                 if 'Consensus: True' in last_message.get('content', ''):
                     self._extract_section_content(last_message.get('content', ''))
                     irc_logger.success(f'Consensus reached on Section {self.section_number}: {self.section_title}.')
+                    outcome = "consensus"
+                    break
+
+                if budget and budget.nearly_spent():
+                    irc_logger.warning('Book budget nearly spent. Forcing consensus.')
+                    self._force_consensus()
+                    outcome = 'forced'
                     break
 
                 # Switch to the other agent
@@ -150,17 +225,23 @@ class SectionWriter:
             else:
                 irc_logger.warning('Max attempts reached. Forcing consensus.')
                 self._force_consensus()
+                outcome = "forced"
 
         except Exception as e:
             irc_logger.error(f'Error during section writing: {str(e)}')
             traceback_str = traceback.format_exc()
             irc_logger.error(f'Traceback: {traceback_str}')
+            metrics.record_debate(attempt_count, "failed")
             return None
 
+        if self.history_policy.tokens_saved:
+            irc_logger.info(f'History policy saved ~{self.history_policy.tokens_saved} prompt tokens on Section {self.section_number}.')
+
         if self.section_content:
             irc_logger.system_message(f'Section {self.section_number}: {self.section_title} generated successfully.')
         else:
             irc_logger.error(f'Failed to generate Section {self.section_number}: {self.section_title}.')
 
+        metrics.record_debate(attempt_count, outcome if self.section_content else "failed")
         return self.section_content
 
@@ -1,9 +1,12 @@
 # src/models/table_of_contents_generator.py
 
-from src.agents import Agents
-from src.prompts import TOC_PROMPT_ZERO, TOC_PROMPT_GUSTAVE
-from src.config import TOC_GENERATION
+from src.agents import Agents, HistoryPolicy, client_registry, run_debate, arun_debate, StreamingRunner
+from src.prompts import TOC_PROMPT_ZERO, TOC_PROMPT_GUSTAVE, TOC_CRITERIA
+from src.models.best_of_n import CandidateSelector, toc_score
+from src.models.budget import current_budget
+from src.config import TOC_GENERATION, STREAMING
 from src.utils.irc_logger import irc_logger
+from src.utils.metrics import metrics
 import traceback
 
 class TableOfContentsGenerator:
@@ -11,7 +14,9 @@ class TableOfContentsGenerator:
         self.book_title = book_title
         self.agents = Agents()
         self.messages = []
+        self.history_policy = HistoryPolicy.from_config()
         self.toc = None
+        self.streamed_live = False
         self._setup_agents()
 
     def _setup_agents(self):
@@ -61,6 +66,81 @@ class TableOfContentsGenerator:
 
     def generate(self):
         """Generate a table of contents through agent collaboration"""
+        if TOC_GENERATION.get("mode") == "best_of_n":
+            return self.generate_best_of()
+        with metrics.labels(phase="toc"):
+            return run_debate(self._debate(), self._run_function())
+
+    def _run_function(self):
+        """Blocking run function for the debate: streamed turns if enabled, else client.run"""
+        if not STREAMING.get("enabled", False):
+            return self.agents.client.run
+        self.streamed_live = STREAMING.get("live_output", True)
+        return StreamingRunner(self.agents.client, live=self.streamed_live).run
+
+    async def agenerate(self, client=None):
+        """Coroutine version of generate(), run on an AsyncSwarm client"""
+        if TOC_GENERATION.get("mode") == "best_of_n":
+            return await self.agenerate_best_of(client)
+        with metrics.labels(phase="toc"):
+            return await arun_debate(self._debate(), (client or client_registry.get_async_swarm()).run)
+
+    def _candidate_requests(self, count):
+        """client.run arguments asking Zero for count independent ToC proposals"""
+        return [dict(
+            agent=self.zero_agent,
+            messages=[{
+                "role": "user",
+                "content": f"Let's collaborate on a table of contents for the book titled: {self.book_title}. "
+                           f"This is candidate {index} of {count}: propose one complete table of contents "
+                           f"after a line reading 'Table of Contents:', with numbered chapters (1.) and sections (1.1.)."
+            }],
+            context_variables={"book_title": self.book_title},
+            max_turns=1,
+            debug=TOC_GENERATION.get("debug", False)
+        ) for index in range(1, count + 1)]
+
+    def _extract_candidate(self, content):
+        """Return the proposed table of contents in a reply, or None"""
+        if not isinstance(content, str) or "Table of Contents:" not in content:
+            return None
+        return self.format_message(content.split("Table of Contents:", 1)[1]) or None
+
+    def _selector(self):
+        return CandidateSelector(
+            "table of contents",
+            TOC_CRITERIA,
+            self._extract_candidate,
+            toc_score,
+            self.agents if TOC_GENERATION.get("judge", True) else None
+        )
+
+    def _finish_best_of(self, selector):
+        metrics.record_debate(selector.calls, "best_of_n" if self.toc else "failed")
+        if self.toc:
+            irc_logger.system_message("Final Table of Contents generated successfully.")
+        else:
+            irc_logger.error("Failed to generate the table of contents.")
+        return self.toc
+
+    def generate_best_of(self, candidates=None):
+        """Pick a table of contents from candidates generated in parallel instead of debating one"""
+        count = candidates or TOC_GENERATION.get("candidates", 4)
+        selector = self._selector()
+        with metrics.labels(phase="toc"):
+            self.toc = selector.select(self._candidate_requests(count), self.agents.client.run)
+            return self._finish_best_of(selector)
+
+    async def agenerate_best_of(self, client=None, candidates=None):
+        """Coroutine version of generate_best_of(), run on an AsyncSwarm client"""
+        count = candidates or TOC_GENERATION.get("candidates", 4)
+        selector = self._selector()
+        with metrics.labels(phase="toc"):
+            self.toc = await selector.aselect(self._candidate_requests(count), (client or client_registry.get_async_swarm()).run)
+            return self._finish_best_of(selector)
+
+    def _debate(self):
+        """ToC debate loop; yields each client.run request and receives its response"""
         initial_message = {
             "role": "user",
             "content": f"Let's collaborate on a table of contents for the book titled: {self.book_title}. Please propose an initial table of contents."
@@ -68,7 +148,12 @@ class TableOfContentsGenerator:
 
         self.messages = [initial_message]
         attempt_count = 0
+        outcome = "failed"
+        budget = current_budget()
         max_attempts = TOC_GENERATION.get("max_attempts", 10)
+        if budget:
+            # Share of what is left of the book budget, never above the phase limit
+            max_attempts = budget.turn_limit(max_attempts)
         max_consecutive_failures = 3
         consecutive_failures = 0
         current_agent = self.zero_agent
@@ -77,9 +162,9 @@ class TableOfContentsGenerator:
             while attempt_count < max_attempts and consecutive_failures < max_consecutive_failures:
                 attempt_count += 1
 
-                response = self.agents.client.run(
+                response = yield dict(
                     agent=current_agent,
-                    messages=self.messages,
+                    messages=self.history_policy.apply(self.messages),
                     context_variables={"book_title": self.book_title},
                     max_turns=1,
                     debug=TOC_GENERATION.get("debug", False)
@@ -99,13 +184,21 @@ class TableOfContentsGenerator:
                     consecutive_failures += 1
                     continue
 
-                irc_logger.agent_message(current_agent.name, formatted_content)
+                if not self.streamed_live:
+                    irc_logger.agent_message(current_agent.name, formatted_content)
                 self.messages.extend(response.messages)
                 consecutive_failures = 0  # Reset on successful response
 
                 if 'Consensus: True' in content:
                     self._extract_toc(content)
                     irc_logger.success("Consensus reached on the Table of Contents.")
+                    outcome = "consensus"
+                    break
+
+                if budget and budget.nearly_spent():
+                    irc_logger.warning("Book budget nearly spent. Forcing consensus.")
+                    self._force_consensus()
+                    outcome = "forced"
                     break
 
                 # Switch to the other agent
@@ -113,16 +206,22 @@ class TableOfContentsGenerator:
             else:
                 irc_logger.warning("Max attempts or consecutive failures reached. Forcing consensus.")
                 self._force_consensus()
+                outcome = "forced"
 
         except Exception as e:
             irc_logger.error(f"Error during ToC generation: {str(e)}")
             traceback_str = traceback.format_exc()
             irc_logger.error(f"Traceback: {traceback_str}")
+            metrics.record_debate(attempt_count, "failed")
             return None
 
+        if self.history_policy.tokens_saved:
+            irc_logger.info(f"History policy saved ~{self.history_policy.tokens_saved} prompt tokens on the ToC debate.")
+
         if self.toc:
             irc_logger.system_message("Final Table of Contents generated successfully.")
         else:
             irc_logger.error("Failed to generate the table of contents.")
 
+        metrics.record_debate(attempt_count, outcome if self.toc else "failed")
         return self.toc
@@ -1,8 +1,16 @@
 # src/models/title_generator.py
 
 from src.agents.agents import Agents
+from src.agents.client_registry import client_registry
+from src.agents.debate import run_debate, arun_debate
+from src.agents.history import HistoryPolicy
+from src.agents.streaming import StreamingRunner
+from src.models.best_of_n import CandidateSelector, title_score
+from src.models.budget import current_budget
+from src.utils.metrics import metrics
 from src.prompts.title_prompts import ZERO_TITLE_PROMPT, GUSTAVE_TITLE_PROMPT
-from src.config import TITLE_GENERATION
+from src.prompts.judge_prompts import TITLE_CRITERIA
+from src.config import TITLE_GENERATION, STREAMING
 from src.utils.irc_logger import irc_logger
 import traceback
 
@@ -11,7 +19,9 @@ class TitleGenerator:
         self.topic = topic
         self.agents = Agents()
         self.messages = []
+        self.history_policy = HistoryPolicy.from_config()
         self.title = None
+        self.streamed_live = False
         self._setup_agents()
 
     def _setup_agents(self):
@@ -68,6 +78,84 @@ class TitleGenerator:
 
     def generate(self):
         """Generate a title through agent collaboration"""
+        if TITLE_GENERATION.get("mode") == "best_of_n":
+            return self.generate_best_of()
+        with metrics.labels(phase="title"):
+            return run_debate(self._debate(), self._run_function())
+
+    def _run_function(self):
+        """Blocking run function for the debate: streamed turns if enabled, else client.run"""
+        if not STREAMING.get("enabled", False):
+            return self.agents.client.run
+        self.streamed_live = STREAMING.get("live_output", True)
+        return StreamingRunner(self.agents.client, live=self.streamed_live).run
+
+    async def agenerate(self, client=None):
+        """Coroutine version of generate(), run on an AsyncSwarm client"""
+        if TITLE_GENERATION.get("mode") == "best_of_n":
+            return await self.agenerate_best_of(client)
+        with metrics.labels(phase="title"):
+            return await arun_debate(self._debate(), (client or client_registry.get_async_swarm()).run)
+
+    def _candidate_requests(self, count):
+        """client.run arguments asking Zero for count independent title proposals"""
+        return [dict(
+            agent=self.zero_agent,
+            messages=[{
+                "role": "user",
+                "content": f"Let's collaborate on a title for a book about: {self.topic}. "
+                           f"This is candidate {index} of {count}: propose one distinctive title "
+                           f"on its own line as 'Book Title: [title]'."
+            }],
+            context_variables={"topic": self.topic},
+            max_turns=1,
+            debug=TITLE_GENERATION.get("debug", False)
+        ) for index in range(1, count + 1)]
+
+    def _extract_candidate(self, content):
+        """Return the proposed title in a reply, or None"""
+        for line in content.split('\n'):
+            if line.strip().startswith("Book Title:"):
+                return line.split("Book Title:", 1)[1].strip().strip('*"') or None
+        return None
+
+    def _selector(self):
+        return CandidateSelector(
+            "title",
+            TITLE_CRITERIA,
+            self._extract_candidate,
+            lambda title: title_score(title, self.topic),
+            self.agents if TITLE_GENERATION.get("judge", True) else None
+        )
+
+    def _finish_best_of(self, selector):
+        metrics.record_debate(selector.calls, "best_of_n" if self.title else "failed")
+        if self.title:
+            irc_logger.system_message(f"Final book title generated: {self.title}")
+        else:
+            irc_logger.error("Failed to generate a book title.")
+        return self.title
+
+    def generate_best_of(self, candidates=None):
+        """Pick a title from candidates generated in parallel instead of debating one"""
+        irc_logger.system_message(f"Enter a book topic: {self.topic}")
+        count = candidates or TITLE_GENERATION.get("candidates", 4)
+        selector = self._selector()
+        with metrics.labels(phase="title"):
+            self.title = selector.select(self._candidate_requests(count), self.agents.client.run)
+            return self._finish_best_of(selector)
+
+    async def agenerate_best_of(self, client=None, candidates=None):
+        """Coroutine version of generate_best_of(), run on an AsyncSwarm client"""
+        irc_logger.system_message(f"Enter a book topic: {self.topic}")
+        count = candidates or TITLE_GENERATION.get("candidates", 4)
+        selector = self._selector()
+        with metrics.labels(phase="title"):
+            self.title = await selector.aselect(self._candidate_requests(count), (client or client_registry.get_async_swarm()).run)
+            return self._finish_best_of(selector)
+
+    def _debate(self):
+        """Title debate loop; yields each client.run request and receives its response"""
         irc_logger.system_message(f"Enter a book topic: {self.topic}")
 
         initial_message = {
@@ -77,7 +165,12 @@ class TitleGenerator:
 
         self.messages = [initial_message]
         attempt_count = 0
+        outcome = "failed"
+        budget = current_budget()
         max_attempts = TITLE_GENERATION.get("max_attempts", 10)
+        if budget:
+            # Share of what is left of the book budget, never above the phase limit
+            max_attempts = budget.turn_limit(max_attempts)
         max_consecutive_failures = 3
         consecutive_failures = 0
         current_agent = self.zero_agent
@@ -86,9 +179,9 @@ class TitleGenerator:
             while attempt_count < max_attempts and consecutive_failures < max_consecutive_failures:
                 attempt_count += 1
 
-                response = self.agents.client.run(
+                response = yield dict(
                     agent=current_agent,
-                    messages=self.messages,
+                    messages=self.history_policy.apply(self.messages),
                     context_variables={"topic": self.topic},
                     max_turns=1,
                     debug=TITLE_GENERATION.get("debug", False)
@@ -108,12 +201,20 @@ class TitleGenerator:
                     consecutive_failures += 1
                     continue
 
-                irc_logger.agent_message(current_agent.name, formatted_content)
+                if not self.streamed_live:
+                    irc_logger.agent_message(current_agent.name, formatted_content)
                 self.messages.extend(response.messages)
                 consecutive_failures = 0  # Reset on successful response
 
                 if 'Consensus: True' in content and self.title:
                     irc_logger.success(f"Consensus reached on the book title: {self.title}")
+                    outcome = "consensus"
+                    break
+
+                if budget and budget.nearly_spent():
+                    irc_logger.warning("Book budget nearly spent. Forcing consensus.")
+                    self._force_consensus()
+                    outcome = "forced"
                     break
 
                 # Switch to the other agent
@@ -121,16 +222,22 @@ class TitleGenerator:
             else:
                 irc_logger.warning("Max attempts or consecutive failures reached. Forcing consensus.")
                 self._force_consensus()
+                outcome = "forced"
 
         except Exception as e:
             irc_logger.error(f"Error during title generation: {str(e)}")
             traceback_str = traceback.format_exc()
             irc_logger.error(f"Traceback: {traceback_str}")
+            metrics.record_debate(attempt_count, "failed")
             return None
 
+        if self.history_policy.tokens_saved:
+            irc_logger.info(f"History policy saved ~{self.history_policy.tokens_saved} prompt tokens on the title debate.")
+
         if self.title:
             irc_logger.system_message(f"Final book title generated: {self.title}")
         else:
             irc_logger.error("Failed to generate a book title.")
 
+        metrics.record_debate(attempt_count, outcome if self.title else "failed")
         return self.title
@@ -0,0 +1,105 @@
+# src/models/toc_context.py
+
+from src.config import SECTION_GENERATION
+
+class TocContextBuilder:
+    """
+    Build the slice of the Table of Contents a section debate needs.
+
+    Detail levels:
+        full        - the whole ToC text as generated.
+        neighbours  - the current chapter and its neighbouring chapters with
+                      their sections; every other chapter as a one-line title.
+        chapter     - only the current chapter with its sections; every other
+                      chapter as a one-line title.
+
+    The cost of the sliced levels grows with the number of chapters only
+    (one short line each), not with the total number of sections.
+
+    For prompt caching the slice is split in two: outline() is identical for
+    every section of the book and belongs in the shared prompt prefix, while
+    focus() holds the per-section detail and goes at the end.
+    """
+
+    DETAIL_LEVELS = ("full", "neighbours", "chapter")
+
+    def __init__(self, structure, toc=None, detail=None, neighbours=None):
+        self.structure = structure
+        self.chapters = structure.chapters
+        self._positions = {chapter.number: index for index, chapter in enumerate(self.chapters)}
+        self.toc = toc
+        self.detail = detail or SECTION_GENERATION.get("toc_detail", "neighbours")
+        self.neighbours = SECTION_GENERATION.get("toc_neighbours", 1) if neighbours is None else neighbours
+        if self.detail not in self.DETAIL_LEVELS:
+            raise ValueError(f"Unknown ToC detail level: {self.detail}")
+
+    def _chapter_index(self, section_number):
+        return self._positions.get(str(section_number).split('.')[0])
+
+    def _expanded_indexes(self, section_number):
+        current = self._chapter_index(section_number)
+        if self.detail == "full":
+            return set(range(len(self.chapters)))
+        if current is None:
+            return set()
+        if self.detail == "chapter":
+            return {current}
+        return set(range(max(current - self.neighbours, 0), current + self.neighbours + 1))
+
+    def _chapter_lines(self, chapter, expanded):
+        if expanded or chapter.is_leaf:
+            lines = [f"{chapter.number}. {chapter.title}"]
+            lines.extend(f"{'   ' * (entry.depth - 1)}{entry.number}. {entry.title}" for entry in chapter.walk())
+            return lines
+        count = len(chapter.children)
+        return [f"{chapter.number}. {chapter.title} ({count} section{'s' if count != 1 else ''})"]
+
+    def outline(self):
+        """
+        Return the part of the ToC shared by every section of the book.
+
+        Returns:
+            str: The raw ToC at the 'full' level, otherwise one line per chapter.
+        """
+        if self.toc is not None and (self.detail == "full" or not self.chapters):
+            return self.toc
+        lines = []
+        for chapter in self.chapters:
+            lines.extend(self._chapter_lines(chapter, False))
+        return '\n'.join(lines)
+
+    def focus(self, section_number):
+        """
+        Return the per-section detail: the expanded chapters around section_number.
+
+        Returns:
+            str: The expanded chapter listings, or a pointer back to the outline
+            when the outline already holds every section.
+        """
+        if self.detail == "full" or not self.chapters:
+            return "See the Table of Contents above."
+        lines = []
+        for index in sorted(self._expanded_indexes(section_number)):
+            if index < len(self.chapters):
+                lines.extend(self._chapter_lines(self.chapters[index], True))
+        return '\n'.join(lines)
+
+    def build(self, section_number):
+        """
+        Return the ToC listing for one section at the configured detail level.
+
+        Args:
+            section_number (str): The section being written (e.g., '2.1' or '3').
+
+        Returns:
+            str: The ToC excerpt to place in the section prompts.
+        """
+        # Fall back to the raw text when it is requested or could not be parsed
+        if self.toc is not None and (self.detail == "full" or not self.chapters):
+            return self.toc
+
+        expanded = self._expanded_indexes(section_number)
+        lines = []
+        for index, chapter in enumerate(self.chapters):
+            lines.extend(self._chapter_lines(chapter, index in expanded))
+        return '\n'.join(lines)
@@ -2,4 +2,5 @@
 
 from .title_prompts import ZERO_TITLE_PROMPT, GUSTAVE_TITLE_PROMPT
 from .toc_prompts import TOC_PROMPT_ZERO, TOC_PROMPT_GUSTAVE
+from .judge_prompts import JUDGE_PROMPT, TITLE_CRITERIA, TOC_CRITERIA
 
@@ -0,0 +1,25 @@
+# src/prompts/judge_prompts.py
+
+JUDGE_PROMPT = """You are the judge choosing the best {kind} for a book from numbered candidates.
+
+When judging:
+
+1. **Read Every Candidate:**
+   - Compare all candidates against the criteria below before deciding.
+
+2. **Criteria:**
+{criteria}
+
+3. **Response Format:**
+   - Reply with exactly one line:
+     Winner: [candidate number]
+   - Do not include anything else.
+"""
+
+TITLE_CRITERIA = """   - Fits the book topic closely
+   - Clear, memorable and specific
+   - A reasonable length for a book title"""
+
+TOC_CRITERIA = """   - Covers the book's subject completely and in a logical order
+   - Numbered chapters (1., 2., ...) with numbered sections (1.1., 1.2., ...)
+   - Balanced chapters, without overlapping or repeated sections"""
@@ -5,13 +5,9 @@ You are Zero, an enthusiastic and earnest AI assistant who collaborates on writi
 
 When writing a section:
 
-1. **Review the Book Title and Table of Contents:**
-   - **Book Title:** {book_title}
-   - **Full Table of Contents:**
-     {full_toc}
-   - Identify the current section to focus on:
-     - **Section Number:** {section_number}
-     - **Section Title:** {section_title}
+1. **Review the Book Context and Current Assignment:**
+   - The book title and table of contents are listed under "Book Context" below.
+   - The section to focus on is listed under "Current Assignment" at the very end.
    - Understand the context within the overall structure of the book.
 
 2. **Consensus Indication:**
@@ -63,13 +59,9 @@ You are Gustave, a refined and eloquent AI assistant who helps perfect sections
 
 When writing a section:
 
-1. **Review the Book Title and Table of Contents:**
-   - **Book Title:** {book_title}
-   - **Full Table of Contents:**
-     {full_toc}
-   - Focus on the current section:
-     - **Section Number:** {section_number}
-     - **Section Title:** {section_title}
+1. **Review the Book Context and Current Assignment:**
+   - The book title and table of contents are listed under "Book Context" below.
+   - The section to focus on is listed under "Current Assignment" at the very end.
    - Understand the context within the overall structure of the book.
 
 2. **Consensus Indication:**
@@ -114,5 +106,28 @@ When writing a section:
    - Always use plain text for handoffs
    - Maintain consistent formatting as specified above
 
-Your responses should adhere to this structure to ensure a smooth and productive collaboration with Zero.""" 
+Your responses should adhere to this structure to ensure a smooth and productive collaboration with Zero."""
 
+
+# Everything above is identical for every section of a book, so providers can
+# cache it as a prompt prefix; only SECTION_ASSIGNMENT varies per section.
+BOOK_CONTEXT = """
+
+**Book Context:**
+- **Book Title:** {book_title}
+- **Table of Contents:**
+{toc_outline}
+"""
+
+SECTION_ASSIGNMENT = """
+**Current Assignment:**
+- **Section Number:** {section_number}
+- **Section Title:** {section_title}
+- **Surrounding chapters in detail:**
+{toc_focus}"""
+
+# Appended after the assignment only when earlier sections are relevant
+CONTINUITY_CONTEXT = """
+
+**Already Written (stay consistent, do not repeat):**
+{passages}"""
@@ -0,0 +1,8 @@
+# src/utils/files.py
+
+import os
+
+# Temp files are created 0600; finished files get the usual permissions
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+FILE_MODE = 0o666 & ~_UMASK
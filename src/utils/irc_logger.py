@@ -1,10 +1,30 @@
 # src/utils/irc_logger.py
 
+import atexit
+import queue
+import threading
+
 from rich.console import Console
 from rich.theme import Theme
 
+from src.config import LOGGING
+
 class IRCLogger:
-    def __init__(self):
+    """
+    IRC-style console output for the agents and the pipeline.
+
+    By default every message is rendered on the calling thread. In queued
+    mode callers only enqueue the message; one background thread filters,
+    renders and writes it, so concurrent debates never wait on the console.
+    The console shows messages from ``level`` up; an optional plain-text file
+    sink receives messages from ``file_level`` up, in full, while agent
+    messages on the console can be cut to a short preview. Messages neither
+    would show are dropped before they are queued.
+    """
+
+    LEVELS = {"debug": 10, "info": 20, "warning": 30, "error": 40}
+
+    def __init__(self, settings=None):
         # Set up Rich console with custom theme
         custom_theme = Theme({
             'zero': 'bold cyan',
@@ -20,60 +40,163 @@ class IRCLogger:
             'success': 'bold green',
         })
         self.console = Console(theme=custom_theme)
+        self._queue = None
+        self._renderer = None
+        self._sink = None
+        self.configure(**(settings or {}))
 
-    def agent_message(self, agent_name, content):
-        """Print agent messages in IRC style"""
+    def configure(self, **settings):
+        """
+        Apply LOGGING settings (level, file_level, queued, preview_chars, file) on top of the current ones.
+
+        Queued messages are flushed before the new settings take effect.
+        """
+        self.close()
+        self.settings = {**LOGGING, **getattr(self, "settings", {}), **settings}
+        for name in ("level", "file_level"):
+            if self.settings[name] not in self.LEVELS:
+                raise ValueError(f"Unknown log level: {self.settings[name]}")
+        self.level = self.LEVELS[self.settings["level"]]
+        self.file_level = self.LEVELS[self.settings["file_level"]]
+        self.preview_chars = self.settings["preview_chars"]
+        if self.settings["file"]:
+            self._sink = open(self.settings["file"], 'a', encoding='utf-8', buffering=1)
+        if self.settings["queued"]:
+            self._queue = queue.Queue()
+            self._renderer = threading.Thread(target=self._render_loop, name="irc-logger", daemon=True)
+            self._renderer.start()
+
+    def flush(self):
+        """Wait until every queued message has been rendered."""
+        if self._queue is not None:
+            self._queue.join()
+
+    def close(self):
+        """Render queued messages, stop the renderer thread and close the file sink."""
+        renderer, self._renderer = self._renderer, None
+        if renderer is not None:
+            self._queue.put(None)
+            renderer.join()
+            self._queue = None
+        if self._sink is not None:
+            self._sink.close()
+            self._sink = None
+
+    def _render_loop(self):
+        while True:
+            record = self._queue.get()
+            try:
+                if record is None:
+                    return
+                self._render(*record)
+            finally:
+                self._queue.task_done()
+
+    def _log(self, level, kind, *args):
+        number = self.LEVELS[level]
+        if number < self.level and (self._sink is None or number < self.file_level):
+            return
+        if self._queue is not None:
+            self._queue.put((kind, number, args))
+        else:
+            self._render(kind, number, args)
+
+    def _render(self, kind, number, args):
+        # Each renderer is told whether the console and the file sink want the message
+        console = number >= self.level
+        sink = self._sink is not None and number >= self.file_level
         try:
-            # Format agent name with appropriate color
-            agent_style = 'zero' if agent_name == "Zero" else 'gustave'
-            # Remove line breaks and extra spaces from content
-            cleaned_content = ' '.join(content.split())
-            self.console.print(f"<[{agent_style}]{agent_name}[/{agent_style}]> {cleaned_content}")
+            getattr(self, f"_render_{kind}")(console, sink, *args)
         except Exception as e:
-            self.console.print(f"[error]Error printing agent message: {str(e)}[/error]")
+            self.console.print(f"[error]Error printing {kind} message: {str(e)}[/error]")
+
+    def _write_sink(self, sink, text, end='\n'):
+        if sink and self._sink is not None:
+            self._sink.write(text + end)
+
+    # Renderers
+
+    def _render_agent(self, console, sink, agent_name, content):
+        # Format agent name with appropriate color
+        agent_style = 'zero' if agent_name == "Zero" else 'gustave'
+        # Remove line breaks and extra spaces from content
+        cleaned_content = ' '.join(content.split())
+        self._write_sink(sink, f"<{agent_name}> {cleaned_content}")
+        if not console:
+            return
+        if self.preview_chars and len(cleaned_content) > self.preview_chars:
+            cleaned_content = cleaned_content[:self.preview_chars].rstrip() + "..."
+        self.console.print(f"<[{agent_style}]{agent_name}[/{agent_style}]> {cleaned_content}")
+
+    def _render_stream_start(self, console, sink, agent_name):
+        agent_style = 'zero' if agent_name == "Zero" else 'gustave'
+        self._write_sink(sink, f"<{agent_name}> ", end="")
+        if console:
+            self.console.print(f"<[{agent_style}]{agent_name}[/{agent_style}]> ", end="")
+
+    def _render_stream_token(self, console, sink, text):
+        self._write_sink(sink, text, end="")
+        if console:
+            self.console.print(text, end="", markup=False, highlight=False, style="content")
+
+    def _render_stream_end(self, console, sink):
+        self._write_sink(sink, "")
+        if console:
+            self.console.print()
+
+    def _render_line(self, console, sink, style, prefix, content):
+        self._write_sink(sink, f"{prefix}{content}")
+        if console:
+            self.console.print(f"[{style}]{prefix}{content}[/{style}]")
+
+    def _render_content(self, console, sink, content):
+        self._write_sink(sink, content)
+        if console:
+            self.console.print(content, style="content")
+
+    # Public API
+
+    def agent_message(self, agent_name, content):
+        """Print agent messages in IRC style"""
+        self._log("info", "agent", agent_name, content)
+
+    def stream_start(self, agent_name):
+        """Start a streamed agent message; tokens follow on the same line"""
+        self._log("info", "stream_start", agent_name)
+
+    def stream_token(self, text):
+        """Print streamed text as it arrives, without markup processing"""
+        self._log("info", "stream_token", text)
+
+    def stream_end(self):
+        """Finish a streamed agent message"""
+        self._log("info", "stream_end")
 
     def system_message(self, content):
         """Print system messages in IRC style"""
-        try:
-            self.console.print(f"[system]* {content}[/system]")
-        except Exception as e:
-            self.console.print(f"[error]Error printing system message: {str(e)}[/error]")
+        self._log("info", "line", "system", "* ", content)
 
     def error(self, content):
         """Print error messages in IRC style"""
-        try:
-            self.console.print(f"[error]* Error: {content}[/error]")
-        except Exception as e:
-            self.console.print(f"[error]Critical error in error logging: {str(e)}[/error]")
+        self._log("error", "line", "error", "* Error: ", content)
 
     def info(self, content):
         """Print informational messages"""
-        try:
-            self.console.print(f"[info]* Info: {content}[/info]")
-        except Exception as e:
-            self.console.print(f"[error]Error printing info message: {str(e)}[/error]")
+        self._log("info", "line", "info", "* Info: ", content)
 
     def warning(self, content):
         """Print warning messages"""
-        try:
-            self.console.print(f"[warning]* Warning: {content}[/warning]")
-        except Exception as e:
-            self.console.print(f"[error]Error printing warning message: {str(e)}[/error]")
+        self._log("warning", "line", "warning", "* Warning: ", content)
 
     def success(self, content):
         """Print success messages"""
-        try:
-            self.console.print(f"[success]* Success: {content}[/success]")
-        except Exception as e:
-            self.console.print(f"[error]Error printing success message: {str(e)}[/error]")
+        self._log("info", "line", "success", "* Success: ", content)
 
     def print_content(self, content):
         """Print large content blocks like Table of Contents"""
-        try:
-            self.console.print(content, style="content")
-        except Exception as e:
-            self.console.print(f"[error]Error printing content: {str(e)}[/error]")
+        self._log("info", "content", content)
 
 # Create a singleton instance
 irc_logger = IRCLogger()
-
+# Render anything still queued before the interpreter exits
+atexit.register(irc_logger.close)
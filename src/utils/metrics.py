@@ -0,0 +1,295 @@
+# src/utils/metrics.py
+
+import contextvars
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from src.config import METRICS, OUTPUT_DIR
+from src.utils.files import FILE_MODE
+
+# Labels (book, phase, section) describing the agent call in progress.
+# Context variables follow asyncio tasks; thread pools must copy the context.
+_labels = contextvars.ContextVar("metrics_labels", default={})
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _book(labels):
+    # Calls made before a book has its title are kept under its topic; see relabel_book()
+    return labels.get("book") or labels.get("topic", "")
+
+def _label_text(labels):
+    return ','.join(f'{name}="{_escape(value)}"' for name, value in labels)
+
+class MetricsRecorder:
+    """
+    Records every agent call and every finished debate.
+
+    Each call is appended to a JSONL sink as it happens. Aggregates are kept
+    in memory per (book, phase, section, agent) so they can be exported in
+    Prometheus text format and rolled up per book.
+    """
+
+    def __init__(self, settings=None):
+        self.settings = dict(METRICS, **(settings or {}))
+        self._lock = threading.Lock()
+        self._sink = None
+        self._calls = defaultdict(lambda: {"count": 0, "errors": 0, "seconds": 0.0,
+                                           "prompt_tokens": 0, "completion_tokens": 0})
+        self._debates = defaultdict(lambda: {"count": 0, "turns": 0})
+
+    @property
+    def enabled(self):
+        return self.settings["enabled"]
+
+    @contextmanager
+    def labels(self, **labels):
+        """Attach labels to every call made inside the block (nested blocks merge)."""
+        token = _labels.set({**_labels.get(), **labels})
+        try:
+            yield
+        finally:
+            _labels.reset(token)
+
+    def current_labels(self):
+        return dict(_labels.get())
+
+    def _path(self, name):
+        filename = self.settings[name]
+        if not filename:
+            return None
+        return os.path.join(self.settings["output_dir"] or OUTPUT_DIR, filename)
+
+    def set_output_dir(self, output_dir):
+        """Write the JSONL and Prometheus files under output_dir from now on, e.g. a run's base path."""
+        with self._lock:
+            self.settings["output_dir"] = output_dir
+            if self._sink is not None:
+                self._sink.close()
+                self._sink = None
+
+    def _emit(self, event):
+        path = self._path("jsonl_filename")
+        if not path:
+            return
+        line = json.dumps(event, default=str) + '\n'
+        with self._lock:
+            if self._sink is None:
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                self._sink = open(path, 'a', encoding='utf-8', buffering=1)
+            self._sink.write(line)
+
+    def record_call(self, agent, seconds, prompt_tokens=0, completion_tokens=0, outcome="ok"):
+        """
+        Record one client.run call.
+
+        Args:
+            agent (str): Name of the agent that was called.
+            seconds (float): Wall-clock latency of the call.
+            prompt_tokens (int): Prompt tokens reported by the API.
+            completion_tokens (int): Completion tokens reported by the API.
+            outcome (str): 'ok' or 'error'.
+        """
+        if not self.enabled:
+            return
+        labels = _labels.get()
+        key = (_book(labels), labels.get("phase", ""), labels.get("section", ""), agent)
+        with self._lock:
+            stats = self._calls[key]
+            stats["count"] += 1
+            stats["errors"] += outcome != "ok"
+            stats["seconds"] += seconds
+            stats["prompt_tokens"] += prompt_tokens
+            stats["completion_tokens"] += completion_tokens
+        self._emit({
+            "event": "call", "time": time.time(), **labels, "agent": agent,
+            "latency": round(seconds, 4), "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens, "outcome": outcome,
+        })
+
+    def record_debate(self, turns, outcome):
+        """
+        Record the end of a debate.
+
+        Args:
+            turns (int): Number of turns taken.
+            outcome (str): 'consensus', 'forced' or 'failed'.
+        """
+        if not self.enabled:
+            return
+        labels = _labels.get()
+        key = (_book(labels), labels.get("phase", ""), outcome)
+        with self._lock:
+            self._debates[key]["count"] += 1
+            self._debates[key]["turns"] += turns
+        self._emit({"event": "debate", "time": time.time(), **labels, "turns": turns, "outcome": outcome})
+
+    def relabel_book(self, topic, book):
+        """Move the aggregates recorded under a topic, before its book had a title, to the book."""
+        with self._lock:
+            for table in (self._calls, self._debates):
+                for key in [key for key in table if key[0] == topic]:
+                    target = table[(book,) + key[1:]]
+                    for field, value in table.pop(key).items():
+                        target[field] += value
+
+    def rollup(self, book):
+        """
+        Summarise one book: totals, turns to consensus, and the slowest and
+        most expensive sections.
+        """
+        with self._lock:
+            calls = {key: dict(value) for key, value in self._calls.items() if key[0] == book}
+            debates = {key: dict(value) for key, value in self._debates.items() if key[0] == book}
+
+        per_section = defaultdict(lambda: {"seconds": 0.0, "tokens": 0, "calls": 0})
+        totals = {"calls": 0, "errors": 0, "seconds": 0.0, "prompt_tokens": 0, "completion_tokens": 0}
+        for (_, phase, section, _), stats in calls.items():
+            for name in totals:
+                totals[name] += stats[name if name != "calls" else "count"]
+            entry = per_section[f"{phase}:{section}" if section else phase]
+            entry["seconds"] += stats["seconds"]
+            entry["tokens"] += stats["prompt_tokens"] + stats["completion_tokens"]
+            entry["calls"] += stats["count"]
+
+        turns = defaultdict(lambda: {"count": 0, "turns": 0})
+        for (_, phase, outcome), stats in debates.items():
+            turns[phase]["count"] += stats["count"]
+            turns[phase]["turns"] += stats["turns"]
+            turns[phase].setdefault("outcomes", {})[outcome] = stats["count"]
+
+        for entry in per_section.values():
+            entry["seconds"] = round(entry["seconds"], 3)
+        top = self.settings["rollup_top"]
+        return {
+            "book": book,
+            **{name: round(value, 3) if isinstance(value, float) else value for name, value in totals.items()},
+            "turns_per_debate": {
+                phase: round(stats["turns"] / stats["count"], 2) for phase, stats in turns.items() if stats["count"]
+            },
+            "debate_outcomes": {phase: stats.get("outcomes", {}) for phase, stats in turns.items()},
+            "slowest": sorted(per_section.items(), key=lambda item: -item[1]["seconds"])[:top],
+            "most_tokens": sorted(per_section.items(), key=lambda item: -item[1]["tokens"])[:top],
+        }
+
+    def aggregates(self):
+        """Return the in-memory aggregates as plain data, e.g. to hand to another process."""
+        with self._lock:
+            return {
+                "calls": [(key, dict(stats)) for key, stats in self._calls.items()],
+                "debates": [(key, dict(stats)) for key, stats in self._debates.items()],
+            }
+
+    def merge(self, aggregates):
+        """Add aggregates taken with aggregates() in another process to this recorder."""
+        with self._lock:
+            for table, rows in ((self._calls, aggregates["calls"]), (self._debates, aggregates["debates"])):
+                for key, stats in rows:
+                    target = table[tuple(key)]
+                    for field, value in stats.items():
+                        target[field] += value
+
+    def prometheus_text(self):
+        """Render the aggregates in Prometheus text exposition format."""
+        with self._lock:
+            calls = {key: dict(value) for key, value in self._calls.items()}
+            debates = {key: dict(value) for key, value in self._debates.items()}
+
+        series = [
+            ("agent_saloon_agent_calls_total", "counter", "Agent calls.", "count"),
+            ("agent_saloon_agent_call_errors_total", "counter", "Agent calls that raised.", "errors"),
+            ("agent_saloon_agent_call_seconds_total", "counter", "Time spent in agent calls.", "seconds"),
+            ("agent_saloon_prompt_tokens_total", "counter", "Prompt tokens used.", "prompt_tokens"),
+            ("agent_saloon_completion_tokens_total", "counter", "Completion tokens used.", "completion_tokens"),
+        ]
+        lines = []
+        for name, kind, help_text, field in series:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for (book, phase, section, agent), stats in sorted(calls.items()):
+                labels = _label_text([("book", book), ("phase", phase), ("section", section), ("agent", agent)])
+                lines.append(f"{name}{{{labels}}} {stats[field]}")
+
+        for name, help_text, field in (
+            ("agent_saloon_debates_total", "Finished debates.", "count"),
+            ("agent_saloon_debate_turns_total", "Turns taken by finished debates.", "turns"),
+        ):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for (book, phase, outcome), stats in sorted(debates.items()):
+                labels = _label_text([("book", book), ("phase", phase), ("outcome", outcome)])
+                lines.append(f"{name}{{{labels}}} {stats[field]}")
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path=None):
+        """Atomically write the Prometheus text file (for a textfile collector)."""
+        path = path or self._path("prometheus_filename")
+        if not self.enabled or not path:
+            return None
+        directory = os.path.dirname(path) or "."
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        os.fchmod(fd, FILE_MODE)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp_path, path)
+        return path
+
+    def close(self):
+        with self._lock:
+            if self._sink is not None:
+                self._sink.close()
+                self._sink = None
+
+class MeteredSwarm:
+    """Swarm client wrapper that times every run() and records it with its token usage."""
+
+    def __init__(self, client, recorder, tracker):
+        self.client = client
+        self.recorder = recorder
+        self.tracker = tracker
+
+    def _record(self, agent, started, usages, outcome):
+        self.recorder.record_call(
+            getattr(agent, "name", str(agent)),
+            time.monotonic() - started,
+            sum(usage[0] for usage in usages),
+            sum(usage[1] for usage in usages),
+            outcome,
+        )
+
+    def run(self, agent, messages, *args, **kwargs):
+        started = time.monotonic()
+        with self.tracker.capture() as usages:
+            try:
+                response = self.client.run(agent, messages, *args, **kwargs)
+            except Exception:
+                self._record(agent, started, usages, "error")
+                raise
+        self._record(agent, started, usages, "ok")
+        return response
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+class AsyncMeteredSwarm(MeteredSwarm):
+    """MeteredSwarm for AsyncSwarm clients."""
+
+    async def run(self, agent, messages, *args, **kwargs):
+        started = time.monotonic()
+        with self.tracker.capture() as usages:
+            try:
+                response = await self.client.run(agent, messages, *args, **kwargs)
+            except Exception:
+                self._record(agent, started, usages, "error")
+                raise
+        self._record(agent, started, usages, "ok")
+        return response
+
+# Create a singleton instance
+metrics = MetricsRecorder()
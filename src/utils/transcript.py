@@ -0,0 +1,226 @@
+# src/utils/transcript.py
+
+import contextvars
+import json
+import mmap
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+
+from src.config import TRANSCRIPT
+from src.utils.metrics import metrics
+
+# Transcript of the book being written. Context variables follow asyncio
+# tasks; thread pools must copy the context.
+_current = contextvars.ContextVar("transcript", default=None)
+
+def current_transcript():
+    """Return the Transcript active in this context, or None."""
+    return _current.get()
+
+def transcript_key(phase, section=None):
+    """Index key of a phase, e.g. 'title', 'toc' or 'section:2.1'."""
+    return f"{phase}:{section}" if section else phase
+
+class Transcript:
+    """
+    Append-only JSONL record of every agent turn of a book.
+
+    Each line of transcript.jsonl is one event: the opening prompt of a
+    debate, an agent's reply, or a failed call. For every line an entry
+    "key<TAB>offset<TAB>length" is appended to transcript.idx, so a reader
+    can find one section's conversation without parsing the whole file.
+    Events recorded before the book directory exists (the title debate) are
+    kept in memory until attach() is called.
+    """
+
+    def __init__(self, settings=None):
+        self.settings = dict(TRANSCRIPT, **(settings or {}))
+        self._lock = threading.Lock()
+        self._pending = []
+        self._data = None
+        self._index = None
+        self.book_path = None
+
+    @property
+    def enabled(self):
+        return self.settings["enabled"]
+
+    @contextmanager
+    def activate(self):
+        """Record every debate started inside the block; files are closed on exit."""
+        token = _current.set(self)
+        try:
+            yield self
+        finally:
+            _current.reset(token)
+            self.close()
+
+    def attach(self, book_path):
+        """
+        Start writing to a book directory, appending to an existing transcript.
+
+        Args:
+            book_path (str): The book directory.
+        """
+        if not self.enabled or self.book_path == book_path:
+            return
+        with self._lock:
+            self._close_files()
+            data_path = os.path.join(book_path, self.settings["filename"])
+            self._data = open(data_path, 'ab', buffering=0)
+            self._index = open(os.path.join(book_path, self.settings["index_filename"]), 'ab', buffering=0)
+            self.book_path = book_path
+            pending, self._pending = self._pending, []
+            for key, line in pending:
+                self._write(key, line)
+
+    def _write(self, key, line):
+        self._data.write(line)
+        # Appends land at the end of the file, which other processes (queue workers) may also write
+        offset = self._data.tell() - len(line)
+        self._index.write(f"{key}\t{offset}\t{len(line)}\n".encode('utf-8'))
+
+    def record(self, event):
+        """
+        Append one event, labelled with the current phase and section.
+
+        Args:
+            event (dict): JSON-serializable event; 'time' and the labels are added.
+        """
+        if not self.enabled:
+            return
+        labels = metrics.current_labels()
+        event = {"time": time.time(), "phase": labels.get("phase", ""),
+                 "section": labels.get("section"), **event}
+        key = transcript_key(event["phase"], event["section"])
+        line = (json.dumps(event, default=str) + '\n').encode('utf-8')
+        with self._lock:
+            if self._data is None:
+                self._pending.append((key, line))
+            else:
+                self._write(key, line)
+
+    def _close_files(self):
+        for f in (self._data, self._index):
+            if f is not None:
+                f.close()
+        self._data = self._index = None
+
+    def close(self):
+        with self._lock:
+            self._close_files()
+            self.book_path = None
+
+class DebateRecorder:
+    """
+    Records the turns of one debate into the active Transcript.
+
+    Used by the debate drivers and by best-of-N selection; every method is
+    a no-op when no transcript is active.
+    """
+
+    def __init__(self, transcript=None, tags=None):
+        """
+        Args:
+            transcript (Transcript, optional): Defaults to the active transcript.
+            tags (dict, optional): Extra fields for every event, e.g. {"candidate": 2}.
+        """
+        self.transcript = transcript or current_transcript()
+        self.tags = tags or {}
+        self.debate_id = uuid.uuid4().hex[:12]
+        self.turn = 0
+
+    def _record(self, kind, request, **fields):
+        if self.transcript is None:
+            return
+        agent = request.get("agent")
+        self.transcript.record({"debate": self.debate_id, "turn": self.turn, "kind": kind,
+                                "agent": getattr(agent, "name", None), **self.tags, **fields})
+
+    def prompt(self, request):
+        """Record the messages that open the debate."""
+        self._record("prompt", request, messages=list(request.get("messages", [])))
+
+    def reply(self, request, response):
+        """Record the messages an agent added in one turn."""
+        self.turn += 1
+        self._record("reply", request, messages=getattr(response, "messages", []))
+
+    def error(self, request, error):
+        """Record a failed call."""
+        self.turn += 1
+        self._record("error", request, error=str(error))
+
+class TranscriptReader:
+    """
+    Random access to a book's transcript.
+
+    Only the small index is parsed up front; the transcript itself is
+    memory-mapped and each event is decoded when it is read.
+    """
+
+    def __init__(self, book_path, settings=None):
+        settings = dict(TRANSCRIPT, **(settings or {}))
+        self._file = open(os.path.join(book_path, settings["filename"]), 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        self._entries = defaultdict(list)
+        with open(os.path.join(book_path, settings["index_filename"]), 'r', encoding='utf-8') as f:
+            for line in f:
+                parts = line.rstrip('\n').split('\t')
+                # A run interrupted mid-write can leave a partial last line
+                if len(parts) != 3:
+                    continue
+                key, offset, length = parts[0], int(parts[1]), int(parts[2])
+                if offset + length <= size:
+                    self._entries[key].append((offset, length))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
+
+    def keys(self):
+        """Return the index keys in the order they first appear."""
+        return list(self._entries)
+
+    def events(self, phase, section=None):
+        """
+        Yield the events of a phase or section in the order they were recorded.
+
+        Args:
+            phase (str): 'title', 'toc', 'section', ...
+            section (str, optional): Section number, e.g. '2.1'.
+
+        Yields:
+            dict: One decoded event per turn.
+        """
+        for offset, length in self._entries.get(transcript_key(phase, section), []):
+            yield json.loads(self._map[offset:offset + length])
+
+    def conversation(self, phase, section=None):
+        """
+        Return the messages of the latest debate of a phase or section.
+
+        Returns:
+            list: The opening prompt followed by every reply, in turn order.
+        """
+        events = list(self.events(phase, section))
+        if not events:
+            return []
+        debate_id = events[-1]["debate"]
+        messages = []
+        for event in events:
+            if event["debate"] == debate_id:
+                messages.extend(event.get("messages", []))
+        return messages
@@ -0,0 +1,50 @@
+# tests/test_best_of_n.py
+
+import asyncio
+import json
+
+from src.models.best_of_n import CandidateSelector, title_score
+from src.utils.transcript import Transcript
+
+class Response:
+    def __init__(self, content):
+        self.messages = [{"role": "assistant", "content": content}]
+
+def requests(count):
+    return [{"agent": None, "messages": [{"role": "user", "content": f"Title {index}"}]} for index in range(count)]
+
+def run(agent, messages):
+    content = messages[-1]["content"]
+    if content == "Title 1":
+        raise RuntimeError("failed")
+    return Response(f"The Hive Mind {content}")
+
+async def arun(agent, messages):
+    return run(agent, messages)
+
+def recorded_events(tmp_path):
+    with open(tmp_path / "transcript.jsonl", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+def test_candidates_are_recorded_with_their_number(tmp_path):
+    selector = CandidateSelector("title", "", extract=str.strip, score=title_score)
+    with Transcript().activate() as transcript:
+        transcript.attach(str(tmp_path))
+        assert selector.select(requests(3), run).startswith("The Hive Mind")
+
+    events = recorded_events(tmp_path)
+    assert sorted((event["candidate"], event["kind"]) for event in events) == [
+        (1, "prompt"), (1, "reply"), (2, "error"), (2, "prompt"), (3, "prompt"), (3, "reply"),
+    ]
+    assert len({event["debate"] for event in events}) == 3
+
+def test_async_candidates_are_recorded(tmp_path):
+    selector = CandidateSelector("title", "", extract=str.strip, score=title_score)
+
+    async def main():
+        with Transcript().activate() as transcript:
+            transcript.attach(str(tmp_path))
+            return await selector.aselect(requests(2), arun)
+
+    assert asyncio.run(main()) == "The Hive Mind Title 0"
+    assert sorted(event["candidate"] for event in recorded_events(tmp_path)) == [1, 1, 2, 2]
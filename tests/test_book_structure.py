@@ -0,0 +1,67 @@
+# tests/test_book_structure.py
+
+import json
+import os
+
+from src.models.book_structure import BookStructure
+
+TOC = """Table of Contents
+
+1. The Hive
+   1.1. Workers
+   1.2. Drones
+2. The Queen
+   2.1. Mating Flight
+      2.1.1. Weather
+      2.1.2. Distance
+   2.2. Laying
+3. Swarming
+"""
+
+def numbers(structure):
+    return [entry.number for chapter in structure for entry in [chapter, *chapter.walk()]]
+
+def test_parse_nests_entries_of_any_depth():
+    structure = BookStructure.parse(TOC)
+    assert [chapter.title for chapter in structure] == ["The Hive", "The Queen", "Swarming"]
+    assert numbers(structure) == ["1", "1.1", "1.2", "2", "2.1", "2.1.1", "2.1.2", "2.2", "3"]
+    assert structure.get("2.1.2").title == "Distance"
+    assert structure.chapter_of("2.1.1").number == "2"
+    assert "2.2" in structure and "4" not in structure
+
+def test_units_are_leaf_sections_and_sectionless_chapters():
+    units = BookStructure.parse(TOC).units()
+    assert [unit.number for unit in units] == ["1.1", "1.2", "2.1.1", "2.1.2", "2.2", "3"]
+
+def test_filenames_follow_the_chapter():
+    structure = BookStructure.parse(TOC)
+    assert structure.get("3").filename == "chapter_3.md"
+    assert structure.get("2.1.1").filename == "chapter_2_section_2_1_1.md"
+
+def test_sections_before_the_first_chapter_are_ignored():
+    structure = BookStructure.parse("0.1. Preface\n1. Start\n1.1. Begin\n")
+    assert numbers(structure) == ["1", "1.1"]
+
+def test_misnumbered_section_is_renumbered_within_its_chapter():
+    structure = BookStructure.parse("1. One\n1.1. A\n2. Two\n3.1. B\n2.1. C\n3.2. D\n3. Three\n3.1. E\n")
+    assert numbers(structure) == ["1", "1.1", "2", "2.1", "2.2", "2.3", "3", "3.1"]
+    assert [structure.get(number).title for number in ("2.1", "2.2", "2.3", "3.1")] == ["B", "C", "D", "E"]
+    for entry in structure.get("2").walk():
+        assert entry.chapter_number == "2"
+        assert entry.filename.startswith("chapter_2_section_2_")
+        assert structure.chapter_of(entry.number).title == "Two"
+
+def test_repeated_section_number_is_renumbered():
+    structure = BookStructure.parse("1. One\n1.1. A\n1.1. B\n")
+    assert [(entry.number, entry.title) for entry in structure.get("1").walk()] == [("1.1", "A"), ("1.2", "B")]
+
+def test_load_reuses_saved_structure_until_the_toc_changes(tmp_path):
+    book = str(tmp_path)
+    structure = BookStructure.load(book, TOC)
+    assert os.path.exists(os.path.join(book, BookStructure.FILENAME))
+    assert numbers(BookStructure.load(book, TOC)) == numbers(structure)
+
+    edited = TOC + "4. Winter\n"
+    assert numbers(BookStructure.load(book, edited))[-1] == "4"
+    with open(os.path.join(book, BookStructure.FILENAME), encoding="utf-8") as f:
+        assert json.load(f)["toc_hash"] == BookStructure.hash_toc(edited)
@@ -0,0 +1,85 @@
+# tests/test_build_state.py
+
+import os
+
+import pytest
+
+import main
+from src.models.book_manager import BookManager
+from src.models.book_structure import BookStructure
+from src.models.build_state import BuildState
+
+TOC = "1. One\n1.1. First\n1.2. Second\n2. Two\n2.1. Third\n"
+
+def write(path, text):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+def touch_later(path):
+    # Same size, new mtime: forces the content hash to be checked
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+@pytest.fixture
+def files(tmp_path):
+    inputs = [str(tmp_path / "a.md"), str(tmp_path / "b.md")]
+    for path in inputs:
+        write(path, "text")
+    target = str(tmp_path / "out.md")
+    write(target, "texttext")
+    return tmp_path, inputs, target
+
+def test_new_target_is_stale(files):
+    tmp_path, inputs, target = files
+    assert BuildState(str(tmp_path)).is_stale(target, inputs)
+
+def test_recorded_target_is_fresh_after_reload(files):
+    tmp_path, inputs, target = files
+    state = BuildState(str(tmp_path))
+    state.record(target, inputs, "meta")
+    state.save()
+    assert not BuildState(str(tmp_path)).is_stale(target, inputs, "meta")
+
+def test_changes_make_the_target_stale(files):
+    tmp_path, inputs, target = files
+    state = BuildState(str(tmp_path))
+    state.record(target, inputs, "meta")
+    assert state.is_stale(target, inputs, "other meta")
+    assert state.is_stale(target, inputs[::-1], "meta")
+    assert state.is_stale(target, inputs[:1], "meta")
+    write(inputs[0], "edit")
+    touch_later(inputs[0])
+    assert state.is_stale(target, inputs, "meta")
+
+def test_touched_but_unchanged_input_is_fresh(files):
+    tmp_path, inputs, target = files
+    state = BuildState(str(tmp_path))
+    state.record(target, inputs, "meta")
+    touch_later(inputs[0])
+    assert not state.is_stale(target, inputs, "meta")
+
+def test_edited_or_missing_output_is_stale(files):
+    tmp_path, inputs, target = files
+    state = BuildState(str(tmp_path))
+    state.record(target, inputs, "meta")
+    write(target, "hand edit")
+    assert state.is_stale(target, inputs, "meta")
+    os.remove(target)
+    assert state.is_stale(target, inputs, "meta")
+
+def test_compile_rebuilds_only_changed_chapters(tmp_path):
+    book_manager = BookManager(str(tmp_path), write_behind=False)
+    structure = BookStructure.parse(TOC)
+    for entry in structure.units():
+        book_manager.write_section("Book", entry.chapter_number, entry.section_number, f"Text of {entry.number}")
+
+    assert main.compile_chapters(book_manager, "Book", structure) == ["1", "2"]
+    assert main.compile_chapters(book_manager, "Book", structure) == []
+
+    path = book_manager.section_path("Book", "2", "2.1")
+    write(path, "Edited text of 2.1")
+    assert main.compile_chapters(book_manager, "Book", structure) == ["2"]
+    with open(os.path.join(book_manager.create_book_directory("Book"), "chapters", "chapter_2.md"), encoding="utf-8") as f:
+        assert "Edited text of 2.1" in f.read()
+
+    assert main.compile_chapters(book_manager, "Book", structure, force=True) == ["1", "2"]
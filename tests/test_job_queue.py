@@ -0,0 +1,121 @@
+# tests/test_job_queue.py
+
+import sqlite3
+import time
+
+import pytest
+
+from src.models.book_structure import TocEntry
+from src.models.job_queue import SectionQueue
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = SectionQueue(str(tmp_path / "queue.sqlite"), {"lease_seconds": 60, "max_attempts": 2})
+    yield queue
+    queue.close()
+
+def units(*numbers):
+    return [TocEntry(number, f"Section {number}") for number in numbers]
+
+def expire_leases(queue):
+    queue._transaction("UPDATE jobs SET lease_until = ? WHERE state = 'leased'", (time.time() - 1,))
+
+def test_jobs_are_claimed_in_reading_order(queue):
+    assert queue.enqueue_book("book", "Book", units("1.1", "1.2", "2.1"), done={"1.2"}) == 3
+    assert [queue.claim("a").number, queue.claim("b").number] == ["1.1", "2.1"]
+    assert queue.claim("c") is None
+
+def test_enqueue_again_adds_nothing(queue):
+    queue.enqueue_book("book", "Book", units("1.1"))
+    assert queue.enqueue_book("book", "Book", units("1.1")) == 0
+
+def test_heartbeat_keeps_the_lease(queue):
+    queue.enqueue_book("book", "Book", units("1.1"))
+    job = queue.claim("a")
+    assert queue.heartbeat(job)
+    assert queue.claim("b") is None
+
+def test_expired_lease_is_claimed_again(queue):
+    queue.enqueue_book("book", "Book", units("1.1"))
+    first = queue.claim("a")
+    expire_leases(queue)
+    second = queue.claim("b")
+    assert second.number == "1.1"
+    assert second.attempts == 2
+    # The first worker lost its lease and can no longer renew or finish it
+    assert not queue.heartbeat(first)
+    assert not queue.complete(first, True)
+    assert queue.complete(second, True)
+    assert queue.book_jobs("book") == {"1.1": "done"}
+
+def test_job_fails_after_max_attempts(queue):
+    queue.enqueue_book("book", "Book", units("1.1"))
+    queue.claim("a")
+    expire_leases(queue)
+    queue.claim("b")
+    expire_leases(queue)
+    assert queue.claim("c") is None
+    assert queue.book_jobs("book") == {"1.1": "failed"}
+    assert not queue.has_work()
+
+def test_failed_job_is_retried_until_max_attempts(queue):
+    queue.enqueue_book("book", "Book", units("1.1"))
+    assert queue.complete(queue.claim("a"), False, error="no content")
+    assert queue.book_jobs("book") == {"1.1": "pending"}
+    assert queue.complete(queue.claim("a"), False, error="no content")
+    assert queue.book_jobs("book") == {"1.1": "failed"}
+
+def test_requeued_book_gets_fresh_attempts(queue):
+    queue.enqueue_book("book", "Book", units("1.1"))
+    queue.complete(queue.claim("a"), False)
+    queue.complete(queue.claim("a"), False)
+    queue.enqueue_book("book", "Book", units("1.1"))
+    assert queue.book_jobs("book") == {"1.1": "pending"}
+    assert queue.claim("a").attempts == 1
+
+def test_only_one_worker_claims_the_compile_step(queue):
+    queue.enqueue_book("book", "Book", units("1.1"))
+    job = queue.claim("a")
+    assert queue.ready_books() == []
+    assert not queue.claim_compile("book")
+    queue.complete(job, True)
+    assert queue.ready_books() == ["book"]
+    assert queue.claim_compile("book")
+    assert not queue.claim_compile("book")
+    assert queue.mark_compiled("book") == "compiled"
+    assert queue.ready_books() == []
+
+def test_failed_compile_is_given_up_after_max_attempts(queue):
+    queue.enqueue_book("book", "Book", units("1.1"))
+    queue.complete(queue.claim("a"), True)
+    assert queue.claim_compile("book")
+    assert queue.mark_compiled("book", ok=False) == "writing"
+    assert queue.ready_books() == ["book"]
+    assert queue.claim_compile("book")
+    assert queue.mark_compiled("book", ok=False) == "failed"
+    assert queue.ready_books() == []
+    assert not queue.claim_compile("book")
+    # Queuing the book again starts over
+    queue.enqueue_book("book", "Book", units("1.1"))
+    assert queue.claim_compile("book")
+
+def test_spent_is_shared_through_the_queue(queue):
+    queue.enqueue_book("book", "Book", units("1.1"), spent={"calls": 4, "tokens": 100, "seconds": 10})
+    queue.add_spent("book", 2, 50)
+    spent = queue.book_spent("book")
+    assert (spent["calls"], spent["tokens"]) == (6, 150)
+    assert spent["seconds"] >= 10
+
+def test_old_queue_file_gets_new_columns(tmp_path):
+    path = str(tmp_path / "old.sqlite")
+    conn = sqlite3.connect(path)
+    conn.executescript(
+        "CREATE TABLE books (book TEXT PRIMARY KEY, title TEXT NOT NULL, state TEXT NOT NULL, "
+        "created REAL NOT NULL, updated REAL NOT NULL);"
+        "INSERT INTO books VALUES ('book', 'Book', 'writing', 100.0, 100.0);"
+    )
+    conn.close()
+    queue = SectionQueue(path)
+    assert queue.book_spent("book")["calls"] == 0
+    assert queue.claim_compile("book")
+    queue.close()
@@ -0,0 +1,49 @@
+# tests/test_metrics.py
+
+import os
+
+from src.utils.files import FILE_MODE
+from src.utils.metrics import MetricsRecorder
+
+def recorder():
+    return MetricsRecorder({"enabled": True, "jsonl_filename": None, "prometheus_filename": None})
+
+def test_title_debate_counts_towards_the_book():
+    metrics = recorder()
+    with metrics.labels(topic="Bees", phase="title"):
+        metrics.record_call("Zero", 1.0, prompt_tokens=10, completion_tokens=5)
+        metrics.record_debate(2, "consensus")
+    metrics.relabel_book("Bees", "The Hive")
+    with metrics.labels(book="The Hive", phase="toc"):
+        metrics.record_call("Zero", 2.0, prompt_tokens=20, completion_tokens=5)
+
+    rollup = metrics.rollup("The Hive")
+    assert rollup["calls"] == 2
+    assert rollup["prompt_tokens"] == 30
+    assert rollup["turns_per_debate"] == {"title": 2.0}
+    assert metrics.rollup("Bees")["calls"] == 0
+
+def test_relabel_merges_into_existing_book_series():
+    metrics = recorder()
+    with metrics.labels(book="The Hive", phase="title"):
+        metrics.record_call("Zero", 1.0)
+    with metrics.labels(topic="Bees", phase="title"):
+        metrics.record_call("Zero", 1.0)
+    metrics.relabel_book("Bees", "The Hive")
+    assert metrics.rollup("The Hive")["calls"] == 2
+    assert 'book="The Hive",phase="title",section="",agent="Zero"} 2' in metrics.prometheus_text()
+
+def test_merge_adds_worker_aggregates():
+    parent, worker = recorder(), recorder()
+    for target in (parent, worker):
+        with target.labels(book="The Hive", phase="section", section="1.1"):
+            target.record_call("Gustave", 0.5, completion_tokens=7)
+    parent.merge(worker.aggregates())
+    rollup = parent.rollup("The Hive")
+    assert rollup["calls"] == 2
+    assert rollup["completion_tokens"] == 14
+
+def test_prometheus_file_gets_the_usual_permissions(tmp_path):
+    metrics = MetricsRecorder({"enabled": True, "output_dir": str(tmp_path), "jsonl_filename": None})
+    path = metrics.write_prometheus()
+    assert os.stat(path).st_mode & 0o777 == FILE_MODE
@@ -0,0 +1,143 @@
+# tests/test_rate_limit.py
+
+import asyncio
+import time
+
+import pytest
+
+from src.agents.rate_limit import RateLimitedOpenAI, RateLimiter, TokenBucket, parse_duration
+
+class RateLimitError(Exception):
+    status_code = 429
+
+    def __init__(self, headers=None):
+        super().__init__("rate limited")
+        self.headers = headers or {}
+
+class FakeCompletions:
+    """Chat completions that fail with the queued errors, then answer after ``delay`` seconds."""
+
+    def __init__(self, errors=(), delay=0.0):
+        self.errors = list(errors)
+        self.delay = delay
+        self.calls = 0
+
+    def create(self, **kwargs):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        time.sleep(self.delay)
+        return "done"
+
+class AsyncFakeCompletions(FakeCompletions):
+    async def create(self, **kwargs):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        await asyncio.sleep(self.delay)
+        return "done"
+
+class FakeClient:
+    def __init__(self, completions):
+        self.chat = type("Chat", (), {"completions": completions})()
+
+def limited(completions, is_async=False, **settings):
+    limiter = RateLimiter(dict({"backoff": 0.01, "max_backoff": 0.01}, **settings))
+    return RateLimitedOpenAI(FakeClient(completions), limiter, is_async=is_async), limiter
+
+def test_parse_duration():
+    assert parse_duration("1s") == 1
+    assert parse_duration("6m0s") == 360
+    assert parse_duration("120ms") == pytest.approx(0.12)
+    assert parse_duration("2.5") == 2.5
+    assert parse_duration(None) is None
+    assert parse_duration("soon") is None
+
+def test_token_bucket_waits_for_refill():
+    bucket = TokenBucket(60)  # one per second
+    now = time.monotonic()
+    assert bucket.wait_time(60, now) == 0
+    bucket.take(60)
+    assert bucket.wait_time(1, now) == pytest.approx(1.0)
+    bucket.refund(30)
+    assert bucket.wait_time(30, now) == 0
+
+def test_success_releases_slot_and_grows_concurrency():
+    client, limiter = limited(FakeCompletions())
+    assert client.chat.completions.create(messages=[]) == "done"
+    assert limiter.in_flight == 0
+    assert limiter.calls == 1
+    assert limiter.concurrency > limiter.settings["initial_concurrency"]
+
+def test_rate_limited_call_is_retried_and_halves_concurrency():
+    completions = FakeCompletions(errors=[RateLimitError()])
+    client, limiter = limited(completions, initial_concurrency=8)
+    assert client.chat.completions.create(messages=[]) == "done"
+    assert completions.calls == 2
+    assert limiter.rate_limited == 1
+    assert limiter.in_flight == 0
+    assert limiter.concurrency < 8
+
+def test_other_errors_are_not_retried():
+    completions = FakeCompletions(errors=[ValueError("bad request")])
+    client, limiter = limited(completions)
+    with pytest.raises(ValueError):
+        client.chat.completions.create(messages=[])
+    assert completions.calls == 1
+    assert limiter.in_flight == 0
+
+def test_retries_are_bounded():
+    completions = FakeCompletions(errors=[RateLimitError() for _ in range(5)])
+    client, limiter = limited(completions, max_retries=2)
+    with pytest.raises(RateLimitError):
+        client.chat.completions.create(messages=[])
+    assert completions.calls == 3
+    assert limiter.in_flight == 0
+
+def test_retry_after_pauses_callers():
+    limiter = RateLimiter()
+    limiter.acquire(10)
+    limiter.release(10, headers={"retry-after": "2"}, rate_limited=True)
+    assert limiter._delay(10, time.monotonic()) > 1.5
+
+def test_concurrency_limit_blocks_until_release():
+    limiter = RateLimiter({"initial_concurrency": 1})
+    limiter.acquire(10)
+    assert limiter._delay(10, time.monotonic()) is None
+    limiter.release(10)
+    assert limiter._delay(10, time.monotonic()) == 0
+
+def test_request_quota_is_refunded_when_not_sent():
+    limiter = RateLimiter({"requests_per_minute": 1})
+    limiter.acquire(10)
+    limiter.release(10, sent=False)
+    assert limiter.calls == 0
+    assert limiter.requests.wait_time(1, time.monotonic()) == 0
+
+def test_cancelled_async_call_releases_slot():
+    client, limiter = limited(AsyncFakeCompletions(delay=10), is_async=True)
+
+    async def main():
+        task = asyncio.ensure_future(client.chat.completions.create(messages=[]))
+        await asyncio.sleep(0.05)
+        assert limiter.in_flight == 1
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+    assert limiter.in_flight == 0
+
+def test_cancelled_calls_do_not_exhaust_concurrency():
+    client, limiter = limited(AsyncFakeCompletions(delay=10), is_async=True, initial_concurrency=2)
+
+    async def main():
+        for _ in range(3):
+            with pytest.raises(asyncio.TimeoutError):
+                await asyncio.wait_for(client.chat.completions.create(messages=[]), 0.05)
+        limiter.settings["poll_interval"] = 0.01
+        client.chat.completions._completions.delay = 0
+        return await asyncio.wait_for(client.chat.completions.create(messages=[]), 1.0)
+
+    assert asyncio.run(main()) == "done"
+    assert limiter.in_flight == 0
@@ -0,0 +1,129 @@
+# tests/test_resilience.py
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from src.agents.resilience import AgentCallTimeout, AsyncResilientSwarm, ResilientSwarm, is_retryable
+from src.agents.stub_backend import StubBackendError, StubRateLimitError
+from src.utils.metrics import metrics
+
+FAST = {"backoff": 0.001, "max_backoff": 0.001, "max_retries": 2, "hedge": False,
+        "timeouts": {}, "default_timeout": 5.0}
+
+class APIError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+class FakeSwarm:
+    """Swarm client whose run() raises the queued errors, then answers after ``delay`` seconds."""
+
+    def __init__(self, errors=(), delay=0.0):
+        self.errors = list(errors)
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def run(self, agent, messages, **kwargs):
+        with self._lock:
+            self.calls += 1
+            call = self.calls
+            error = self.errors.pop(0) if self.errors else None
+        if error:
+            raise error
+        time.sleep(self.delay if call == 1 else 0)
+        return f"answer {call}"
+
+class AsyncFakeSwarm(FakeSwarm):
+    async def run(self, agent, messages, **kwargs):
+        self.calls += 1
+        call = self.calls
+        if self.errors:
+            raise self.errors.pop(0)
+        await asyncio.sleep(self.delay if call == 1 else 0)
+        return f"answer {call}"
+
+@pytest.mark.parametrize("error, retryable", [
+    (AgentCallTimeout("slow"), True),
+    (ConnectionResetError(), True),
+    (APIError(408), True),
+    (APIError(409), True),
+    (APIError(429), True),
+    (APIError(500), True),
+    (APIError(503), True),
+    (StubBackendError("Simulated API failure"), True),
+    (APIError(400), False),
+    (APIError(401), False),
+    (APIError(404), False),
+    (TypeError("bug"), False),
+    (KeyError("bug"), False),
+    (RuntimeError("unknown"), False),
+])
+def test_is_retryable(error, retryable):
+    assert is_retryable(error) is retryable
+
+def test_rate_limits_are_left_to_the_limiter():
+    assert is_retryable(StubRateLimitError(1.0), rate_limited=False)
+    assert not is_retryable(StubRateLimitError(1.0), rate_limited=True)
+
+def test_transient_errors_are_retried():
+    client = FakeSwarm(errors=[APIError(503), APIError(502)])
+    swarm = ResilientSwarm(client, FAST)
+    assert swarm.run(None, []) == "answer 3"
+    assert swarm.snapshot()["retries"] == 2
+
+def test_retries_are_bounded():
+    client = FakeSwarm(errors=[APIError(503)] * 5)
+    swarm = ResilientSwarm(client, FAST)
+    with pytest.raises(APIError):
+        swarm.run(None, [])
+    assert client.calls == 3
+
+def test_programming_errors_are_raised_at_once():
+    client = FakeSwarm(errors=[TypeError("bug")])
+    swarm = ResilientSwarm(client, FAST)
+    with pytest.raises(TypeError):
+        swarm.run(None, [])
+    assert client.calls == 1
+    assert swarm.snapshot()["retries"] == 0
+
+def test_slow_attempt_times_out_and_is_retried():
+    client = FakeSwarm(delay=1.0)
+    swarm = ResilientSwarm(client, dict(FAST, timeouts={"section": 0.1}))
+    with metrics.labels(phase="section"):
+        assert swarm.run(None, []) == "answer 2"
+    assert swarm.snapshot()["timeouts"] == 1
+
+def test_hedge_wins_over_slow_attempt():
+    client = FakeSwarm(delay=1.0)
+    swarm = ResilientSwarm(client, dict(FAST, hedge=True, hedge_min_samples=1, hedge_min_delay=0.05))
+    swarm.latencies.add("", 0.01)
+    started = time.monotonic()
+    assert swarm.run(None, []) == "answer 2"
+    assert time.monotonic() - started < 0.5
+    stats = swarm.snapshot()
+    assert stats["hedges"] == 1
+    assert stats["hedge_wins"] == 1
+
+def test_no_hedge_without_enough_samples():
+    client = FakeSwarm()
+    swarm = ResilientSwarm(client, dict(FAST, hedge=True, hedge_min_samples=5))
+    assert swarm.run(None, []) == "answer 1"
+    assert swarm.snapshot()["hedges"] == 0
+
+def test_async_hedge_cancels_the_loser():
+    client = AsyncFakeSwarm(delay=1.0)
+    swarm = AsyncResilientSwarm(client, dict(FAST, hedge=True, hedge_min_samples=1, hedge_min_delay=0.05))
+    swarm.latencies.add("", 0.01)
+    assert asyncio.run(swarm.run(None, [])) == "answer 2"
+    assert swarm.snapshot()["hedge_wins"] == 1
+
+def test_async_programming_errors_are_raised_at_once():
+    client = AsyncFakeSwarm(errors=[KeyError("bug")])
+    swarm = AsyncResilientSwarm(client, FAST)
+    with pytest.raises(KeyError):
+        asyncio.run(swarm.run(None, []))
+    assert client.calls == 1